@@ -5,7 +5,15 @@ from rank_bm25 import BM25Okapi
 from transformers import pipeline
 import pickle
 import os
+import sys
 import torch
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+from agents.token_chunker import TokenChunker
 
 class LegalEmbeddingModel:
     def __init__(self, model_name="nlpaueb/legal-bert-base-uncased"):
@@ -86,6 +94,8 @@ class ResearchRetrievalIntelligenceAgent:
                 model="facebook/bart-large-cnn",  # Good for legal text
                 device=0 if torch.cuda.is_available() else -1
             )
+            # Long opinions are split at paragraphs into windows of BART tokens
+            self.chunker = TokenChunker(self.summarizer.tokenizer)
             print("Local LLM loaded successfully!")
         except Exception as e:
             print(f"Error loading LLM: {e}")
@@ -180,20 +190,19 @@ class ResearchRetrievalIntelligenceAgent:
             return self.summarize_case(case_text)  # Fallback to simple summary
         
         try:
-            # Truncate text if too long for the model
-            max_input_length = 1024
-            if len(case_text) > max_input_length:
-                case_text = case_text[:max_input_length]
-            
-            summary = self.summarizer(
-                case_text,
+            # Summarize every token-sized chunk (one batch) instead of truncating the case
+            chunks = self.chunker.chunk(case_text) or [case_text]
+            summaries = self.summarizer(
+                chunks,
+                batch_size=min(len(chunks), 8),
                 max_length=max_length,
                 min_length=min_length,
+                truncation=True,
                 do_sample=False
             )
             
             return {
-                "ai_summary": summary[0]['summary_text'],
+                "ai_summary": "\n".join(summary['summary_text'] for summary in summaries),
                 "method": "Local LLM (BART)",
                 "case_preview": case_text[:200] + "...",
                 "legal_analysis": self._extract_legal_elements(case_text)
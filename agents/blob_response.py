@@ -0,0 +1,192 @@
+"""Streaming responses for stored blobs with Range and conditional request support.
+
+Blobs are content-addressed and never change, so their SHA-256 is a strong
+ETag: ``If-None-Match`` answers 304 without touching the file and ``If-Range``
+can be checked without a stat. A single byte range (``Range: bytes=a-b``,
+``a-`` or ``-n``) is served as 206; several ranges are answered with the whole
+file, which RFC 9110 allows.
+
+When the ASGI server offers the ``http.response.zerocopysend`` extension the
+bytes go out through the OS (sendfile) straight from the file descriptor.
+uvicorn, which ``backend_api.py`` launches, does not implement that extension,
+so under uvicorn every download is read and sent in ``DOWNLOAD_CHUNK_BYTES``
+chunks; zero-copy needs a server that advertises it in ``scope["extensions"]``.
+
+The media type comes from the uploader, so it is never trusted to render on
+the API's origin: every response carries ``X-Content-Type-Options: nosniff``
+and only PDFs and raster images are served ``inline``; anything else (HTML,
+SVG, scripts...) is an ``attachment``.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+DOWNLOAD_CHUNK_BYTES = int(os.getenv("LEGISAI_DOWNLOAD_CHUNK_BYTES", str(256 * 1024)))
+# Zero-copy sends are issued in slices so one response cannot monopolise the server.
+ZEROCOPY_SLICE_BYTES = 8 * 1024 * 1024
+
+_RANGE = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+_MEDIA_TYPE = re.compile(r"^[\w.+-]+/[\w.+-]+$")
+# Types a browser may display in place; SVG is left out because it can carry script.
+INLINE_MEDIA_TYPES = frozenset(
+    {"application/pdf", "image/png", "image/jpeg", "image/gif", "image/webp", "image/bmp", "image/tiff"}
+)
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    The (start, end) inclusive byte span requested by a ``Range`` header, or None
+    when the whole file should be sent (no header, other units, several ranges or
+    an unparsable value). Raises RangeNotSatisfiable for ranges beyond the end.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    match = _RANGE.match(spec)
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires.
+    candidates = [value.strip().removeprefix("W/") for value in header.split(",")]
+    return etag in candidates
+
+
+class BlobResponse(Response):
+    """Response for one stored blob (GET or HEAD); builds its own headers per request."""
+
+    def __init__(self, path: Path, sha256: str, media_type: str, filename: Optional[str] = None, size: Optional[int] = None):
+        self.background = None
+        self.path = Path(path)
+        self.etag = f'"{sha256}"'
+        media_type = (media_type or "").split(";", 1)[0].strip().lower()
+        # Anything that is not a plain type/subtype is served as opaque bytes.
+        self.media_type = media_type if _MEDIA_TYPE.match(media_type) else "application/octet-stream"
+        self.filename = filename
+        self.size = size
+
+    @property
+    def disposition(self) -> str:
+        return "inline" if self.media_type in INLINE_MEDIA_TYPES else "attachment"
+
+    def _headers(self, extra: Dict[str, str]) -> List[Tuple[bytes, bytes]]:
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": self.etag,
+            # A file id always refers to the same bytes.
+            "cache-control": "private, max-age=31536000, immutable",
+            "x-content-type-options": "nosniff",
+            "content-disposition": self.disposition,
+            **extra,
+        }
+        if self.filename:
+            headers["content-disposition"] += f"; filename*=UTF-8''{quote(self.filename)}"
+        return [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        request_headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        head_only = scope["method"].upper() == "HEAD"
+
+        if _etag_matches(request_headers.get("if-none-match"), self.etag):
+            await send({"type": "http.response.start", "status": 304, "headers": self._headers({})})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        size = self.size if self.size is not None else self.path.stat().st_size
+        span = None
+        if_range = request_headers.get("if-range")
+        if if_range is None or if_range.strip() == self.etag:
+            try:
+                span = parse_range(request_headers.get("range"), size)
+            except RangeNotSatisfiable:
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 416,
+                        "headers": self._headers({"content-range": f"bytes */{size}", "content-length": "0"}),
+                    }
+                )
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        start, end = span if span is not None else (0, size - 1)
+        length = max(0, end - start + 1)
+        extra = {"content-type": self.media_type, "content-length": str(length)}
+        if span is not None:
+            extra["content-range"] = f"bytes {start}-{end}/{size}"
+        await send({"type": "http.response.start", "status": 206 if span is not None else 200, "headers": self._headers(extra)})
+
+        if head_only or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            await self._send_zerocopy(send, start, length)
+        else:
+            await self._send_chunks(send, start, length)
+
+    async def _send_zerocopy(self, send: Send, start: int, length: int):
+        """Only reached on servers with ``http.response.zerocopysend``; not uvicorn."""
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            offset, remaining = start, length
+            while remaining > 0:
+                count = min(ZEROCOPY_SLICE_BYTES, remaining)
+                remaining -= count
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": fd,
+                        "offset": offset,
+                        "count": count,
+                        "more_body": remaining > 0,
+                    }
+                )
+                offset += count
+        finally:
+            os.close(fd)
+
+    async def _send_chunks(self, send: Send, start: int, length: int):
+        """The path uvicorn takes: reads of ``DOWNLOAD_CHUNK_BYTES`` at a time."""
+        async with aiofiles.open(self.path, "rb") as f_handle:
+            await f_handle.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = await f_handle.read(min(DOWNLOAD_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; end the body rather than hang the client.
+                await send({"type": "http.response.body", "body": b""})
+
+
+__all__ = ["BlobResponse", "RangeNotSatisfiable", "parse_range"]
@@ -0,0 +1,297 @@
+"""Content-addressed storage for uploaded documents.
+
+Bytes live once per distinct content under ``<root>/blobs/<sha[:2]>/<sha256>``.
+Each upload creates a logical document (its own ``file_id``, filename and type)
+that references a blob; blobs are reference counted and removed when their last
+document is deleted. Derived results (OCR text, extraction, embeddings, ...) are
+stored per blob as artifacts, so re-uploaded content reuses them.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_LEGACY_NAME = re.compile(r"^(doc_\d+)_(.+)$")
+
+DEFAULT_ROOT = Path("uploads")
+SORTABLE_FIELDS = ("created_at", "filename", "file_type", "size", "status")
+
+
+@dataclass
+class StoredDocument:
+    file_id: str
+    sha256: str
+    filename: str
+    file_type: str
+    size: int
+    status: str
+    created_at: float
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def new_file_id() -> str:
+    return f"doc_{uuid.uuid4().hex}"
+
+
+class DocumentStore:
+    """Blob files on disk plus an SQLite index of blobs, documents and artifacts."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.tmp_dir = self.root / "tmp"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "catalog.sqlite3"), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    refcount INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS documents (
+                    file_id TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL REFERENCES blobs (sha256),
+                    filename TEXT NOT NULL,
+                    file_type TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents (sha256);
+                CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents (created_at);
+                CREATE INDEX IF NOT EXISTS idx_documents_type_created_at ON documents (file_type, created_at);
+                CREATE INDEX IF NOT EXISTS idx_documents_status_created_at ON documents (status, created_at);
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    sha256 TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (sha256, kind)
+                );
+                """
+            )
+        self._adopt_legacy_files()
+
+    # --- blobs ---
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.blob_dir / sha256[:2] / sha256
+
+    def temp_path(self) -> Path:
+        """A fresh path for streaming an upload before its hash is known."""
+        return self.tmp_dir / f"{uuid.uuid4().hex}.part"
+
+    def has_blob(self, sha256: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        return row is not None and self.blob_path(sha256).exists()
+
+    # --- documents ---
+
+    def add_document(
+        self,
+        sha256: str,
+        filename: str,
+        file_type: str,
+        size: int,
+        staged: Optional[Path] = None,
+        status: str = "uploaded",
+    ) -> Tuple[StoredDocument, bool]:
+        """
+        Register a logical document for the content ``sha256``.
+
+        ``staged`` is the temporary file holding the content; it becomes the blob
+        if the content is new and is discarded otherwise. Without ``staged`` the
+        blob must already exist. Returns the document and whether it was
+        deduplicated against an existing blob.
+        """
+        document = StoredDocument(
+            file_id=new_file_id(),
+            sha256=sha256,
+            filename=filename,
+            file_type=file_type,
+            size=size,
+            status=status,
+            created_at=time.time(),
+        )
+        blob = self.blob_path(sha256)
+        with self._lock, self._conn:
+            known = self._conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone() is not None
+            deduplicated = known and blob.exists()
+            if deduplicated:
+                if staged is not None:
+                    staged.unlink(missing_ok=True)
+            elif staged is not None:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(staged, blob)
+            else:
+                raise FileNotFoundError(f"No stored content for {sha256}")
+
+            if known:
+                self._conn.execute("UPDATE blobs SET refcount = refcount + 1 WHERE sha256 = ?", (sha256,))
+            else:
+                self._conn.execute(
+                    "INSERT INTO blobs (sha256, size, refcount, created_at) VALUES (?, ?, 1, ?)",
+                    (sha256, size, document.created_at),
+                )
+            self._conn.execute(
+                "INSERT INTO documents (file_id, sha256, filename, file_type, size, status, created_at, error) "
+                "VALUES (:file_id, :sha256, :filename, :file_type, :size, :status, :created_at, :error)",
+                document.to_dict(),
+            )
+        return document, deduplicated
+
+    def get_document(self, file_id: str) -> Optional[StoredDocument]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE file_id = ?", (file_id,)).fetchone()
+        return StoredDocument(**dict(row)) if row is not None else None
+
+    def list_documents(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        sort: str = "created_at",
+        descending: bool = True,
+        file_type: Optional[str] = None,
+        status: Optional[str] = None,
+        created_after: Optional[float] = None,
+        created_before: Optional[float] = None,
+    ) -> Tuple[List[StoredDocument], int]:
+        """One page of documents matching the filters, and the total number matching."""
+        if sort not in SORTABLE_FIELDS:
+            raise ValueError(f"Cannot sort by {sort!r}; expected one of {', '.join(SORTABLE_FIELDS)}")
+        clauses, params = [], []
+        for column, operator, value in (
+            ("file_type", "=", file_type),
+            ("status", "=", status),
+            ("created_at", ">=", created_after),
+            ("created_at", "<", created_before),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {operator} ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "DESC" if descending else "ASC"
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM documents {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT * FROM documents {where} ORDER BY {sort} {direction}, file_id {direction} LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [StoredDocument(**dict(row)) for row in rows], total
+
+    def documents_for_blob(self, sha256: str) -> List[StoredDocument]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM documents WHERE sha256 = ? ORDER BY created_at", (sha256,)).fetchall()
+        return [StoredDocument(**dict(row)) for row in rows]
+
+    def set_status(self, file_id: str, status: str, error: Optional[str] = None) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE documents SET status = ?, error = ? WHERE file_id = ?", (status, error, file_id)
+            )
+        return cursor.rowcount > 0
+
+    def delete_document(self, file_id: str) -> bool:
+        """Remove a document; its blob and artifacts go with the last reference."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT sha256 FROM documents WHERE file_id = ?", (file_id,)).fetchone()
+            if row is None:
+                return False
+            sha256 = row["sha256"]
+            self._conn.execute("DELETE FROM documents WHERE file_id = ?", (file_id,))
+            self._conn.execute("UPDATE blobs SET refcount = refcount - 1 WHERE sha256 = ?", (sha256,))
+            remaining = self._conn.execute("SELECT refcount FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            if remaining is not None and remaining["refcount"] <= 0:
+                self._conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+                self._conn.execute("DELETE FROM artifacts WHERE sha256 = ?", (sha256,))
+                self.blob_path(sha256).unlink(missing_ok=True)
+        return True
+
+    # --- derived artifacts ---
+
+    def get_artifact(self, sha256: str, kind: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM artifacts WHERE sha256 = ? AND kind = ?", (sha256, kind)
+            ).fetchone()
+        return json.loads(row["payload"]) if row is not None else None
+
+    def artifact_blobs(self, kind: str) -> List[str]:
+        """Hashes of the blobs that have an artifact of ``kind``."""
+        with self._lock:
+            rows = self._conn.execute("SELECT sha256 FROM artifacts WHERE kind = ? ORDER BY created_at", (kind,)).fetchall()
+        return [row["sha256"] for row in rows]
+
+    def put_artifact(self, sha256: str, kind: str, payload: Any):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (sha256, kind, payload, created_at) VALUES (?, ?, ?, ?)",
+                (sha256, kind, json.dumps(payload), time.time()),
+            )
+
+    # --- migration ---
+
+    def _adopt_legacy_files(self):
+        """Move files saved by the old ``doc_<ts>_<filename>`` layout into the blob store."""
+        for path in sorted(self.root.iterdir()):
+            match = _LEGACY_NAME.match(path.name)
+            if match is None or not path.is_file():
+                continue
+            digest = hashlib.sha256()
+            with open(path, "rb") as f_handle:
+                for chunk in iter(lambda: f_handle.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            stat = path.stat()
+            try:
+                document, _ = self.add_document(
+                    digest.hexdigest(), match.group(2), "application/octet-stream", stat.st_size, staged=path
+                )
+            except OSError as exc:  # pragma: no cover - defensive logging
+                logger.warning("Could not adopt legacy upload %s: %s", path, exc)
+                continue
+            with self._lock, self._conn:
+                # Keep the old id where it is unique, and the original upload time.
+                taken = self._conn.execute("SELECT 1 FROM documents WHERE file_id = ?", (match.group(1),)).fetchone()
+                self._conn.execute(
+                    "UPDATE documents SET file_id = ?, created_at = ? WHERE file_id = ?",
+                    (document.file_id if taken else match.group(1), stat.st_mtime, document.file_id),
+                )
+
+
+_store: Optional[DocumentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_document_store(root: Optional[Path] = None) -> DocumentStore:
+    """The shared store at ``root``; without a root, the one in use (or DEFAULT_ROOT)."""
+    global _store
+    with _store_lock:
+        if _store is None or (root is not None and _store.root != Path(root)):
+            _store = DocumentStore(root if root is not None else DEFAULT_ROOT)
+        return _store
+
+
+__all__ = ["DocumentStore", "DEFAULT_ROOT", "SORTABLE_FIELDS", "StoredDocument", "get_document_store", "new_file_id"]
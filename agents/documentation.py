@@ -1,101 +1,346 @@
-import time
-from pathlib import Path
-from typing import Any, Dict, List
-
-import aiofiles
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from pydantic import BaseModel
-
-router = APIRouter()
-
-
-class UploadResponse(BaseModel):
-    file_id: str
-    filename: str
-    file_type: str
-    size: int
-    status: str
-    processing_results: Dict[str, Any] | None = None
-
-
-@router.post("/api/upload", response_model=UploadResponse)
-async def upload_document(file: UploadFile = File(...)) -> UploadResponse:
-    """Upload a legal document for analysis."""
-    try:
-        upload_dir = Path("uploads")
-        upload_dir.mkdir(exist_ok=True)
-
-        content = await file.read()
-        file_id = f"doc_{int(time.time())}"
-        file_path = upload_dir / f"{file_id}_{file.filename}"
-
-        async with aiofiles.open(file_path, "wb") as f_handle:
-            await f_handle.write(content)
-
-        return UploadResponse(
-            file_id=file_id,
-            filename=file.filename,
-            file_type=file.content_type or "application/octet-stream",
-            size=len(content),
-            status="uploaded",
-            processing_results={
-                "pages_extracted": 1,
-                "text_length": len(content),
-                "language_detected": "en",
-                "document_type": "legal_document",
-            },
-        )
-
-    except Exception as exc:  # pragma: no cover - defensive logging
-        raise HTTPException(status_code=500, detail=str(exc))
-
-
-@router.get("/api/files")
-async def list_uploaded_files() -> Dict[str, Any]:
-    """List uploaded files."""
-    try:
-        upload_dir = Path("uploads")
-        files: List[Dict[str, Any]] = []
-
-        if upload_dir.exists():
-            for file_path in upload_dir.iterdir():
-                if file_path.is_file():
-                    files.append(
-                        {
-                            "file_id": file_path.stem.split("_")[0],
-                            "filename": "_".join(file_path.stem.split("_")[1:]),
-                            "size": file_path.stat().st_size,
-                            "upload_date": "2024-01-01T00:00:00Z",
-                        }
-                    )
-
-        return {"files": files, "total_files": len(files)}
-    except Exception as exc:  # pragma: no cover - defensive logging
-        raise HTTPException(status_code=500, detail=str(exc))
-
-
-@router.delete("/api/files/{file_id}")
-async def delete_file(file_id: str) -> Dict[str, Any]:
-    """Delete uploaded file."""
-    try:
-        upload_dir = Path("uploads")
-        deleted = False
-
-        if upload_dir.exists():
-            for file_path in upload_dir.iterdir():
-                if file_path.is_file() and file_path.stem.startswith(file_id):
-                    file_path.unlink()
-                    deleted = True
-                    break
-
-        if not deleted:
-            raise HTTPException(status_code=404, detail="File not found")
-
-        return {"file_id": file_id, "status": "deleted"}
-    except Exception as exc:  # pragma: no cover - defensive logging
-        raise HTTPException(status_code=500, detail=str(exc))
-
-
-__all__ = ["router", "UploadResponse"]
-
-
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+import aiofiles
+from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile
+from pydantic import BaseModel
+
+from .blob_response import BlobResponse
+from .document_store import SORTABLE_FIELDS, DocumentStore, StoredDocument, get_document_store
+from .ingestion import get_ingestion_pipeline
+from .multipart_upload import MultipartError, UploadNotFound, get_multipart_store
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = Path("uploads")  # blobs, staging area and catalog; see document_store
+# Uploads are copied to disk in chunks of this size, so memory per upload is constant.
+UPLOAD_CHUNK_BYTES = int(os.getenv("LEGISAI_UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("LEGISAI_MAX_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+MAX_PAGE_SIZE = 500
+
+
+class UploadResponse(BaseModel):
+    file_id: str
+    filename: str
+    file_type: str
+    size: int
+    status: str
+    sha256: str | None = None
+    processing_results: Dict[str, Any] | None = None
+
+
+class MultipartInitRequest(BaseModel):
+    filename: str
+    size: int
+    file_type: str = "application/octet-stream"
+    part_size: int | None = None
+
+
+class CompletedPart(BaseModel):
+    part_number: int
+    sha256: str | None = None
+
+
+class MultipartCompleteRequest(BaseModel):
+    parts: List[CompletedPart] | None = None
+
+
+async def _stream_to_disk(file: UploadFile, destination: Path) -> Tuple[int, str]:
+    """
+    Copy an upload to ``destination`` in fixed-size chunks, computing its size and
+    SHA-256 on the way. The file is removed on any failure, including exceeding
+    MAX_UPLOAD_BYTES.
+    """
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(destination, "wb") as f_handle:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds the maximum upload size of {MAX_UPLOAD_BYTES} bytes",
+                    )
+                digest.update(chunk)
+                await f_handle.write(chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+
+    return size, digest.hexdigest()
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    # Naive datetimes in query parameters are taken as UTC.
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def _register_upload(store: DocumentStore, document: StoredDocument, deduplicated: bool) -> UploadResponse:
+    """Queue a stored document for ingestion and describe it to the client."""
+    get_ingestion_pipeline(store).submit(document)
+    return UploadResponse(
+        file_id=document.file_id,
+        filename=document.filename,
+        file_type=document.file_type,
+        size=document.size,
+        status="deduplicated" if deduplicated else "uploaded",
+        sha256=document.sha256,
+        # Present immediately when the same content was processed before.
+        processing_results=store.get_artifact(document.sha256, "processing_results"),
+    )
+
+
+@router.post("/api/upload", response_model=UploadResponse)
+async def upload_document(file: UploadFile = File(...)) -> UploadResponse:
+    """Upload a legal document for analysis."""
+    try:
+        store = get_document_store(UPLOAD_DIR)
+        staged = store.temp_path()
+        size, sha256 = await _stream_to_disk(file, staged)
+        document, deduplicated = store.add_document(
+            sha256,
+            file.filename or "upload",
+            file.content_type or "application/octet-stream",
+            size,
+            staged=staged,
+        )
+        return _register_upload(store, document, deduplicated)
+
+    except HTTPException:
+        raise
+    except Exception as exc:  # pragma: no cover - defensive logging
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.post("/api/upload/multipart")
+async def initiate_multipart_upload(request: MultipartInitRequest) -> Dict[str, Any]:
+    """
+    Start a resumable upload. Parts are then PUT to
+    /api/upload/multipart/{upload_id}/parts/{n} as raw bytes, in any order and
+    in parallel, and the upload is finished with .../complete.
+    """
+    try:
+        upload = get_multipart_store(UPLOAD_DIR).create(
+            request.filename, request.file_type, request.size, request.part_size
+        )
+        return upload.to_dict()
+    except MultipartError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except Exception as exc:  # pragma: no cover - defensive logging
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.get("/api/upload/multipart")
+async def list_multipart_uploads() -> Dict[str, Any]:
+    """Uploads that were started but not completed yet."""
+    uploads = get_multipart_store(UPLOAD_DIR).list_uploads()
+    return {"uploads": uploads, "total_uploads": len(uploads)}
+
+
+@router.get("/api/upload/multipart/{upload_id}")
+async def get_multipart_upload(upload_id: str) -> Dict[str, Any]:
+    """Parts received so far, so a client can resume by sending only the missing ones."""
+    store = get_multipart_store(UPLOAD_DIR)
+    try:
+        upload = store.get(upload_id)
+        parts = store.parts(upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    missing = [number for number in range(1, upload.part_count + 1) if number not in parts]
+    return {**upload.to_dict(), "parts": list(parts.values()), "missing_parts": missing}
+
+
+@router.put("/api/upload/multipart/{upload_id}/parts/{part_number}")
+async def upload_part(upload_id: str, part_number: int, request: Request) -> Dict[str, Any]:
+    """Receive one part; sending a part again replaces it."""
+    try:
+        return await get_multipart_store(UPLOAD_DIR).write_part(upload_id, part_number, request.stream())
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except MultipartError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except Exception as exc:  # pragma: no cover - defensive logging
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.post("/api/upload/multipart/{upload_id}/complete", response_model=UploadResponse)
+async def complete_multipart_upload(
+    upload_id: str, request: MultipartCompleteRequest | None = None
+) -> UploadResponse:
+    """Store the assembled file like a regular upload; the parts must all have arrived."""
+    multipart = get_multipart_store(UPLOAD_DIR)
+    try:
+        upload = multipart.get(upload_id)
+        expected = [part.model_dump() for part in request.parts] if request and request.parts else None
+        sha256 = await multipart.finish(upload_id, expected)
+        store = get_document_store(UPLOAD_DIR)
+        document, deduplicated = store.add_document(
+            sha256, upload.filename, upload.file_type, upload.size, staged=multipart.data_path(upload_id)
+        )
+        multipart.discard(upload_id)
+        return _register_upload(store, document, deduplicated)
+
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except MultipartError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except Exception as exc:  # pragma: no cover - defensive logging
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.delete("/api/upload/multipart/{upload_id}")
+async def abort_multipart_upload(upload_id: str) -> Dict[str, Any]:
+    """Abandon an upload and free its parts."""
+    multipart = get_multipart_store(UPLOAD_DIR)
+    try:
+        multipart.get(upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    multipart.discard(upload_id)
+    return {"upload_id": upload_id, "status": "aborted"}
+
+
+def _file_entry(document: StoredDocument) -> Dict[str, Any]:
+    return {
+        "file_id": document.file_id,
+        "filename": document.filename,
+        "file_type": document.file_type,
+        "size": document.size,
+        "status": document.status,
+        "error": document.error,
+        "sha256": document.sha256,
+        "upload_date": datetime.fromtimestamp(document.created_at, timezone.utc).isoformat(),
+    }
+
+
+@router.get("/api/files")
+async def list_uploaded_files(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    sort: str = Query("created_at", description=f"One of: {', '.join(SORTABLE_FIELDS)}"),
+    order: Literal["asc", "desc"] = "desc",
+    file_type: Optional[str] = None,
+    status: Optional[str] = None,
+    uploaded_after: Optional[datetime] = None,
+    uploaded_before: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """List uploaded files, one page at a time, from the metadata catalog."""
+    if sort not in SORTABLE_FIELDS:
+        raise HTTPException(status_code=422, detail=f"sort must be one of: {', '.join(SORTABLE_FIELDS)}")
+    try:
+        documents, total = get_document_store(UPLOAD_DIR).list_documents(
+            limit=limit,
+            offset=offset,
+            sort=sort,
+            descending=order == "desc",
+            file_type=file_type,
+            status=status,
+            created_after=_timestamp(uploaded_after),
+            created_before=_timestamp(uploaded_before),
+        )
+        files: List[Dict[str, Any]] = [_file_entry(document) for document in documents]
+
+        return {"files": files, "total_files": total, "limit": limit, "offset": offset}
+    except Exception as exc:  # pragma: no cover - defensive logging
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.get("/api/files/{file_id}")
+async def get_file(file_id: str) -> Dict[str, Any]:
+    """Metadata and ingestion status for one uploaded file."""
+    store = get_document_store(UPLOAD_DIR)
+    document = store.get_document(file_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return {
+        **_file_entry(document),
+        "progress": get_ingestion_pipeline(store).progress(document.sha256),
+        "processing_results": store.get_artifact(document.sha256, "processing_results"),
+    }
+
+
+@router.get("/api/files/{file_id}/entities")
+async def get_file_entities(file_id: str, label: Optional[str] = None) -> Dict[str, Any]:
+    """Named entities of an ingested file, grouped by label (optionally only ``label``)."""
+    store = get_document_store(UPLOAD_DIR)
+    document = store.get_document(file_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    entities = store.get_artifact(document.sha256, "entities")
+    if entities is None:
+        raise HTTPException(status_code=404, detail="No entities extracted for this file")
+    if label is not None:
+        entities = {label: entities.get(label, [])}
+    return {"file_id": file_id, "entities": entities}
+
+
+@router.api_route("/api/files/{file_id}/content", methods=["GET", "HEAD"])
+async def download_file(file_id: str) -> BlobResponse:
+    """
+    The stored bytes of an uploaded file. Supports ``Range`` (one byte range,
+    e.g. a page span of a large PDF), ``If-None-Match`` and ``If-Range`` against
+    the content-hash ETag.
+    """
+    store = get_document_store(UPLOAD_DIR)
+    document = store.get_document(file_id)
+    if document is None or not store.has_blob(document.sha256):
+        raise HTTPException(status_code=404, detail="File not found")
+    return BlobResponse(
+        store.blob_path(document.sha256),
+        document.sha256,
+        document.file_type,
+        filename=document.filename,
+        size=document.size,
+    )
+
+
+async def _start_ingestion() -> None:
+    """Resume documents left mid-pipeline by a previous process."""
+    get_ingestion_pipeline(get_document_store(UPLOAD_DIR)).start()
+
+
+router.add_event_handler("startup", _start_ingestion)
+
+
+@router.get("/api/ingestion")
+async def ingestion_stats() -> Dict[str, Any]:
+    """Ingestion pipeline counters and per-stage queue depths."""
+    return get_ingestion_pipeline(get_document_store(UPLOAD_DIR)).stats()
+
+
+@router.delete("/api/files/{file_id}")
+async def delete_file(file_id: str) -> Dict[str, Any]:
+    """Delete uploaded file."""
+    try:
+        store = get_document_store(UPLOAD_DIR)
+        document = store.get_document(file_id)
+        if document is None or not store.delete_document(file_id):
+            raise HTTPException(status_code=404, detail="File not found")
+        if not store.has_blob(document.sha256):
+            # Last reference gone: its passages leave the research index too.
+            try:
+                await get_ingestion_pipeline(store).forget(document.sha256)
+            except Exception as exc:
+                # The document is already deleted; stale passages only cost search quality.
+                logger.warning("Could not remove %s from the research index: %s", document.sha256[:12], exc)
+
+        return {"file_id": file_id, "status": "deleted"}
+    except HTTPException:
+        raise
+    except Exception as exc:  # pragma: no cover - defensive logging
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+__all__ = ["router", "UploadResponse"]
@@ -0,0 +1,183 @@
+"""Named-entity extraction over OCR output with spaCy.
+
+``agents/Document_OCR.ipynb`` ran ``nlp(full_text)`` over a whole filing with
+every component of ``en_core_web_sm`` enabled, which is slow, holds the parse
+of the entire document in memory and fails once the text passes
+``nlp.max_length``. Here a document is streamed through ``nlp.pipe`` in
+page-sized chunks (long pages are split at paragraph breaks):
+
+* only the components that produce entities run (``ner``, rulers, and a shared
+  ``tok2vec``/``transformer`` only when ``ner`` listens to it); the tagger,
+  parser, lemmatizer and friends are disabled;
+* chunks are batched (``batch_size``) and can be spread over ``n_process``
+  worker processes;
+* every entity is mapped back to its character offsets in the document text
+  (pages joined by a blank line, as ``DocumentOCRResult.text``) and its page.
+
+``group_entities`` produces the label -> values summary the notebook printed,
+which the ingestion pipeline stores per blob.
+"""
+
+import logging
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+try:
+    import spacy
+
+    SPACY_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    spacy = None  # type: ignore[assignment]
+    SPACY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+NER_MODEL = os.getenv("LEGISAI_NER_MODEL", "en_core_web_sm")
+NER_BATCH_SIZE = int(os.getenv("LEGISAI_NER_BATCH_SIZE", "32"))
+# Worker processes for nlp.pipe; 1 keeps NER in the calling thread.
+NER_PROCESSES = int(os.getenv("LEGISAI_NER_PROCESSES", "1"))
+# Chunks stay far below spaCy's max_length so memory per batch stays bounded.
+MAX_CHUNK_CHARS = int(os.getenv("LEGISAI_NER_CHUNK_CHARS", "20000"))
+
+# Components whose output is entities; everything else is disabled.
+ENTITY_COMPONENTS = ("ner", "entity_ruler", "span_ruler")
+PAGE_SEPARATOR = "\n\n"
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+@dataclass
+class Entity:
+    text: str
+    label: str
+    start: int  # character offsets in the document text
+    end: int
+    page_number: int
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _split_long(text: str, limit: int) -> Iterator[Tuple[int, str]]:
+    """(offset, piece) pieces of at most ``limit`` chars, cut at paragraph breaks, else whitespace."""
+    start = 0
+    while len(text) - start > limit:
+        window = text[start:start + limit]
+        breaks = [match.end() for match in _PARAGRAPH_BREAK.finditer(window)]
+        cut = breaks[-1] if breaks else window.rfind(" ") + 1
+        if cut <= 0:
+            cut = limit
+        yield start, text[start:start + cut]
+        start += cut
+    if start < len(text):
+        yield start, text[start:]
+
+
+def page_chunks(pages: Sequence[str], max_chars: int = MAX_CHUNK_CHARS) -> Iterator[Tuple[str, Tuple[int, int]]]:
+    """(chunk text, (page number, document offset)) for every non-blank chunk of the pages."""
+    offset = 0
+    for page_number, page in enumerate(pages, start=1):
+        for start, piece in _split_long(page, max(1, max_chars)):
+            if piece.strip():
+                yield piece, (page_number, offset + start)
+        offset += len(page) + len(PAGE_SEPARATOR)
+
+
+def _components_for_entities(nlp) -> List[str]:
+    enabled = {name for name in nlp.pipe_names if name in ENTITY_COMPONENTS}
+    for name, component in nlp.pipeline:
+        # A shared tok2vec/transformer must keep running if ner reads from it.
+        if enabled & set(getattr(component, "listening_components", None) or ()):
+            enabled.add(name)
+    return [name for name in nlp.pipe_names if name in enabled]
+
+
+def load_entity_model(model: str = NER_MODEL):
+    """``model`` with everything but entity recognition disabled."""
+    if not SPACY_AVAILABLE:
+        raise RuntimeError("Entity extraction requires spaCy (pip install spacy)")
+    nlp = spacy.load(model)
+    keep = _components_for_entities(nlp)
+    nlp.select_pipes(enable=keep)
+    logger.info("Loaded %s for NER (running %s, disabled %s)", model, keep, nlp.disabled)
+    return nlp
+
+
+_nlp = None
+_nlp_failed = False
+_nlp_lock = threading.Lock()
+
+
+def get_entity_model():
+    """Process-wide NER model, or None when spaCy or LEGISAI_NER_MODEL is not installed."""
+    global _nlp, _nlp_failed
+    with _nlp_lock:
+        if _nlp is None and not _nlp_failed:
+            try:
+                _nlp = load_entity_model()
+            except (OSError, RuntimeError) as exc:
+                _nlp_failed = True
+                logger.warning("Entity extraction disabled: %s", exc)
+    return _nlp
+
+
+def extract_entities(
+    pages: Sequence[str],
+    nlp=None,
+    batch_size: int = NER_BATCH_SIZE,
+    n_process: int = NER_PROCESSES,
+    max_chars: int = MAX_CHUNK_CHARS,
+) -> List[Entity]:
+    """Entities of a document given as its page texts, in document order."""
+    nlp = nlp or get_entity_model()
+    if nlp is None:
+        raise RuntimeError("No spaCy NER model available")
+    entities = []
+    docs = nlp.pipe(page_chunks(pages, max_chars), as_tuples=True, batch_size=batch_size, n_process=max(1, n_process))
+    for doc, (page_number, offset) in docs:
+        for ent in doc.ents:
+            entities.append(
+                Entity(
+                    text=ent.text,
+                    label=ent.label_,
+                    start=offset + ent.start_char,
+                    end=offset + ent.end_char,
+                    page_number=page_number,
+                )
+            )
+    return entities
+
+
+def group_entities(entities: Sequence[Entity]) -> Dict[str, List[Dict]]:
+    """
+    Label -> distinct values, most frequent first, each with its mention count,
+    the pages it appears on and the (start, end) offsets of every mention.
+    """
+    grouped: Dict[str, Dict[str, Dict]] = {}
+    for entity in entities:
+        value = " ".join(entity.text.split())
+        entry = grouped.setdefault(entity.label, {}).setdefault(
+            value, {"text": value, "count": 0, "pages": [], "offsets": []}
+        )
+        entry["count"] += 1
+        if entity.page_number not in entry["pages"]:
+            entry["pages"].append(entity.page_number)
+        entry["offsets"].append([entity.start, entity.end])
+    return {
+        label: sorted(values.values(), key=lambda entry: (-entry["count"], entry["text"]))
+        for label, values in sorted(grouped.items())
+    }
+
+
+__all__ = [
+    "Entity",
+    "SPACY_AVAILABLE",
+    "extract_entities",
+    "get_entity_model",
+    "group_entities",
+    "load_entity_model",
+    "page_chunks",
+]
@@ -1,14 +0,0 @@
-from agents.explainability.dummy_llm import fake_llm_response
-
-def run_compliance_agent(clause):
-    """
-    Simulates an agent that checks compliance with internal or legal policies.
-    """
-    return fake_llm_response(clause)
-from agents.explainability.dummy_llm import fake_llm_response
-
-def run_compliance_agent(clause):
-    """
-    Simulates an agent that checks compliance with internal or legal policies.
-    """
-    return fake_llm_response(clause)
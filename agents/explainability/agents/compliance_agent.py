@@ -0,0 +1,10 @@
+from agents.explainability.llm_client import complete
+
+def build_compliance_prompt(clause):
+    return f"Compliance check of: {clause}"
+
+def run_compliance_agent(clause):
+    """
+    Simulates an agent that checks compliance with internal or legal policies.
+    """
+    return complete(build_compliance_prompt(clause))
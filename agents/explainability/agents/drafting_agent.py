@@ -1,7 +1,10 @@
-from agents.explainability.dummy_llm import fake_llm_response
+from agents.explainability.llm_client import complete
+
+def build_drafting_prompt(clause):
+    return f"Drafting review of: {clause}"
 
 def run_drafting_agent(clause):
     """
     Simulates an agent that suggests clearer or more concise language.
     """
-    return fake_llm_response(clause)
+    return complete(build_drafting_prompt(clause))
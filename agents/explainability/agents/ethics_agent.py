@@ -1,8 +1,11 @@
-from agents.explainability.utils.dummy_llm import fake_llm_response
+from agents.explainability.llm_client import complete
+
+def build_ethics_prompt(clause: str):
+    return f"Ethics review of: {clause}"
 
 def run_ethics_agent(clause: str):
     """
     Simulates an agent that evaluates the ethical implications of the given clause.
     Checks for fairness, bias, or potential conflicts with ethical standards.
     """
-    return fake_llm_response(f"Ethics review of: {clause}")
+    return complete(build_ethics_prompt(clause))
@@ -1,8 +1,11 @@
-from agents.explainability.utils.dummy_llm import fake_llm_response
+from agents.explainability.llm_client import complete
+
+def build_governance_prompt(clause: str):
+    return f"Governance evaluation of: {clause}"
 
 def run_governance_agent(clause: str):
     """
     Simulates an agent that checks if the clause aligns with corporate governance rules.
     Evaluates transparency, accountability, and adherence to internal policies.
     """
-    return fake_llm_response(f"Governance evaluation of: {clause}")
+    return complete(build_governance_prompt(clause))
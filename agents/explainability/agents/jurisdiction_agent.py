@@ -1,8 +1,15 @@
-from agents.explainability.utils.dummy_llm import fake_llm_response
+from agents.explainability.llm_client import complete
 
-def run_jurisdiction_agent(clause: str):
+def build_jurisdiction_prompt(clause: str, clause_parse=None):
+    prompt = f"Jurisdiction assessment of: {clause}"
+    if clause_parse and clause_parse.get("governing_law"):
+        prompt += f"\nGoverning law referenced: {', '.join(clause_parse['governing_law'])}"
+    return prompt
+
+def run_jurisdiction_agent(clause: str, clause_parse=None):
     """
     Simulates an agent that analyzes the clause under different legal jurisdictions.
     Determines regional compatibility and legal validity across countries or states.
+    Uses the governing-law references from the shared clause parse when available.
     """
-    return fake_llm_response(f"Jurisdiction assessment of: {clause}")
+    return complete(build_jurisdiction_prompt(clause, clause_parse))
@@ -1,7 +1,10 @@
-from agents.explainability.dummy_llm import fake_llm_response
+from agents.explainability.llm_client import complete
+
+def build_language_quality_prompt(clause):
+    return f"Language quality review of: {clause}"
 
 def run_language_quality_agent(clause):
     """
     Simulates an agent that ensures grammatical correctness and clarity.
     """
-    return fake_llm_response(clause)
+    return complete(build_language_quality_prompt(clause))
@@ -1,8 +1,11 @@
-from agents.explainability.utils.dummy_llm import fake_llm_response
+from agents.explainability.llm_client import complete
+
+def build_liability_prompt(clause: str):
+    return f"Liability analysis of: {clause}"
 
 def run_liability_agent(clause: str):
     """
     Simulates an agent that detects possible liability risks in the clause.
     Flags terms that could expose the party to excessive legal responsibility.
     """
-    return fake_llm_response(f"Liability analysis of: {clause}")
+    return complete(build_liability_prompt(clause))
@@ -1,8 +1,11 @@
-from agents.explainability.utils.dummy_llm import fake_llm_response
+from agents.explainability.llm_client import complete
+
+def build_negotiation_prompt(clause: str):
+    return f"Negotiation review of: {clause}"
 
 def run_negotiation_agent(clause: str):
     """
     Simulates an agent that reviews how the clause might impact negotiations.
     Identifies overly rigid terms, leverage points, and potential deal blockers.
     """
-    return fake_llm_response(f"Negotiation review of: {clause}")
+    return complete(build_negotiation_prompt(clause))
@@ -1,4 +1,17 @@
-from agents.explainability.utils.dummy_llm import fake_llm_response
+from agents.explainability.llm_client import complete
 
-def run_precedent_agent(clause: str):
-    return fake_llm_response(f"Precedent analysis of: {clause}")
+def build_precedent_prompt(clause: str, clause_parse=None, precedents=None):
+    prompt = f"Precedent analysis of: {clause}"
+    if precedents:
+        cited = "; ".join(f"{p['title']} ({p['citation']}, {p['direction']})" for p in precedents)
+        prompt += f"\nRetrieved precedents: {cited}"
+    if clause_parse and clause_parse.get("topics"):
+        prompt += f"\nTopics: {', '.join(clause_parse['topics'])}"
+    return prompt
+
+def run_precedent_agent(clause: str, clause_parse=None, precedents=None):
+    """
+    Simulates an agent that checks the clause against precedent.
+    Uses the shared clause parse and retrieved precedents when the scheduler provides them.
+    """
+    return complete(build_precedent_prompt(clause, clause_parse, precedents))
@@ -1,7 +1,10 @@
-from agents.explainability.dummy_llm import fake_llm_response
+from agents.explainability.llm_client import complete
+
+def build_risk_prompt(clause):
+    return f"Risk assessment of: {clause}"
 
 def run_risk_agent(clause):
     """
     Simulates an agent that identifies potential risks or ambiguities in the clause.
     """
-    return fake_llm_response(clause)
+    return complete(build_risk_prompt(clause))
@@ -0,0 +1,254 @@
+"""
+clause_cache.py
+---------------
+Persistent cache of cross-consistency results keyed by normalised clause text.
+
+Contracts reuse boilerplate (confidentiality, governing law, limitation of
+liability) with tiny edits, so besides exact matches on the normalised clause
+hash the cache keeps a MinHash / LSH index: a clause whose estimated Jaccard
+similarity to a cached one is above the threshold reuses that result, flagged
+with the similarity. Entries are versioned by the enabled agent set and
+evicted least-recently-used beyond ``max_entries``.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+
+# Bump when the result format or agent behaviour changes to invalidate old entries.
+CACHE_SCHEMA_VERSION = "2"
+
+DEFAULT_CACHE_PATH = Path(
+    os.getenv("CROSS_CONSISTENCY_CACHE_PATH", Path(__file__).resolve().parent / "data" / "clause_cache.sqlite3")
+)
+DEFAULT_MAX_ENTRIES = int(os.getenv("CROSS_CONSISTENCY_CACHE_MAX_ENTRIES", "50000"))
+DEFAULT_SIMILARITY_THRESHOLD = float(os.getenv("CROSS_CONSISTENCY_CACHE_SIMILARITY", "0.8"))
+
+# 16 bands x 8 rows: candidate pairs start appearing around Jaccard ~0.7;
+# candidates are then checked against the threshold on the full signature.
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1729)  # fixed seed: signatures must be stable across processes
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)
+]
+
+_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'", "–": "-", "—": "-"})
+_NON_WORD = re.compile(r"[^\w$€£%.,'\"-]+")
+
+
+def normalize_clause(clause: str) -> str:
+    """Case-fold, unify quotes/dashes and collapse whitespace and stray punctuation."""
+    text = clause.translate(_QUOTES).lower()
+    text = _NON_WORD.sub(" ", text)
+    return " ".join(text.split())
+
+
+def agent_set_version(agent_names: Iterable[str]) -> str:
+    """Version tag for results produced by a given set of agents."""
+    payload = CACHE_SCHEMA_VERSION + "|" + ",".join(sorted(agent_names))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _shingles(normalized: str) -> List[bytes]:
+    words = normalized.split()
+    if len(words) < SHINGLE_SIZE:
+        return [" ".join(words).encode("utf-8")] if words else [b""]
+    return [" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8") for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+
+def minhash_signature(normalized: str) -> List[int]:
+    base_hashes = {
+        int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "little") for shingle in _shingles(normalized)
+    }
+    return [
+        min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in base_hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimated_similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def _band_hashes(signature: List[int]) -> List[str]:
+    return [
+        hashlib.blake2b(struct.pack(f"<{LSH_ROWS}I", *signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]), digest_size=8).hexdigest()
+        for band in range(LSH_BANDS)
+    ]
+
+
+class ClauseResultCache:
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+    ):
+        self.path = Path(path)
+        self.max_entries = max(1, max_entries)
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._counters = {"exact_hits": 0, "near_duplicate_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            # WAL lets several API worker processes share the cache file.
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS clause_results (
+                    cache_key TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_clause_results_access ON clause_results (last_access);
+                CREATE TABLE IF NOT EXISTS clause_lsh (
+                    version TEXT NOT NULL,
+                    band INTEGER NOT NULL,
+                    bucket TEXT NOT NULL,
+                    cache_key TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_clause_lsh_bucket ON clause_lsh (version, band, bucket);
+                CREATE INDEX IF NOT EXISTS idx_clause_lsh_key ON clause_lsh (cache_key);
+                """
+            )
+
+    @staticmethod
+    def _key(normalized: str, version: str) -> str:
+        return hashlib.sha256(f"{version}|{normalized}".encode("utf-8")).hexdigest()
+
+    def lookup(self, clause: str, version: str) -> Optional[Tuple[Dict, Dict]]:
+        """
+        Return (result, match) for an exact or near-duplicate hit, else None.
+        ``match`` is {"type": "exact" | "near_duplicate", "similarity": float, "cache_key": str}.
+        """
+        normalized = normalize_clause(clause)
+        key = self._key(normalized, version)
+
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM clause_results WHERE cache_key = ?", (key,)).fetchone()
+            if row is not None:
+                self._touch(key)
+                self._counters["exact_hits"] += 1
+                return json.loads(row[0]), {"type": "exact", "similarity": 1.0, "cache_key": key}
+
+        signature = minhash_signature(normalized)
+        best: Optional[Tuple[float, str]] = None
+
+        with self._lock:
+            candidates = set()
+            for band, bucket in enumerate(_band_hashes(signature)):
+                rows = self._conn.execute(
+                    "SELECT cache_key FROM clause_lsh WHERE version = ? AND band = ? AND bucket = ?",
+                    (version, band, bucket),
+                ).fetchall()
+                candidates.update(candidate for (candidate,) in rows)
+
+            for candidate in candidates:
+                row = self._conn.execute(
+                    "SELECT signature FROM clause_results WHERE cache_key = ?", (candidate,)
+                ).fetchone()
+                if row is None:
+                    continue
+                similarity = estimated_similarity(signature, list(struct.unpack(f"<{NUM_PERMUTATIONS}I", row[0])))
+                if similarity >= self.similarity_threshold and (best is None or similarity > best[0]):
+                    best = (similarity, candidate)
+
+            if best is None:
+                self._counters["misses"] += 1
+                return None
+
+            row = self._conn.execute("SELECT result FROM clause_results WHERE cache_key = ?", (best[1],)).fetchone()
+            self._touch(best[1])
+            self._counters["near_duplicate_hits"] += 1
+
+        return json.loads(row[0]), {"type": "near_duplicate", "similarity": round(best[0], 4), "cache_key": best[1]}
+
+    def store(self, clause: str, version: str, result: Dict) -> str:
+        normalized = normalize_clause(clause)
+        key = self._key(normalized, version)
+        signature = minhash_signature(normalized)
+        now = time.time()
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO clause_results (cache_key, version, signature, result, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, version, struct.pack(f"<{NUM_PERMUTATIONS}I", *signature), json.dumps(result), now, now),
+            )
+            self._conn.execute("DELETE FROM clause_lsh WHERE cache_key = ?", (key,))
+            self._conn.executemany(
+                "INSERT INTO clause_lsh (version, band, bucket, cache_key) VALUES (?, ?, ?, ?)",
+                [(version, band, bucket, key) for band, bucket in enumerate(_band_hashes(signature))],
+            )
+            self._counters["stores"] += 1
+            self._evict()
+        return key
+
+    def _touch(self, key: str):
+        with self._conn:
+            self._conn.execute(
+                "UPDATE clause_results SET last_access = ?, hits = hits + 1 WHERE cache_key = ?", (time.time(), key)
+            )
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM clause_results").fetchone()
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return
+        stale = [
+            key for (key,) in self._conn.execute(
+                "SELECT cache_key FROM clause_results ORDER BY last_access LIMIT ?", (overflow,)
+            ).fetchall()
+        ]
+        self._conn.executemany("DELETE FROM clause_results WHERE cache_key = ?", [(key,) for key in stale])
+        self._conn.executemany("DELETE FROM clause_lsh WHERE cache_key = ?", [(key,) for key in stale])
+        self._counters["evictions"] += len(stale)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM clause_results").fetchone()
+            counters = dict(self._counters)
+        lookups = counters["exact_hits"] + counters["near_duplicate_hits"] + counters["misses"]
+        hits = counters["exact_hits"] + counters["near_duplicate_hits"]
+        return {
+            **counters,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "similarity_threshold": self.similarity_threshold,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[ClauseResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_clause_cache() -> Optional[ClauseResultCache]:
+    """Process-wide cache, or None when disabled with CROSS_CONSISTENCY_CACHE=0."""
+    global _cache
+    if os.getenv("CROSS_CONSISTENCY_CACHE", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ClauseResultCache()
+    return _cache
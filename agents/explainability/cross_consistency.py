@@ -4,73 +4,468 @@ cross_consistency.py
 This module orchestrates multiple specialized agents (Compliance, Risk, Drafting, etc.)
 to analyze the same legal clause and check for reasoning consistency.
 
-It aggregates responses, calculates a dummy consistency score,
+Agents and the shared artifacts they need are declared in ``registry.py``; the
+scheduler runs them as a dependency graph on a bounded thread pool with
+per-agent timeouts, so clause latency approaches the slowest agent rather than
+the sum of all of them. A slow or failing agent yields a marked partial result
+instead of failing the check, and callers can enable or disable agents per request.
+Whole contracts go through ``iter_cross_consistency_batch``, which streams
+per-clause results as they complete and ends with a contract-level summary;
+clauses of a batch that finish within a few milliseconds of each other are
+scored together in one ``score_agreement_batch`` call by a ``ScoringBatcher``.
+Results are cached per normalised clause (with near-duplicate matching) in
+``clause_cache.py``, so repeated boilerplate does not re-run every agent.
+An ``on_agent_result`` callback receives each agent's entry as soon as that
+agent finishes, which the streaming API uses to show results incrementally.
+Each run is traced (run, clause and per-agent spans) and feeds the per-agent
+latency histograms and error counters in ``telemetry.py``.
+
+It aggregates responses, scores agreement between the agents' outputs (mean
+pairwise similarity, with per-agent outlier flags, see ``utils/scoring.py``)
 and returns explainable results to the backend API.
 """
 
-from typing import List, Dict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import os
 import random
+import statistics
+import threading
+import time
+
+from agents.explainability.clause_cache import agent_set_version, get_clause_cache
+from agents.explainability.registry import DEFAULT_REGISTRY, ExecutionPlan
+from agents.explainability.scheduler import (
+    AGENT_TIMEOUT_SECONDS,
+    RunCancelled,
+    TenantExecutor,
+    get_scoring_pool,
+    new_tenant,
+    run_plan,
+)
+from agents.explainability.telemetry import Span, metrics, tracer
+from agents.explainability.utils.scoring import _as_text, score_agreement, score_agreement_batch
+
+# Clauses of one batch evaluated at the same time (their agents share the fair pool).
+MAX_PARALLEL_CLAUSES = int(os.getenv("CROSS_CONSISTENCY_MAX_PARALLEL_CLAUSES", "8"))
+# How long the first clause of a scoring batch waits for others to finish their agents.
+SCORING_BATCH_WAIT_MS = float(os.getenv("CROSS_CONSISTENCY_SCORING_BATCH_WAIT_MS", "10"))
+
+Scorer = Callable[[List], Dict]
+
+
+def _score_outputs(outputs: List) -> Dict:
+    """Agreement scoring, on the scoring process pool when one is configured."""
+    pool = get_scoring_pool()
+    if pool is None:
+        return score_agreement(outputs)
+    return pool.submit(score_agreement, outputs).result()
+
+
+def _score_outputs_batch(batch_outputs: List[List]) -> List[Dict]:
+    pool = get_scoring_pool()
+    if pool is None:
+        return score_agreement_batch(batch_outputs)
+    return pool.submit(score_agreement_batch, batch_outputs).result()
 
-# --- Import all agents ---
-from agents.explainability.agents.compliance_agent import run_compliance_agent
-from agents.explainability.agents.risk_agent import run_risk_agent
-from agents.explainability.agents.drafting_agent import run_drafting_agent
-from agents.explainability.agents.precedent_agent import run_precedent_agent
-from agents.explainability.agents.language_quality_agent import run_language_quality_agent
-from agents.explainability.agents.ethics_agent import run_ethics_agent
-from agents.explainability.agents.governance_agent import run_governance_agent
-from agents.explainability.agents.jurisdiction_agent import run_jurisdiction_agent
-from agents.explainability.agents.negotiation_agent import run_negotiation_agent
-from agents.explainability.agents.liability_agent import run_liability_agent
 
+class ScoringBatcher:
+    """
+    Scores the agent outputs of clauses that finish close together with one
+    ``score_agreement_batch`` call. ``score`` is called from clause coordinator
+    threads: the first caller of a batch waits up to ``max_wait_ms`` (or until
+    ``max_batch_size`` clauses have joined), then scores every waiting clause
+    and hands each its result.
+    """
+
+    def __init__(self, max_batch_size: int, max_wait_ms: float = SCORING_BATCH_WAIT_MS):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending: List[Tuple[List, Future]] = []
+        self._condition = threading.Condition()
+        self._counters = {"batches": 0, "clauses": 0, "largest_batch": 0}
+
+    def score(self, outputs: List) -> Dict:
+        future: Future = Future()
+        with self._condition:
+            self._pending.append((list(outputs), future))
+            leader = len(self._pending) == 1
+            self._condition.notify_all()
+            if leader:
+                deadline = time.perf_counter() + self.max_wait
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._pending = self._pending, []
+        if leader:
+            self._run_batch(batch)
+        return future.result()
 
-# --- Dummy LLM consistency simulation ---
-def _dummy_consistency_score(outputs: List[str]) -> float:
-    """Simulate a random consistency score (for demo purposes)."""
-    return round(random.uniform(0.75, 0.98), 2)
+    def _run_batch(self, batch: List[Tuple[List, Future]]):
+        try:
+            results = _score_outputs_batch([outputs for outputs, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        with self._condition:
+            self._counters["batches"] += 1
+            self._counters["clauses"] += len(batch)
+            self._counters["largest_batch"] = max(self._counters["largest_batch"], len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> Dict:
+        with self._condition:
+            return dict(self._counters)
+
+
+def _agent_entry(name: str, record: Dict) -> Dict:
+    """Per-agent view of a node record (output, confidence, status, latency)."""
+    if "confidence" not in record:
+        # Stored on the record so streamed and aggregated entries agree.
+        record["confidence"] = round(random.uniform(0.8, 0.95), 2) if record["status"] == "ok" else None
+    entry = {
+        "agent": name,
+        "output": record["output"],
+        "confidence": record["confidence"],
+        "status": record["status"],
+        "latency_ms": record["latency_ms"],
+    }
+    if "error" in record:
+        entry["error"] = record["error"]
+    if "degraded_inputs" in record:
+        entry["degraded_inputs"] = record["degraded_inputs"]
+    return entry
 
 
-def _aggregate_results(agent_outputs: Dict[str, str]) -> Dict:
-    """Combine agent results and compute a consistency metric."""
-    score = _dummy_consistency_score(list(agent_outputs.values()))
+def _aggregate_results(agent_records: Dict[str, Dict], scorer: Optional[Scorer] = None) -> Dict:
+    """Combine agent results and compute a consistency metric over the agents that succeeded."""
+    succeeded = {name: record["output"] for name, record in agent_records.items() if record["status"] == "ok"}
+    failed = [name for name, record in agent_records.items() if record["status"] != "ok"]
+
+    agreement = (scorer or _score_outputs)(list(succeeded.values()))
+    per_agent = {
+        name: (value, outlier)
+        for name, value, outlier in zip(succeeded, agreement["agreement"], agreement["outliers"])
+    }
+    outlier_agents = [name for name, (_, outlier) in per_agent.items() if outlier]
+
+    summary = "Cross-consistency check completed successfully."
+    if failed:
+        summary = f"Cross-consistency check completed with {len(failed)} of {len(agent_records)} agents unavailable."
+
+    outputs = []
+    for name, record in agent_records.items():
+        entry = _agent_entry(name, record)
+        if name in per_agent:
+            entry["agreement"], entry["outlier"] = per_agent[name]
+        outputs.append(entry)
+
     return {
-        "summary": "Cross-consistency check completed successfully.",
-        "consistency_score": score,
-        "outputs": [
-            {"agent": name, "output": output, "confidence": round(random.uniform(0.8, 0.95), 2)}
-            for name, output in agent_outputs.items()
-        ]
+        "summary": summary,
+        "consistency_score": agreement["consistency_score"],
+        "partial": bool(failed),
+        "failed_agents": failed,
+        "outlier_agents": outlier_agents,
+        "agreement_matrix": {"agents": list(succeeded), "similarity": agreement["similarity"]},
+        "outputs": outputs,
     }
 
 
-def run_cross_consistency(clause: str) -> Dict:
+def _evaluate_clause(
+    clause: str,
+    plan: ExecutionPlan,
+    agent_timeout: Optional[float],
+    executor: Optional[TenantExecutor] = None,
+    cancel_event: Optional[threading.Event] = None,
+    on_agent_result: Optional[Callable[[Dict], None]] = None,
+    span: Optional[Span] = None,
+    scorer: Optional[Scorer] = None,
+) -> Dict:
+    """Run the agent graph for one clause and aggregate it with latency details."""
+    started = time.perf_counter()
+    agent_set = set(plan.agents)
+
+    def on_record(name: str, record: Dict):
+        is_agent = name in agent_set
+        if is_agent:
+            metrics.observe_agent(name, record["status"], record["latency_ms"])
+        if span is not None:
+            attributes = {
+                "node": name,
+                "output_chars": len(_as_text(record["output"])),
+                "error": record.get("error"),
+                "degraded_inputs": record.get("degraded_inputs"),
+                **record.get("usage", {}),
+            }
+            tracer.record_span(
+                f"{'agent' if is_agent else 'artifact'}.{name}", span, record["latency_ms"], record["status"], **attributes
+            )
+        if is_agent and on_agent_result is not None:
+            on_agent_result(_agent_entry(name, record))
+
+    # --- Run the agent graph on the same clause, concurrently ---
+    timeout = agent_timeout if agent_timeout is not None else AGENT_TIMEOUT_SECONDS
+    node_records = run_plan(plan, clause, timeout, executor, cancel_event, on_record)
+    agent_records = {name: node_records[name] for name in plan.agents}
+
+    # --- Aggregate and compute consistency ---
+    result = _aggregate_results(agent_records, scorer)
+    result["artifacts"] = {
+        name: {key: value for key, value in record.items() if key != "output"}
+        for name, record in node_records.items()
+        if name not in agent_records
+    }
+    result["latency_ms"] = {
+        "total": round((time.perf_counter() - started) * 1000, 2),
+        "agents": {name: record["latency_ms"] for name, record in agent_records.items()},
+        "artifacts": {name: record["latency_ms"] for name, record in result["artifacts"].items()},
+    }
+    return result
+
+
+def _evaluate_with_cache(
+    clause: str,
+    plan: ExecutionPlan,
+    agent_timeout: Optional[float],
+    executor: Optional[TenantExecutor] = None,
+    use_cache: bool = True,
+    cancel_event: Optional[threading.Event] = None,
+    on_agent_result: Optional[Callable[[Dict], None]] = None,
+    span: Optional[Span] = None,
+    scorer: Optional[Scorer] = None,
+) -> Dict:
+    """Serve the clause from the result cache when possible, otherwise evaluate and store it."""
+    cache = get_clause_cache() if use_cache else None
+    version = agent_set_version(plan.agents)
+
+    if cache is not None:
+        try:
+            hit = cache.lookup(clause, version)
+        except Exception as e:
+            print(f"⚠️ Clause cache lookup failed: {e}")
+            hit = None
+        if hit is not None:
+            result, match = hit
+            result["cache"] = {"hit": True, **match}
+            if on_agent_result is not None:
+                for entry in result.get("outputs", []):
+                    on_agent_result({**entry, "cached": True})
+            return result
+
+    result = _evaluate_clause(clause, plan, agent_timeout, executor, cancel_event, on_agent_result, span, scorer)
+
+    # Partial results reflect a transient failure; don't let them stick.
+    if cache is not None and not result.get("partial"):
+        try:
+            cache.store(clause, version, result)
+        except Exception as e:
+            print(f"⚠️ Clause cache store failed: {e}")
+    result["cache"] = {"hit": False}
+    return result
+
+
+def _traced_evaluate(
+    clause: str,
+    plan: ExecutionPlan,
+    agent_timeout: Optional[float],
+    executor: Optional[TenantExecutor] = None,
+    use_cache: bool = True,
+    cancel_event: Optional[threading.Event] = None,
+    on_agent_result: Optional[Callable[[Dict], None]] = None,
+    parent: Optional[Span] = None,
+    trace_id: Optional[str] = None,
+    scorer: Optional[Scorer] = None,
+) -> Dict:
+    """Evaluate one clause inside a "cross_consistency.clause" span and record run metrics."""
+    span = tracer.start_span(
+        "cross_consistency.clause", parent=parent, trace_id=trace_id, clause_chars=len(clause), agents=len(plan.agents)
+    )
+    try:
+        result = _evaluate_with_cache(
+            clause, plan, agent_timeout, executor, use_cache, cancel_event, on_agent_result, span, scorer
+        )
+    except RunCancelled:
+        tracer.end_span(span, status="cancelled")
+        metrics.observe_run("cancelled", False, span.duration_ms)
+        raise
+    except Exception as e:
+        tracer.end_span(span, status="error", error=str(e))
+        metrics.observe_run("error", False, span.duration_ms)
+        raise
+
+    cache_hit = result["cache"]["hit"]
+    outcome = "partial" if result.get("partial") else "ok"
+    tracer.end_span(
+        span,
+        status=outcome,
+        cache_hit=cache_hit,
+        cache_type=result["cache"].get("type"),
+        consistency_score=result.get("consistency_score"),
+        failed_agents=result.get("failed_agents"),
+    )
+    metrics.observe_run(outcome, cache_hit, span.duration_ms)
+    result["trace_id"] = span.trace_id
+    return result
+
+
+def run_cross_consistency(
+    clause: str,
+    agent_timeout: Optional[float] = None,
+    agents: Optional[Iterable[str]] = None,
+    exclude_agents: Optional[Iterable[str]] = None,
+    use_cache: bool = True,
+    cancel_event: Optional[threading.Event] = None,
+    on_agent_result: Optional[Callable[[Dict], None]] = None,
+    trace_id: Optional[str] = None,
+) -> Dict:
     """
-    Run all 10 agents on a given clause and check consistency.
+    Run the enabled agents (all 10 by default) on a given clause and check consistency.
     Returns a unified explainable result for visualization in HITL dashboard.
+    ``on_agent_result`` is called with each agent's entry as it completes. The
+    run is traced under ``trace_id`` (generated if omitted), returned in the result.
+
+    Raises ValueError for an invalid agent selection and RunCancelled once
+    ``cancel_event`` is set.
     """
+    agent_names = DEFAULT_REGISTRY.select_agents(agents, exclude_agents)
+    plan = DEFAULT_REGISTRY.build_plan(agent_names)
+
     try:
         print(f"\n🔍 Running cross-consistency check for clause:\n{clause}\n")
-
-        # --- Run all agents on the same clause ---
-        agent_outputs = {
-            "ComplianceAgent": run_compliance_agent(clause),
-            "RiskAgent": run_risk_agent(clause),
-            "DraftingAgent": run_drafting_agent(clause),
-            "PrecedentAgent": run_precedent_agent(clause),
-            "LanguageQualityAgent": run_language_quality_agent(clause),
-            "EthicsAgent": run_ethics_agent(clause),
-            "GovernanceAgent": run_governance_agent(clause),
-            "JurisdictionAgent": run_jurisdiction_agent(clause),
-            "NegotiationAgent": run_negotiation_agent(clause),
-            "LiabilityAgent": run_liability_agent(clause)
-        }
-
-        # --- Aggregate and compute consistency ---
-        result = _aggregate_results(agent_outputs)
-
+        result = _traced_evaluate(
+            clause,
+            plan,
+            agent_timeout,
+            use_cache=use_cache,
+            cancel_event=cancel_event,
+            on_agent_result=on_agent_result,
+            trace_id=trace_id,
+        )
         print(f"✅ Cross-consistency check finished. Score: {result['consistency_score']}\n")
         return result
 
+    except RunCancelled:
+        print("⏹️ Cross-consistency check cancelled.")
+        raise
+
     except Exception as e:
         print(f"❌ Error during cross-consistency execution: {e}")
         return {"error": str(e)}
+
+
+def summarize_contract(clause_results: List[Dict]) -> Dict:
+    """Aggregate per-clause consistency into a contract-level summary."""
+    scored = [
+        (item["index"], item["result"]["consistency_score"])
+        for item in clause_results
+        if item["result"].get("consistency_score") is not None
+    ]
+    scores = [score for _, score in scored]
+
+    failed_agent_counts: Dict[str, int] = {}
+    outlier_agent_counts: Dict[str, int] = {}
+    for item in clause_results:
+        for name in item["result"].get("failed_agents", []):
+            failed_agent_counts[name] = failed_agent_counts.get(name, 0) + 1
+        for name in item["result"].get("outlier_agents", []):
+            outlier_agent_counts[name] = outlier_agent_counts.get(name, 0) + 1
+
+    return {
+        "clauses": len(clause_results),
+        "scored_clauses": len(scores),
+        "errored_clauses": [item["index"] for item in clause_results if "error" in item["result"]],
+        "partial_clauses": [item["index"] for item in clause_results if item["result"].get("partial")],
+        "consistency_score": {
+            "mean": round(statistics.fmean(scores), 4) if scores else None,
+            "median": round(statistics.median(scores), 4) if scores else None,
+            "min": min(scores) if scores else None,
+        },
+        # Lowest-consistency clauses are the ones a reviewer should read first.
+        "lowest_consistency_clauses": [index for index, _ in sorted(scored, key=lambda pair: pair[1])[:5]],
+        "failed_agent_counts": failed_agent_counts,
+        "outlier_agent_counts": outlier_agent_counts,
+        "cache_hits": sum(1 for item in clause_results if item["result"].get("cache", {}).get("hit")),
+    }
+
+
+def iter_cross_consistency_batch(
+    clauses: List[str],
+    agent_timeout: Optional[float] = None,
+    agents: Optional[Iterable[str]] = None,
+    exclude_agents: Optional[Iterable[str]] = None,
+    max_parallel_clauses: Optional[int] = None,
+    use_cache: bool = True,
+    cancel_event: Optional[threading.Event] = None,
+    trace_id: Optional[str] = None,
+) -> Iterator[Dict]:
+    """
+    Evaluate many clauses, yielding {"type": "clause", "index", "clause", "result"}
+    events in completion order and finally one {"type": "summary", ...} event.
+
+    Up to ``max_parallel_clauses`` clauses are in flight at once. All of their
+    clause x agent work runs on the shared fair pool under a single tenant, so
+    the batch gets one fair share alongside other requests. Raises ValueError
+    for an invalid agent selection. Closing the generator early (or setting
+    ``cancel_event``) stops clauses that are still running. Every clause is a
+    child span of one "cross_consistency.batch" trace, whose id is in the summary.
+    Clauses whose agents finish together are scored in one batched call.
+    """
+    agent_names = DEFAULT_REGISTRY.select_agents(agents, exclude_agents)
+    plan = DEFAULT_REGISTRY.build_plan(agent_names)
+    tenant = new_tenant("batch")
+    cancel_event = cancel_event or threading.Event()
+    parallel = max(1, min(max_parallel_clauses or MAX_PARALLEL_CLAUSES, len(clauses) or 1))
+
+    print(f"\n📑 Running batch cross-consistency for {len(clauses)} clauses ({parallel} in parallel)\n")
+    started = time.perf_counter()
+    completed: List[Dict] = []
+    batch_span = tracer.start_span("cross_consistency.batch", trace_id=trace_id, clauses=len(clauses), agents=len(plan.agents))
+    batcher = ScoringBatcher(parallel)
+
+    # Coordinator threads only wait on their clause's graph; agents run on the fair pool.
+    coordinators = ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="cross-consistency-batch")
+    try:
+        futures = {
+            coordinators.submit(
+                _traced_evaluate,
+                clause,
+                plan,
+                agent_timeout,
+                tenant,
+                use_cache,
+                cancel_event,
+                None,
+                batch_span,
+                scorer=batcher.score,
+            ): index
+            for index, clause in enumerate(clauses)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except RunCancelled:
+                continue
+            except Exception as e:
+                result = {"error": str(e)}
+            item = {"type": "clause", "index": index, "clause": clauses[index], "result": result}
+            completed.append(item)
+            yield item
+    finally:
+        # If the consumer stops early (client disconnected), drop clauses not yet
+        # started and stop the agents of those in flight.
+        finished = len(completed) == len(clauses)
+        cancel_event.set()
+        coordinators.shutdown(wait=False, cancel_futures=True)
+        tracer.end_span(batch_span, status="ok" if finished else "cancelled", completed_clauses=len(completed))
+
+    summary = summarize_contract(completed)
+    summary["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    summary["trace_id"] = batch_span.trace_id
+    summary["scoring"] = batcher.stats()
+    print(f"✅ Batch cross-consistency finished. Mean score: {summary['consistency_score']['mean']}\n")
+    yield {"type": "summary", **summary}
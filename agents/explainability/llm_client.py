@@ -0,0 +1,205 @@
+"""
+llm_client.py
+-------------
+Model access for the explainability agents, with batched inference.
+
+Every agent builds its own prompt around the same clause. When a model server
+is configured (EXPLAINABILITY_LLM_BASE_URL, any OpenAI-compatible completions
+endpoint such as vLLM or llama.cpp), ``complete`` does not call it directly:
+prompts arriving from concurrently running agents are collected for a few
+milliseconds by a ``PromptBatcher`` and sent as one batched generation
+request, and each output is routed back to the agent that asked for it. All
+agents of a clause, and of every clause in a contract batch, therefore share
+batched prefills instead of making ten separate calls.
+
+If batching is disabled or a batched request fails, each agent falls back to
+its own single call. Without a configured server, agents use the local
+``dummy_llm.fake_llm_response``, as before.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import os
+import threading
+import time
+
+from agents.explainability.dummy_llm import fake_llm_response
+from agents.explainability.telemetry import annotate
+
+LLM_BASE_URL = os.getenv("EXPLAINABILITY_LLM_BASE_URL", "")
+LLM_MODEL = os.getenv("EXPLAINABILITY_LLM_MODEL", "default")
+LLM_API_KEY = os.getenv("EXPLAINABILITY_LLM_API_KEY", "not-needed")
+LLM_MAX_TOKENS = int(os.getenv("EXPLAINABILITY_LLM_MAX_TOKENS", "256"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("EXPLAINABILITY_LLM_TIMEOUT", "60"))
+
+BATCHING_ENABLED = os.getenv("EXPLAINABILITY_LLM_BATCHING", "1") != "0"
+MAX_BATCH_SIZE = int(os.getenv("EXPLAINABILITY_LLM_MAX_BATCH", "32"))
+# How long the first prompt of a batch waits for others to join it.
+BATCH_WAIT_MS = float(os.getenv("EXPLAINABILITY_LLM_BATCH_WAIT_MS", "15"))
+# Batched requests in flight at once; later prompts form the next batch meanwhile.
+MAX_INFLIGHT_BATCHES = int(os.getenv("EXPLAINABILITY_LLM_INFLIGHT_BATCHES", "4"))
+
+
+class BatchUnavailable(Exception):
+    """The batched request failed; callers should make their own single call."""
+
+
+class OpenAICompatibleBackend:
+    """Completions client for a model server that accepts a list of prompts per request."""
+
+    def __init__(self, base_url: str, model: str, api_key: str, max_tokens: int, timeout: float):
+        from openai import OpenAI  # imported lazily: only needed with a real model server
+
+        self.model = model
+        self.max_tokens = max_tokens
+        self._client = OpenAI(base_url=base_url, api_key=api_key, timeout=timeout)
+
+    def generate_batch(self, prompts: List[str]) -> List[str]:
+        response = self._client.completions.create(
+            model=self.model,
+            prompt=prompts,
+            max_tokens=self.max_tokens,
+            temperature=0,
+        )
+        # Choices are not guaranteed to come back in prompt order.
+        outputs: List[Optional[str]] = [None] * len(prompts)
+        for choice in response.choices:
+            outputs[choice.index] = choice.text.strip()
+        if any(output is None for output in outputs):
+            raise ValueError(f"Model server returned {len(response.choices)} choices for {len(prompts)} prompts")
+        return outputs
+
+    def generate(self, prompt: str) -> str:
+        return self.generate_batch([prompt])[0]
+
+
+class PromptBatcher:
+    """
+    Collects prompts submitted from many threads and flushes them as batches of
+    up to ``max_batch_size``, at most ``max_wait_ms`` after the first one arrived.
+    ``submit`` returns a Future that resolves to that prompt's output, or fails
+    with BatchUnavailable if the batched request failed.
+    """
+
+    def __init__(self, backend, max_batch_size: int, max_wait_ms: float, max_inflight: int):
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending: List[Tuple[str, Future]] = []
+        self._first_arrival = 0.0
+        self._condition = threading.Condition()
+        self._dispatch = ThreadPoolExecutor(max_workers=max(1, max_inflight), thread_name_prefix="llm-batch")
+        self._counters = {"batches": 0, "prompts": 0, "failed_batches": 0, "largest_batch": 0}
+        threading.Thread(target=self._collect, name="llm-batcher", daemon=True).start()
+
+    def submit(self, prompt: str) -> Future:
+        future: Future = Future()
+        with self._condition:
+            if not self._pending:
+                self._first_arrival = time.perf_counter()
+            self._pending.append((prompt, future))
+            self._condition.notify()
+        return future
+
+    def _collect(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                deadline = self._first_arrival + self.max_wait
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._pending[: self.max_batch_size]
+                del self._pending[: self.max_batch_size]
+                if self._pending:
+                    self._first_arrival = time.perf_counter()
+            self._dispatch.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: List[Tuple[str, Future]]):
+        prompts = [prompt for prompt, _ in batch]
+        try:
+            outputs = self.backend.generate_batch(prompts)
+        except Exception as e:
+            print(f"⚠️ Batched generation of {len(prompts)} prompts failed, falling back to per-agent calls: {e}")
+            with self._condition:
+                self._counters["failed_batches"] += 1
+            for _, future in batch:
+                future.set_exception(BatchUnavailable(str(e)))
+            return
+
+        with self._condition:
+            self._counters["batches"] += 1
+            self._counters["prompts"] += len(prompts)
+            self._counters["largest_batch"] = max(self._counters["largest_batch"], len(prompts))
+        for (_, future), output in zip(batch, outputs):
+            future.set_result(output)
+
+    def stats(self) -> Dict:
+        with self._condition:
+            counters = dict(self._counters)
+            queued = len(self._pending)
+        return {
+            **counters,
+            "queued": queued,
+            "mean_batch_size": round(counters["prompts"] / counters["batches"], 2) if counters["batches"] else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+_backend: Optional[OpenAICompatibleBackend] = None
+_batcher: Optional[PromptBatcher] = None
+_init_lock = threading.Lock()
+_initialised = False
+
+
+def _init():
+    global _backend, _batcher, _initialised
+    with _init_lock:
+        if _initialised:
+            return
+        _initialised = True
+        if not LLM_BASE_URL:
+            return
+        try:
+            _backend = OpenAICompatibleBackend(LLM_BASE_URL, LLM_MODEL, LLM_API_KEY, LLM_MAX_TOKENS, LLM_TIMEOUT_SECONDS)
+        except Exception as e:
+            print(f"⚠️ Model server client unavailable ({e}); using the local dummy LLM.")
+            return
+        if BATCHING_ENABLED:
+            _batcher = PromptBatcher(_backend, MAX_BATCH_SIZE, BATCH_WAIT_MS, MAX_INFLIGHT_BATCHES)
+
+
+def _single_completion(prompt: str) -> str:
+    if _backend is None:
+        return fake_llm_response(prompt)
+    return _backend.generate(prompt)
+
+
+def complete(prompt: str) -> str:
+    """One agent's completion; joins a shared batch when batching is available."""
+    _init()
+    output = None
+    if _batcher is not None:
+        try:
+            output = _batcher.submit(prompt).result()
+            annotate(batched_calls=1)
+        except BatchUnavailable:
+            pass
+    if output is None:
+        output = _single_completion(prompt)
+    # Picked up by the scheduler and reported on the agent's span.
+    annotate(llm_calls=1, prompt_chars=len(prompt), output_chars=len(output))
+    return output
+
+
+def llm_stats() -> Dict:
+    _init()
+    return {
+        "backend": "openai_compatible" if _backend is not None else "dummy",
+        "model": LLM_MODEL if _backend is not None else None,
+        "batching": _batcher.stats() if _batcher is not None else None,
+    }
@@ -0,0 +1,161 @@
+"""
+registry.py
+-----------
+Declarative registry of the explainability agents and the shared artifacts they consume.
+
+Each node declares the inputs it needs by name. Artifacts (a clause parse, one
+retrieval call, ...) are computed once per request and handed to every agent
+that lists them, instead of each agent redoing the work. ``build_plan`` turns a
+selection of agents into a dependency-ordered execution plan for the scheduler.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from agents.explainability.agents.compliance_agent import run_compliance_agent
+from agents.explainability.agents.risk_agent import run_risk_agent
+from agents.explainability.agents.drafting_agent import run_drafting_agent
+from agents.explainability.agents.precedent_agent import run_precedent_agent
+from agents.explainability.agents.language_quality_agent import run_language_quality_agent
+from agents.explainability.agents.ethics_agent import run_ethics_agent
+from agents.explainability.agents.governance_agent import run_governance_agent
+from agents.explainability.agents.jurisdiction_agent import run_jurisdiction_agent
+from agents.explainability.agents.negotiation_agent import run_negotiation_agent
+from agents.explainability.agents.liability_agent import run_liability_agent
+from agents.explainability.utils.clause_parser import parse_clause
+from agents.explainability.utils.precedent_lookup import retrieve_precedents
+
+# The request input every plan starts from.
+CLAUSE = "clause"
+
+
+@dataclass(frozen=True)
+class NodeSpec:
+    """One unit of work: an agent (reported in results) or a shared artifact."""
+
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = (CLAUSE,)
+    is_agent: bool = True
+    description: str = ""
+
+
+@dataclass
+class ExecutionPlan:
+    """Nodes needed for one request, in dependency order, plus their upstream edges."""
+
+    agents: List[str]
+    nodes: List[NodeSpec]
+    dependencies: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+
+class AgentRegistry:
+    def __init__(self):
+        self._nodes: Dict[str, NodeSpec] = {}
+
+    def register_artifact(self, name: str, func: Callable[..., Any], inputs: Iterable[str] = (CLAUSE,), description: str = ""):
+        self._register(NodeSpec(name, func, tuple(inputs), is_agent=False, description=description))
+
+    def register_agent(self, name: str, func: Callable[..., Any], inputs: Iterable[str] = (CLAUSE,), description: str = ""):
+        self._register(NodeSpec(name, func, tuple(inputs), is_agent=True, description=description))
+
+    def _register(self, spec: NodeSpec):
+        if spec.name == CLAUSE or spec.name in self._nodes:
+            raise ValueError(f"Duplicate registry node: {spec.name}")
+        self._nodes[spec.name] = spec
+
+    @property
+    def agent_names(self) -> List[str]:
+        return [name for name, spec in self._nodes.items() if spec.is_agent]
+
+    def select_agents(self, include: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None) -> List[str]:
+        """Resolve a per-request agent selection, keeping registry order."""
+        include = list(include) if include else None
+        exclude = set(exclude or [])
+
+        unknown = [name for name in (include or []) + sorted(exclude) if name not in self.agent_names]
+        if unknown:
+            raise ValueError(f"Unknown agents: {', '.join(unknown)}. Available: {', '.join(self.agent_names)}")
+
+        selected = [name for name in self.agent_names if (include is None or name in include) and name not in exclude]
+        if not selected:
+            raise ValueError("At least one agent must be enabled.")
+        return selected
+
+    def build_plan(self, agent_names: Iterable[str]) -> ExecutionPlan:
+        """Collect the selected agents and the artifacts they transitively need, topologically sorted."""
+        ordered: List[NodeSpec] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str, path: Tuple[str, ...]):
+            if name == CLAUSE or state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + (name,))}")
+            spec = self._nodes.get(name)
+            if spec is None:
+                raise ValueError(f"Node {path[-1] if path else name} needs unknown input: {name}")
+
+            state[name] = "visiting"
+            for upstream in spec.inputs:
+                visit(upstream, path + (name,))
+            state[name] = "done"
+            ordered.append(spec)
+
+        agents = list(agent_names)
+        for name in agents:
+            visit(name, ())
+
+        dependencies = {spec.name: tuple(i for i in spec.inputs if i != CLAUSE) for spec in ordered}
+        return ExecutionPlan(agents=agents, nodes=ordered, dependencies=dependencies)
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": spec.name,
+                "kind": "agent" if spec.is_agent else "artifact",
+                "inputs": list(spec.inputs),
+                "description": spec.description,
+            }
+            for spec in self._nodes.values()
+        ]
+
+
+def build_default_registry() -> AgentRegistry:
+    registry = AgentRegistry()
+
+    # --- Shared artifacts ---
+    registry.register_artifact("clause_parse", parse_clause, description="Structural parse of the clause.")
+    registry.register_artifact(
+        "precedents",
+        retrieve_precedents,
+        inputs=(CLAUSE, "clause_parse"),
+        description="One hybrid retrieval call over the case-law corpus.",
+    )
+
+    # --- Agents ---
+    registry.register_agent("ComplianceAgent", run_compliance_agent, description="Policy and regulatory compliance.")
+    registry.register_agent("RiskAgent", run_risk_agent, description="Risks and ambiguities.")
+    registry.register_agent("DraftingAgent", run_drafting_agent, description="Clearer or more concise wording.")
+    registry.register_agent(
+        "PrecedentAgent",
+        run_precedent_agent,
+        inputs=(CLAUSE, "clause_parse", "precedents"),
+        description="Alignment with retrieved precedent.",
+    )
+    registry.register_agent("LanguageQualityAgent", run_language_quality_agent, description="Grammar and clarity.")
+    registry.register_agent("EthicsAgent", run_ethics_agent, description="Fairness and ethical conflicts.")
+    registry.register_agent("GovernanceAgent", run_governance_agent, description="Corporate governance alignment.")
+    registry.register_agent(
+        "JurisdictionAgent",
+        run_jurisdiction_agent,
+        inputs=(CLAUSE, "clause_parse"),
+        description="Validity across jurisdictions.",
+    )
+    registry.register_agent("NegotiationAgent", run_negotiation_agent, description="Negotiation leverage and blockers.")
+    registry.register_agent("LiabilityAgent", run_liability_agent, description="Liability exposure.")
+
+    return registry
+
+
+DEFAULT_REGISTRY = build_default_registry()
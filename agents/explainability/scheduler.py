@@ -0,0 +1,268 @@
+"""
+scheduler.py
+------------
+Executes an ExecutionPlan from the agent registry on a bounded thread pool.
+
+Nodes are submitted as soon as their upstream artifacts are available, so
+independent agents run in parallel and shared artifacts are computed once.
+Every node has its own timeout measured from when it actually starts; a node
+that fails or times out is recorded as such, and downstream nodes still run
+with ``None`` for the missing input (marked as degraded) rather than failing
+the whole request.
+
+All requests share one FairExecutor: work is queued per tenant (a single
+clause request, or a whole batch) and workers serve tenants round-robin, so a
+300-clause contract cannot starve a concurrent single-clause check.
+
+Request orchestration (waiting on a clause's graph) runs on its own sized
+thread pool so the API event loop never blocks, and agreement scoring can be
+moved to a process pool for CPU-heavy batches. A run can be cancelled through
+a ``threading.Event`` (e.g. when the client disconnects): nodes that have not
+started are dropped and the run raises ``RunCancelled``.
+"""
+
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+
+from agents.explainability.registry import CLAUSE, ExecutionPlan
+from agents.explainability.telemetry import reset_annotations, take_annotations
+
+MAX_AGENT_WORKERS = int(os.getenv("CROSS_CONSISTENCY_MAX_WORKERS", "12"))
+AGENT_TIMEOUT_SECONDS = float(os.getenv("CROSS_CONSISTENCY_AGENT_TIMEOUT", "30"))
+# Concurrent single-clause requests being orchestrated per API worker process.
+REQUEST_WORKERS = int(os.getenv("CROSS_CONSISTENCY_REQUEST_WORKERS", "16"))
+# Processes for agreement scoring; 0 scores on the calling thread.
+SCORING_PROCESSES = int(os.getenv("CROSS_CONSISTENCY_SCORING_PROCESSES", "0"))
+# How often a cancellable run checks its cancel event while agents are busy.
+CANCEL_POLL_SECONDS = 0.1
+
+
+class RunCancelled(Exception):
+    """Raised by run_plan when the caller's cancel event is set mid-run."""
+
+
+class FairExecutor:
+    """
+    Bounded worker pool with per-tenant FIFO queues served round-robin.
+
+    ``tenant(key)`` returns an executor-like view whose ``submit`` enqueues
+    under that tenant; futures are standard ``concurrent.futures.Future``s.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "fair-executor"):
+        self.max_workers = max(1, max_workers)
+        self._queues: "OrderedDict[Hashable, Deque[Tuple[Future, Callable, tuple, dict]]]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{thread_name_prefix}-{index}", daemon=True)
+            for index in range(self.max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn: Callable, *args, tenant: Hashable = "default", **kwargs) -> Future:
+        future: Future = Future()
+        with self._condition:
+            self._queues.setdefault(tenant, deque()).append((future, fn, args, kwargs))
+            self._condition.notify()
+        return future
+
+    def tenant(self, key: Hashable) -> "TenantExecutor":
+        return TenantExecutor(self, key)
+
+    def queue_depths(self) -> Dict[Hashable, int]:
+        with self._condition:
+            return {key: len(queue) for key, queue in self._queues.items()}
+
+    def _next_task(self):
+        # Rotate tenants: take from the first tenant, then move it to the back.
+        tenant, queue = next(iter(self._queues.items()))
+        task = queue.popleft()
+        if queue:
+            self._queues.move_to_end(tenant)
+        else:
+            del self._queues[tenant]
+        return task
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while not self._queues:
+                    self._condition.wait()
+                future, fn, args, kwargs = self._next_task()
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+class TenantExecutor:
+    """View of a FairExecutor that submits all work under one tenant key."""
+
+    def __init__(self, executor: FairExecutor, key: Hashable):
+        self._executor = executor
+        self.key = key
+        self.max_workers = executor.max_workers
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        return self._executor.submit(fn, *args, tenant=self.key, **kwargs)
+
+
+_default_executor = FairExecutor(max_workers=MAX_AGENT_WORKERS, thread_name_prefix="cross-consistency-agent")
+_tenant_ids = itertools.count()
+
+
+def new_tenant(prefix: str = "request") -> TenantExecutor:
+    """Executor view for one request (or one batch) on the shared fair pool."""
+    return _default_executor.tenant(f"{prefix}-{next(_tenant_ids)}")
+
+
+_request_executor: Optional[ThreadPoolExecutor] = None
+_scoring_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_request_executor() -> ThreadPoolExecutor:
+    """Dedicated pool that runs request orchestration off the API event loop."""
+    global _request_executor
+    with _pool_lock:
+        if _request_executor is None:
+            _request_executor = ThreadPoolExecutor(
+                max_workers=max(1, REQUEST_WORKERS), thread_name_prefix="cross-consistency-request"
+            )
+    return _request_executor
+
+
+def get_scoring_pool() -> Optional[ProcessPoolExecutor]:
+    """Process pool for CPU-bound scoring, or None when CROSS_CONSISTENCY_SCORING_PROCESSES is 0."""
+    global _scoring_pool
+    if SCORING_PROCESSES <= 0:
+        return None
+    with _pool_lock:
+        if _scoring_pool is None:
+            # spawn: forking a process that already runs agent threads is unsafe.
+            _scoring_pool = ProcessPoolExecutor(
+                max_workers=SCORING_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+            )
+    return _scoring_pool
+
+
+def _timed_call(name: str, func: Callable[..., Any], kwargs: Dict[str, Any], started_at: Dict[str, float]):
+    """Run one node on a worker thread, recording when it actually started and what it reported."""
+    started_at[name] = time.perf_counter()
+    reset_annotations()
+    output = func(**kwargs)
+    return output, time.perf_counter() - started_at[name], take_annotations()
+
+
+def _dependency_depth(plan: ExecutionPlan) -> int:
+    depth: Dict[str, int] = {}
+    for spec in plan.nodes:
+        depth[spec.name] = 1 + max((depth[dep] for dep in plan.dependencies[spec.name]), default=0)
+    return max(depth.values(), default=1)
+
+
+def run_plan(
+    plan: ExecutionPlan,
+    clause: str,
+    timeout: float = AGENT_TIMEOUT_SECONDS,
+    executor: Optional[TenantExecutor] = None,
+    cancel_event: Optional[threading.Event] = None,
+    on_record: Optional[Callable[[str, Dict], None]] = None,
+) -> Dict[str, Dict]:
+    """
+    Run every node of the plan and return one record per node:
+    {"status": "ok" | "error" | "timeout", "output": Any, "latency_ms": float | None,
+     "error": str?, "degraded_inputs": [str]?, "usage": {prompt_chars, ...}?}
+
+    Python threads cannot be killed; a timed-out node keeps its worker until it
+    returns, but its result is discarded. The same applies to nodes already
+    running when ``cancel_event`` is set; queued ones never start.
+    ``on_record(name, record)`` is called as each node finishes, for streaming.
+    """
+    executor = executor or new_tenant()
+    workers = executor.max_workers
+
+    values: Dict[str, Any] = {CLAUSE: clause}
+    records: Dict[str, Dict] = {}
+    waiting = {spec.name: spec for spec in plan.nodes}
+    started_at: Dict[str, float] = {}
+    pending: Dict[Future, str] = {}
+
+    # Upper bound for nodes that never get a worker because others are stuck.
+    levels = _dependency_depth(plan) + len(plan.nodes) // max(1, workers) + 1
+    overall_deadline = time.perf_counter() + timeout * levels
+
+    def submit_ready():
+        for name, spec in list(waiting.items()):
+            upstream = plan.dependencies[name]
+            if all(dep in records for dep in upstream):
+                kwargs = {key: values.get(key) for key in spec.inputs}
+                pending[executor.submit(_timed_call, name, spec.func, kwargs, started_at)] = name
+                del waiting[name]
+
+    def finish(name: str, record: Dict):
+        degraded = [dep for dep in plan.dependencies[name] if records[dep]["status"] != "ok"]
+        if degraded:
+            record["degraded_inputs"] = degraded
+        records[name] = record
+        values[name] = record["output"]
+        if on_record is not None:
+            on_record(name, record)
+
+    submit_ready()
+    while pending:
+        now = time.perf_counter()
+        expiries = [started_at[name] + timeout for name in pending.values() if name in started_at]
+        wait_seconds = max(0.0, min(expiries + [overall_deadline]) - now)
+        if cancel_event is not None:
+            wait_seconds = min(wait_seconds, CANCEL_POLL_SECONDS)
+
+        done, _ = wait(list(pending), timeout=wait_seconds, return_when=FIRST_COMPLETED)
+        if cancel_event is not None and cancel_event.is_set():
+            for future in pending:
+                future.cancel()
+            raise RunCancelled(f"Cancelled with {len(pending)} node(s) unfinished")
+
+        for future in done:
+            name = pending.pop(future)
+            try:
+                output, latency, usage = future.result()
+                record = {"status": "ok", "output": output, "latency_ms": round(latency * 1000, 2)}
+                if usage:
+                    record["usage"] = usage
+                finish(name, record)
+            except Exception as e:
+                latency = time.perf_counter() - started_at.get(name, now)
+                finish(name, {"status": "error", "output": None, "latency_ms": round(latency * 1000, 2), "error": str(e)})
+
+        now = time.perf_counter()
+        for future, name in list(pending.items()):
+            started = started_at.get(name)
+            if (started is not None and now - started >= timeout) or now >= overall_deadline:
+                future.cancel()
+                del pending[future]
+                finish(
+                    name,
+                    {
+                        "status": "timeout",
+                        "output": None,
+                        "latency_ms": round((now - started) * 1000, 2) if started is not None else None,
+                        "error": f"Did not finish within {timeout:.1f}s"
+                        if started is not None
+                        else "Never started; worker pool exhausted",
+                    },
+                )
+
+        submit_ready()
+
+    return {spec.name: records[spec.name] for spec in plan.nodes}
@@ -0,0 +1,263 @@
+"""
+telemetry.py
+------------
+Tracing spans and metrics for the cross-consistency layer.
+
+Every orchestration run is a trace: a root span for the run (or batch), one
+child span per clause evaluation and one per agent / artifact node, with
+start and end times, outcome, cache hit and prompt / output sizes. Finished
+traces are kept in a bounded in-memory buffer (looked up by trace id) and, if
+CROSS_CONSISTENCY_TRACE_LOG is set, appended to that file as JSON lines.
+
+Per-agent latency histograms and call / error counters are rendered in the
+Prometheus text format for the API's /metrics endpoint.
+"""
+
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import os
+import threading
+import time
+import uuid
+
+TRACE_BUFFER_SIZE = int(os.getenv("CROSS_CONSISTENCY_TRACE_BUFFER", "500"))
+TRACE_LOG_PATH = os.getenv("CROSS_CONSISTENCY_TRACE_LOG", "")
+
+# Milliseconds; agents range from cached (sub-ms) to slow LLM calls (tens of seconds).
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: Optional[str] = None
+    start_time: float = field(default_factory=time.time)
+    end_time: Optional[float] = None
+    duration_ms: Optional[float] = None
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data.pop("_started")
+        return data
+
+
+class Tracer:
+    """Creates spans and keeps the most recent ``buffer_size`` traces."""
+
+    def __init__(self, buffer_size: int = TRACE_BUFFER_SIZE, log_path: str = TRACE_LOG_PATH):
+        self.buffer_size = max(1, buffer_size)
+        self.log_path = log_path
+        self._traces: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        trace_id: Optional[str] = None,
+        **attributes,
+    ) -> Span:
+        return Span(
+            name=name,
+            trace_id=parent.trace_id if parent is not None else (trace_id or new_trace_id()),
+            parent_id=parent.span_id if parent is not None else None,
+            attributes=attributes,
+        )
+
+    def end_span(self, span: Span, status: Optional[str] = None, **attributes):
+        span.end_time = time.time()
+        span.duration_ms = round((time.perf_counter() - span._started) * 1000, 2)
+        if status is not None:
+            span.status = status
+        span.attributes.update(attributes)
+        self._export(span.to_dict())
+
+    def record_span(
+        self,
+        name: str,
+        parent: Span,
+        duration_ms: Optional[float],
+        status: str,
+        **attributes,
+    ):
+        """Record a span that already finished (e.g. a scheduler node), ending now."""
+        end_time = time.time()
+        self._export(
+            {
+                "name": name,
+                "trace_id": parent.trace_id,
+                "span_id": uuid.uuid4().hex[:16],
+                "parent_id": parent.span_id,
+                "start_time": end_time - (duration_ms or 0.0) / 1000,
+                "end_time": end_time,
+                "duration_ms": duration_ms,
+                "status": status,
+                "attributes": {key: value for key, value in attributes.items() if value is not None},
+            }
+        )
+
+    def _export(self, span: Dict):
+        with self._lock:
+            spans = self._traces.setdefault(span["trace_id"], [])
+            spans.append(span)
+            self._traces.move_to_end(span["trace_id"])
+            while len(self._traces) > self.buffer_size:
+                self._traces.popitem(last=False)
+            if self.log_path:
+                try:
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(span, default=str) + "\n")
+                except OSError as e:
+                    print(f"⚠️ Could not write trace log: {e}")
+
+    def get_trace(self, trace_id: str) -> Optional[List[Dict]]:
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return sorted(spans, key=lambda span: span["start_time"]) if spans is not None else None
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str]):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, key)} {value:g}")
+        return lines
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {",".join(key): value for key, value in sorted(self._values.items())}
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + (f'{bound:g}',))} {count}")
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + ('+Inf',))} {series['count']}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {series['sum']:.3f}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {series['count']}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                ",".join(key): {
+                    "count": series["count"],
+                    "mean": round(series["sum"] / series["count"], 2) if series["count"] else 0.0,
+                    "buckets": dict(zip((f"{bound:g}" for bound in self.buckets), series["counts"])),
+                }
+                for key, series in sorted(self._series.items())
+            }
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class CrossConsistencyMetrics:
+    def __init__(self):
+        self.runs = Counter("cross_consistency_runs_total", "Clause evaluations by outcome and cache result.", ("outcome", "cache"))
+        self.run_latency = Histogram("cross_consistency_run_latency_ms", "Clause evaluation latency.", ("cache",))
+        self.agent_calls = Counter("cross_consistency_agent_calls_total", "Agent executions by status.", ("agent", "status"))
+        self.agent_errors = Counter("cross_consistency_agent_errors_total", "Agent failures and timeouts.", ("agent", "status"))
+        self.agent_latency = Histogram("cross_consistency_agent_latency_ms", "Agent latency.", ("agent",))
+
+    def observe_run(self, outcome: str, cache_hit: bool, latency_ms: float):
+        cache = "hit" if cache_hit else "miss"
+        self.runs.inc(outcome=outcome, cache=cache)
+        self.run_latency.observe(latency_ms, cache=cache)
+
+    def observe_agent(self, agent: str, status: str, latency_ms: Optional[float]):
+        self.agent_calls.inc(agent=agent, status=status)
+        if status != "ok":
+            self.agent_errors.inc(agent=agent, status=status)
+        if latency_ms is not None:
+            self.agent_latency.observe(latency_ms, agent=agent)
+
+    def render_prometheus(self) -> str:
+        metrics = (self.runs, self.run_latency, self.agent_calls, self.agent_errors, self.agent_latency)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def snapshot(self) -> Dict:
+        return {
+            "runs": self.runs.snapshot(),
+            "run_latency_ms": self.run_latency.snapshot(),
+            "agent_calls": self.agent_calls.snapshot(),
+            "agent_errors": self.agent_errors.snapshot(),
+            "agent_latency_ms": self.agent_latency.snapshot(),
+        }
+
+
+# --- Per-node annotations (prompt / output sizes) ---
+# Agents run on scheduler worker threads; whatever they report while running
+# (e.g. from llm_client) is collected by the scheduler onto the node record.
+_annotations = threading.local()
+
+
+def reset_annotations():
+    _annotations.values = {}
+
+
+def annotate(**counts: float):
+    values = getattr(_annotations, "values", None)
+    if values is None:
+        values = _annotations.values = {}
+    for key, amount in counts.items():
+        values[key] = values.get(key, 0) + amount
+
+
+def take_annotations() -> Dict[str, float]:
+    values = getattr(_annotations, "values", None) or {}
+    _annotations.values = {}
+    return values
+
+
+tracer = Tracer()
+metrics = CrossConsistencyMetrics()
@@ -0,0 +1,92 @@
+import re
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.;:])\s+(?=[A-Z(\"“])")
+_DEFINED_TERM = re.compile(r"[\"“]([A-Z][A-Za-z ]{1,40})[\"”]|\b([A-Z][a-z]+(?: [A-Z][a-z]+)+)\b")
+_LEADING_DETERMINER = re.compile(r"^(?:The|This|That|These|Each|Either|Any|All|Such) ")
+_OBLIGATION = re.compile(r"\b(shall not|shall|must not|must|will not|agrees to|may not|may)\b", re.IGNORECASE)
+_MONEY = re.compile(r"(?:[$€£]\s?\d[\d,]*(?:\.\d+)?(?:\s?(?:million|billion))?|\b\d[\d,]*(?:\.\d+)?\s?(?:USD|EUR|GBP|dollars)\b)")
+_DURATION = re.compile(r"\b(\d+|one|two|three|five|ten|twelve|thirty|sixty|ninety)\s+(day|business day|month|year)s?\b", re.IGNORECASE)
+_GOVERNING_LAW = re.compile(r"laws? of (?:the )?(State of |Commonwealth of |Province of )?([A-Z][A-Za-z ]+?)(?=[,.;]|$| and| without)")
+_PARTIES = ("Supplier", "Customer", "Licensor", "Licensee", "Vendor", "Client", "Company", "Contractor", "Employer", "Employee", "Buyer", "Seller", "Provider")
+
+# Numbered headings such as "1.", "12.3", "(a)", "Section 4" or "ARTICLE V" start a new clause.
+_CLAUSE_HEADING = re.compile(r"^\s*(?:\d+(?:\.\d+)*\.?|\([a-z0-9]+\)|(?:section|article|clause)\s+[\dIVXLC]+\.?)\s+", re.IGNORECASE)
+
+_TOPIC_KEYWORDS = {
+    "liability": ("liability", "liable", "indemn", "damages"),
+    "confidentiality": ("confidential", "non-disclosure", "disclose"),
+    "termination": ("terminate", "termination", "expiry"),
+    "governing_law": ("governed by", "governing law", "jurisdiction", "courts of"),
+    "payment": ("fee", "payment", "invoice", "price"),
+    "data_protection": ("personal data", "gdpr", "privacy", "data protection"),
+    "intellectual_property": ("intellectual property", "license", "licence", "copyright", "patent"),
+}
+
+
+def parse_clause(clause):
+    """
+    Lightweight structural parse of a contract clause shared by several agents:
+    sentences, obligations, parties, defined terms, amounts, durations, governing
+    law and topic tags. Pure regex, so it is cheap enough to run once per clause.
+    """
+    text = " ".join(clause.split())
+    lowered = text.lower()
+
+    defined_terms = set()
+    for quoted, capitalised in _DEFINED_TERM.findall(text):
+        term = _LEADING_DETERMINER.sub("", (quoted or capitalised).strip())
+        if term and (quoted or " " in term):
+            defined_terms.add(term)
+
+    governing_law = [match[1].strip() for match in _GOVERNING_LAW.findall(text)]
+
+    return {
+        "text": text,
+        "sentences": [sentence for sentence in _SENTENCE_SPLIT.split(text) if sentence],
+        "obligations": [match.lower() for match in _OBLIGATION.findall(text)],
+        "parties": [party for party in _PARTIES if re.search(rf"\b{party}\b", text)],
+        "defined_terms": sorted(defined_terms),
+        "amounts": _MONEY.findall(text),
+        "durations": [match.group(0) for match in _DURATION.finditer(text)],
+        "governing_law": governing_law,
+        "topics": [topic for topic, keywords in _TOPIC_KEYWORDS.items() if any(k in lowered for k in keywords)],
+    }
+
+
+def split_into_clauses(contract, min_chars=20):
+    """
+    Split a whole contract into clauses on numbered headings and blank lines.
+    Fragments shorter than ``min_chars`` (stray headings, page numbers) are
+    merged into the following clause.
+    """
+    clauses = []
+    current = []
+    carry = ""
+
+    def flush():
+        nonlocal carry
+        text = " ".join(" ".join(current).split())
+        current.clear()
+        if not text:
+            return
+        if len(text) < min_chars:
+            carry = f"{carry} {text}".strip()
+            return
+        clauses.append(f"{carry} {text}".strip() if carry else text)
+        carry = ""
+
+    for line in contract.splitlines():
+        if not line.strip():
+            flush()
+            continue
+        if _CLAUSE_HEADING.match(line) and current:
+            flush()
+        current.append(line.strip())
+    flush()
+
+    if carry:
+        if clauses:
+            clauses[-1] = f"{clauses[-1]} {carry}"
+        else:
+            clauses.append(carry)
+    return clauses
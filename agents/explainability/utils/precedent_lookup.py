@@ -0,0 +1,57 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_engine = None
+_engine_unavailable = False
+_engine_lock = threading.Lock()
+
+
+def _get_engine():
+    """The process-wide research engine, built once; None when retrieval is unavailable."""
+    global _engine, _engine_unavailable
+    if _engine is not None or _engine_unavailable:
+        return _engine
+    with _engine_lock:
+        if _engine is None and not _engine_unavailable:
+            try:
+                # Shares the engine the research API builds; the build itself is
+                # serialised inside research.py, so no event loop is needed here.
+                from agents.retrieval.research import build_research_engine
+
+                _engine = build_research_engine()
+            except Exception as exc:
+                _engine = None
+                logger.warning("Precedent retrieval unavailable: %s", exc)
+            # Remember the outcome so every clause of a batch doesn't retry the load.
+            _engine_unavailable = _engine is None
+    return _engine
+
+
+def retrieve_precedents(clause, clause_parse=None, top_k=5):
+    """
+    Single hybrid-retrieval call per clause, shared by the agents that reason
+    about precedent. Queries with the parsed topics and governing law so the
+    search is focused on what the clause is about.
+    """
+    engine = _get_engine()
+    if engine is None:
+        return []
+
+    query = clause
+    if clause_parse:
+        hints = clause_parse.get("topics", []) + clause_parse.get("governing_law", [])
+        if hints:
+            query = f"{clause} {' '.join(hints)}"
+
+    return [
+        {
+            "title": item["case"].title,
+            "citation": item["case"].citation,
+            "jurisdiction": item["case"].jurisdiction,
+            "direction": item["case"].precedent_direction,
+            "score": round(float(item["score"]), 4),
+        }
+        for item in engine.hybrid_search(query, top_k=top_k)
+    ]
@@ -1,5 +1,127 @@
 import difflib
+import json
+import re
+import zlib
+
+import numpy as np
+
+# Hashed feature space for agent outputs; collisions are rare at this size for short outputs.
+FEATURE_DIM = 2048
+# Clauses scored together in one einsum; bounds the (clauses, agents, FEATURE_DIM) buffer.
+SCORING_CHUNK_SIZE = 256
+# Outliers need enough agents to define a consensus.
+OUTLIER_MIN_AGENTS = 3
+OUTLIER_MAD_FACTOR = 2.0
+OUTLIER_MIN_GAP = 0.15
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were will with".split()
+)
+
 
 def compare_texts(text_a, text_b):
     ratio = difflib.SequenceMatcher(None, text_a, text_b).ratio()
     return round(ratio * 100, 2)
+
+
+def _as_text(output):
+    if output is None:
+        return ""
+    if isinstance(output, str):
+        return output
+    return json.dumps(output, sort_keys=True, default=str)
+
+
+def _features(text):
+    tokens = [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+def vectorize_texts(texts, dim=FEATURE_DIM):
+    """
+    Hash the unigrams and bigrams of every text into one (len(texts), dim) matrix
+    with sublinear term frequencies and L2-normalised rows, so cosine similarity
+    between any two texts is a dot product.
+    """
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    rows, cols = [], []
+    for row, text in enumerate(texts):
+        for feature in _features(_as_text(text)):
+            rows.append(row)
+            cols.append(zlib.crc32(feature.encode("utf-8")) % dim)
+    if rows:
+        np.add.at(matrix, (np.asarray(rows), np.asarray(cols)), 1.0)
+
+    np.log1p(matrix, out=matrix)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _score_clauses(batch, dim):
+    """Agreement results for several non-empty lists of outputs, scored in one einsum."""
+    sizes = np.array([len(outputs) for outputs in batch])
+    width = int(sizes.max())
+    mask = np.arange(width)[None, :] < sizes[:, None]
+
+    # (clauses, agents, dim), zero-padded to the widest clause.
+    padded = np.zeros((len(batch), width, dim), dtype=np.float32)
+    padded[mask] = vectorize_texts([output for outputs in batch for output in outputs], dim)
+
+    similarity = np.einsum("bad,bed->bae", padded, padded).astype(np.float64)
+    pair_mask = mask[:, :, None] & mask[:, None, :] & ~np.eye(width, dtype=bool)
+    similarity = np.where(pair_mask, similarity, 0.0)
+
+    pair_counts = sizes * (sizes - 1)
+    scores = similarity.sum(axis=(1, 2)) / np.maximum(pair_counts, 1)
+    agreement = similarity.sum(axis=2) / np.maximum(sizes - 1, 1)[:, None]
+
+    # An agent is an outlier when its mean agreement with the others sits well
+    # below the clause median (robust to a single dissenting agent).
+    masked = np.where(mask, agreement, np.nan)
+    median = np.nanmedian(masked, axis=1, keepdims=True)
+    mad = np.nanmedian(np.abs(masked - median), axis=1, keepdims=True) * 1.4826
+    cutoff = median - np.maximum(OUTLIER_MAD_FACTOR * mad, OUTLIER_MIN_GAP)
+    outliers = mask & (sizes[:, None] >= OUTLIER_MIN_AGENTS) & (masked < cutoff)
+
+    results = []
+    for index, size in enumerate(sizes):
+        results.append(
+            {
+                "consistency_score": round(float(scores[index]), 4) if size > 1 else None,
+                "agreement": [round(float(value), 4) for value in agreement[index, :size]] if size > 1 else [None] * size,
+                "outliers": [bool(flag) for flag in outliers[index, :size]],
+                "similarity": np.round(similarity[index, :size, :size] + np.eye(size), 4).tolist(),
+            }
+        )
+    return results
+
+
+def score_agreement_batch(batch_outputs, dim=FEATURE_DIM, chunk_size=SCORING_CHUNK_SIZE):
+    """
+    Score agreement between agent outputs for many clauses at once.
+
+    ``batch_outputs`` is one list of outputs per clause; the outputs of up to
+    ``chunk_size`` clauses are vectorised together and compared in a single
+    (clauses x agents x dim) einsum. For each clause returns
+    {"consistency_score", "agreement", "outliers", "similarity"}: the mean
+    pairwise cosine similarity, each agent's mean similarity to the others, an
+    outlier flag per agent and the full pairwise matrix. Clauses with fewer than
+    two outputs get a ``None`` score.
+    """
+    results = []
+    for start in range(0, len(batch_outputs), chunk_size):
+        chunk = [list(outputs) for outputs in batch_outputs[start:start + chunk_size]]
+        scored = iter(_score_clauses([outputs for outputs in chunk if outputs], dim) if any(chunk) else [])
+        for outputs in chunk:
+            if outputs:
+                results.append(next(scored))
+            else:
+                results.append({"consistency_score": None, "agreement": [], "outliers": [], "similarity": []})
+    return results
+
+
+def score_agreement(outputs, dim=FEATURE_DIM):
+    """Single-clause form of ``score_agreement_batch``."""
+    return score_agreement_batch([outputs], dim)[0]
@@ -0,0 +1,557 @@
+"""Background ingestion of uploaded documents into the research index.
+
+Every upload is queued here and moves through bounded stages:
+
+    extract   text layer of each page, OCR for pages without one
+    prepare   normalisation and splitting into overlapping passages
+    entities  spaCy NER over the pages, grouped by label (``agents.entities``)
+    embed     passages of several documents encoded in one batch
+    index     incremental insertion into ``LegalResearchEngine``
+
+Uploads enter through an unbounded intake queue, so accepting one never waits
+on the pipeline. After that each stage has its own worker pool and hands jobs
+on through a bounded queue, so a slow stage (usually OCR or embedding) makes
+the stages before it wait instead of piling up work in memory. Work is done
+once per blob: extracted pages, passages, entities, embeddings and the
+processing summary are stored as blob artifacts, so a deduplicated upload skips
+straight to indexing. Documents carry their current stage in the catalog
+``status`` column (``queued``, ``extracting``, ``chunking``, ``recognizing``,
+``embedding``, ``indexing``, ``indexed`` or ``failed``). Without a research
+engine (``agents.retrieval.research`` cannot be imported, or has no corpus) a
+document stops at ``prepared``: everything but indexing is done, and the
+passages are indexed when an engine is next built.
+"""
+
+import asyncio
+import base64
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .document_store import DocumentStore, StoredDocument, get_document_store
+from .entities import extract_entities, get_entity_model, group_entities
+from .ocr import OCRUnavailable, ProgressCallback, get_ocr_cache, ocr_document, ocr_image
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_WORKERS = int(os.getenv("LEGISAI_INGEST_EXTRACT_WORKERS", "2"))
+PREPARE_WORKERS = int(os.getenv("LEGISAI_INGEST_PREPARE_WORKERS", "2"))
+# Jobs allowed to wait between two stages before the upstream stage blocks.
+STAGE_QUEUE_SIZE = int(os.getenv("LEGISAI_INGEST_QUEUE_SIZE", "8"))
+EMBED_BATCH_PASSAGES = int(os.getenv("LEGISAI_INGEST_EMBED_BATCH", "64"))
+EMBED_WAIT_MS = float(os.getenv("LEGISAI_INGEST_EMBED_WAIT_MS", "50"))
+PASSAGE_WORDS = int(os.getenv("LEGISAI_INGEST_PASSAGE_WORDS", "220"))
+PASSAGE_OVERLAP_WORDS = int(os.getenv("LEGISAI_INGEST_PASSAGE_OVERLAP_WORDS", "40"))
+
+STATUS_QUEUED = "queued"
+STATUS_EXTRACTING = "extracting"
+STATUS_CHUNKING = "chunking"
+STATUS_RECOGNIZING = "recognizing"
+STATUS_EMBEDDING = "embedding"
+STATUS_INDEXING = "indexing"
+STATUS_INDEXED = "indexed"
+STATUS_PREPARED = "prepared"
+STATUS_FAILED = "failed"
+
+_TEXT_SUFFIXES = {".txt", ".md", ".csv", ".json", ".html", ".htm", ".xml", ".rtf"}
+_IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".gif", ".webp"}
+
+
+class UnsupportedDocument(ValueError):
+    """No text could be extracted from the document's format."""
+
+
+@dataclass
+class IngestionJob:
+    sha256: str
+    filename: str
+    file_type: str
+    path: Path
+    file_ids: List[str] = field(default_factory=list)
+    pages: List[str] = field(default_factory=list)
+    ocr_pages: List[int] = field(default_factory=list)
+    ocr_cache: Optional[Dict[str, Any]] = None
+    passages: List[str] = field(default_factory=list)
+    embeddings: Optional[np.ndarray] = None
+    needs_embedding: bool = True
+    results: Dict[str, Any] = field(default_factory=dict)
+    progress: Dict[str, int] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+
+
+# --- extraction ---
+
+
+def extract_pages(
+    path: Path, file_type: str, filename: str, on_page: Optional[ProgressCallback] = None
+) -> Tuple[List[str], List[int], Optional[Dict[str, Any]]]:
+    """
+    Text of each page of a stored document, the 1-based pages that needed OCR,
+    and the OCR page cache hits/misses (None when no page went through OCR).
+    """
+    suffix = Path(filename).suffix.lower()
+    try:
+        if file_type == "application/pdf" or suffix == ".pdf":
+            result = ocr_document(path, on_page=on_page)
+        elif file_type.startswith("image/") or suffix in _IMAGE_SUFFIXES:
+            result = ocr_image(path, on_page=on_page)
+        elif file_type.startswith("text/") or suffix in _TEXT_SUFFIXES:
+            return [path.read_text(encoding="utf-8", errors="replace")], [], None
+        else:
+            raise UnsupportedDocument(f"Cannot extract text from {file_type or suffix or 'unknown'} files")
+    except OCRUnavailable as exc:
+        raise UnsupportedDocument(str(exc)) from exc
+    return [page.text for page in result.pages], result.ocr_pages, result.cache
+
+
+# --- normalisation and chunking ---
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalise extracted text, rejoin hyphenated line breaks and unwrap lines within paragraphs."""
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    text = "".join(char for char in text if char in "\n\t" or unicodedata.category(char)[0] != "C")
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    paragraphs = re.split(r"\n\s*\n", text)
+    return "\n\n".join(" ".join(paragraph.split()) for paragraph in paragraphs if paragraph.strip())
+
+
+def chunk_passages(text: str, max_words: int = PASSAGE_WORDS, overlap_words: int = PASSAGE_OVERLAP_WORDS) -> List[str]:
+    """
+    Pack whole paragraphs into passages of up to ``max_words`` words; paragraphs
+    longer than that are split. Consecutive passages share ``overlap_words``
+    words so that sentences on a boundary are searchable from either side.
+    """
+    overlap_words = min(overlap_words, max_words // 2)
+    passages: List[str] = []
+    current: List[str] = []
+    for paragraph in text.split("\n\n"):
+        words = paragraph.split()
+        while words:
+            room = max_words - len(current)
+            current.extend(words[:room])
+            words = words[room:]
+            if len(current) >= max_words:
+                passages.append(" ".join(current))
+                current = current[len(current) - overlap_words:] if overlap_words else []
+    if current and (not passages or len(current) > overlap_words):
+        passages.append(" ".join(current))
+    return passages
+
+
+# --- embedding artifacts ---
+
+
+def _encode_embeddings(vectors: np.ndarray) -> Dict[str, Any]:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    return {"shape": list(vectors.shape), "data": base64.b64encode(vectors.tobytes()).decode("ascii")}
+
+
+def _decode_embeddings(payload: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+    if not payload:
+        return None
+    return np.frombuffer(base64.b64decode(payload["data"]), dtype=np.float32).reshape(payload["shape"])
+
+
+def passage_doc_ids(sha256: str, count: int) -> List[str]:
+    return [f"upload:{sha256[:16]}:{index}" for index in range(count)]
+
+
+def _passage_documents(sha256: str, filename: str, passages: List[str]):
+    from .retrieval.research import CaseDocument
+
+    return [
+        CaseDocument(
+            doc_id=doc_id,
+            title=f"{filename} (passage {index + 1}/{len(passages)})",
+            citation=f"Uploaded document: {filename}",
+            jurisdiction="Uploaded document",
+            year=None,
+            summary=passage[:300],
+            text=passage,
+            tags=["uploaded"],
+        )
+        for index, (doc_id, passage) in enumerate(zip(passage_doc_ids(sha256, len(passages)), passages))
+    ]
+
+
+def restore_uploaded_documents(engine, store: Optional[DocumentStore] = None) -> int:
+    """Insert every already-ingested upload into a freshly built research engine."""
+    store = store or get_document_store()
+    documents, vectors = [], []
+    prepared = []
+    for sha256 in store.artifact_blobs("processing_results"):
+        holders = store.documents_for_blob(sha256)
+        passages = store.get_artifact(sha256, "passages") or []
+        if not holders or not passages:
+            continue
+        documents.extend(_passage_documents(sha256, holders[0].filename, passages))
+        vectors.append(_decode_embeddings(store.get_artifact(sha256, "embeddings")))
+        prepared.extend(holder.file_id for holder in holders if holder.status == STATUS_PREPARED)
+    if not documents:
+        return 0
+    embeddings = np.vstack(vectors) if vectors and all(v is not None for v in vectors) else None
+    added = engine.add_documents(documents, embeddings)
+    # Documents ingested while no engine was available are searchable now.
+    for file_id in prepared:
+        store.set_status(file_id, STATUS_INDEXED)
+    return added
+
+
+# --- pipeline ---
+
+
+class IngestionPipeline:
+    """Runs the ingestion stages as asyncio workers on the API's event loop."""
+
+    def __init__(
+        self,
+        store: DocumentStore,
+        extract_workers: int = EXTRACT_WORKERS,
+        prepare_workers: int = PREPARE_WORKERS,
+        queue_size: int = STAGE_QUEUE_SIZE,
+        embed_batch_passages: int = EMBED_BATCH_PASSAGES,
+        embed_wait_ms: float = EMBED_WAIT_MS,
+    ):
+        self.store = store
+        self.extract_workers = max(1, extract_workers)
+        self.prepare_workers = max(1, prepare_workers)
+        self.queue_size = max(1, queue_size)
+        self.embed_batch_passages = max(1, embed_batch_passages)
+        self.embed_wait = max(0.0, embed_wait_ms) / 1000
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters = {"submitted": 0, "indexed": 0, "prepared": 0, "failed": 0, "embed_batches": 0, "passages_indexed": 0}
+
+    def start(self):
+        """Start the stage workers on the running loop and resume unfinished documents."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._extract_pool = ThreadPoolExecutor(self.extract_workers, thread_name_prefix="ingest-extract")
+        self._prepare_pool = ThreadPoolExecutor(self.prepare_workers, thread_name_prefix="ingest-prepare")
+        # One thread: nlp.pipe batches internally and fans out to LEGISAI_NER_PROCESSES itself.
+        self._entities_pool = ThreadPoolExecutor(1, thread_name_prefix="ingest-entities")
+        self._embed_pool = ThreadPoolExecutor(1, thread_name_prefix="ingest-embed")
+        # Unbounded so that submit() never makes an upload wait; later stages apply backpressure.
+        self._extract_q: asyncio.Queue = asyncio.Queue()
+        self._prepare_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._entities_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._embed_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._index_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._tasks = [
+            *(
+                loop.create_task(self._stage(STATUS_EXTRACTING, self._extract, self._extract_pool, self._extract_q, self._prepare_q))
+                for _ in range(self.extract_workers)
+            ),
+            *(
+                loop.create_task(self._stage(STATUS_CHUNKING, self._prepare, self._prepare_pool, self._prepare_q, self._entities_q))
+                for _ in range(self.prepare_workers)
+            ),
+            loop.create_task(
+                self._stage(STATUS_RECOGNIZING, self._recognize, self._entities_pool, self._entities_q, self._embed_q)
+            ),
+            loop.create_task(self._embed_stage()),
+            loop.create_task(self._index_stage()),
+            loop.create_task(self._resume()),
+        ]
+
+    async def _resume(self):
+        """Requeue documents left mid-pipeline by a previous process."""
+        for status in (
+            STATUS_QUEUED,
+            STATUS_EXTRACTING,
+            STATUS_CHUNKING,
+            STATUS_RECOGNIZING,
+            STATUS_EMBEDDING,
+            STATUS_INDEXING,
+        ):
+            # Collected before submitting: submit() moves documents out of their status.
+            documents: List[StoredDocument] = []
+            while True:
+                page, _ = self.store.list_documents(
+                    limit=100, offset=len(documents), status=status, descending=False
+                )
+                documents.extend(page)
+                if len(page) < 100:
+                    break
+            for document in documents:
+                job = self._jobs.get(document.sha256)
+                if job is None or document.file_id not in job.file_ids:
+                    self.submit(document)
+            await asyncio.sleep(0)
+
+    def submit(self, document: StoredDocument):
+        """Queue a stored document for ingestion without waiting on the pipeline."""
+        self.start()
+        self._counters["submitted"] += 1
+        job = self._jobs.get(document.sha256)
+        if job is not None:
+            # Same content already in flight: this document follows that job.
+            job.file_ids.append(document.file_id)
+            return
+        job = IngestionJob(
+            sha256=document.sha256,
+            filename=document.filename,
+            file_type=document.file_type,
+            path=self.store.blob_path(document.sha256),
+            file_ids=[document.file_id],
+        )
+        self._jobs[document.sha256] = job
+        self._set_status(job, STATUS_QUEUED)
+        self._extract_q.put_nowait(job)
+
+    def _set_status(self, job: IngestionJob, status: str, error: Optional[str] = None):
+        for file_id in job.file_ids:
+            self.store.set_status(file_id, status, error)
+
+    def _finish(self, job: IngestionJob, error: Optional[BaseException] = None, status: str = STATUS_INDEXED):
+        self._jobs.pop(job.sha256, None)
+        if error is None:
+            self._counters[status] += 1
+            self._set_status(job, status)
+        else:
+            self._counters["failed"] += 1
+            logger.warning("Ingestion of %s (%s) failed: %s", job.filename, job.sha256[:12], error)
+            self._set_status(job, STATUS_FAILED, str(error) or type(error).__name__)
+
+    async def _stage(self, status, func, pool, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await inbox.get()
+            try:
+                self._set_status(job, status)
+                await loop.run_in_executor(pool, func, job)
+            except Exception as exc:
+                self._finish(job, exc)
+            else:
+                # Blocks while the next stage is saturated (backpressure).
+                await outbox.put(job)
+
+    def _extract(self, job: IngestionJob):
+        if self.store.get_artifact(job.sha256, "passages") is not None:
+            return
+        cached = self.store.get_artifact(job.sha256, "extraction")
+        if cached is None:
+            def on_page(page, done: int, total: int):
+                job.progress = {"pages_done": done, "pages_total": total}
+
+            pages, ocr_pages, ocr_cache = extract_pages(job.path, job.file_type, job.filename, on_page)
+            cached = {"pages": pages, "ocr_pages": ocr_pages, "ocr_cache": ocr_cache}
+            self.store.put_artifact(job.sha256, "extraction", cached)
+        job.pages, job.ocr_pages = cached["pages"], cached["ocr_pages"]
+        job.ocr_cache = cached.get("ocr_cache")
+
+    def _prepare(self, job: IngestionJob):
+        passages = self.store.get_artifact(job.sha256, "passages")
+        if passages is None:
+            text = normalize_text("\n\n".join(job.pages))
+            passages = chunk_passages(text)
+            if not passages:
+                raise UnsupportedDocument("No text found in document")
+            self.store.put_artifact(job.sha256, "passages", passages)
+            job.results = {
+                "pages_extracted": len(job.pages),
+                "ocr_pages": len(job.ocr_pages),
+                "ocr_cache_hits": (job.ocr_cache or {}).get("hits", 0),
+                "text_length": len(text),
+                "passages": len(passages),
+            }
+        job.passages = passages
+        job.embeddings = _decode_embeddings(self.store.get_artifact(job.sha256, "embeddings"))
+        job.needs_embedding = job.embeddings is None
+
+    def _recognize(self, job: IngestionJob):
+        if self.store.get_artifact(job.sha256, "entities") is not None:
+            return
+        nlp = get_entity_model()
+        if nlp is None:
+            # spaCy or its model is not installed: documents are indexed without entities.
+            return
+        pages = job.pages or (self.store.get_artifact(job.sha256, "extraction") or {}).get("pages", [])
+        grouped = group_entities(extract_entities(pages, nlp))
+        self.store.put_artifact(job.sha256, "entities", grouped)
+        if job.results:
+            job.results["entities"] = {label: sum(entry["count"] for entry in values) for label, values in grouped.items()}
+
+    async def _take_batch(self, inbox: asyncio.Queue, limit: int, wait: float) -> List[IngestionJob]:
+        """The next job plus any that arrive within ``wait`` seconds, up to ``limit`` passages."""
+        batch = [await inbox.get()]
+        size = len(batch[0].passages)
+        deadline = time.perf_counter() + wait
+        while size < limit:
+            remaining = deadline - time.perf_counter()
+            try:
+                job = inbox.get_nowait() if remaining <= 0 else await asyncio.wait_for(inbox.get(), remaining)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            batch.append(job)
+            size += len(job.passages)
+        return batch
+
+    async def _embed_stage(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._take_batch(self._embed_q, self.embed_batch_passages, self.embed_wait)
+            pending = [job for job in batch if job.needs_embedding]
+            ready = batch
+            try:
+                if pending:
+                    for job in pending:
+                        self._set_status(job, STATUS_EMBEDDING)
+                    engine = await _research_engine()
+                    model = getattr(engine, "embeddings_model", None)
+                    if model is not None:
+                        texts = [passage for job in pending for passage in job.passages]
+                        vectors = await loop.run_in_executor(
+                            self._embed_pool,
+                            lambda: model.encode(texts, normalize_embeddings=True, show_progress_bar=False),
+                        )
+                        self._counters["embed_batches"] += 1
+                        offset = 0
+                        for job in pending:
+                            job.embeddings = np.asarray(vectors[offset:offset + len(job.passages)], dtype=np.float32)
+                            offset += len(job.passages)
+                            self.store.put_artifact(job.sha256, "embeddings", _encode_embeddings(job.embeddings))
+            except Exception as exc:
+                for job in pending:
+                    self._finish(job, exc)
+                ready = [job for job in batch if not job.needs_embedding]
+            for job in ready:
+                await self._index_q.put(job)
+
+    async def _index_stage(self):
+        while True:
+            # Everything already waiting goes into one insert (one BM25 refit).
+            batch = await self._take_batch(self._index_q, 10 ** 9, 0.0)
+            live = [job for job in batch if self.store.has_blob(job.sha256)]
+            try:
+                for job in live:
+                    self._set_status(job, STATUS_INDEXING)
+                engine = await _research_engine()
+                if engine is not None:
+                    documents, vectors = [], []
+                    for job in live:
+                        documents.extend(_passage_documents(job.sha256, job.filename, job.passages))
+                        vectors.append(job.embeddings)
+                    embeddings = np.vstack(vectors) if vectors and all(v is not None for v in vectors) else None
+                    added = await asyncio.to_thread(engine.add_documents, documents, embeddings)
+                    self._counters["passages_indexed"] += added
+            except Exception as exc:
+                for job in live:
+                    self._finish(job, exc)
+            else:
+                # Without an engine the passages are indexed by restore_uploaded_documents once one is built.
+                status = STATUS_INDEXED if engine is not None else STATUS_PREPARED
+                for job in live:
+                    if job.results:
+                        # Written last: its presence marks the blob as fully ingested.
+                        self.store.put_artifact(job.sha256, "processing_results", job.results)
+                    logger.info(
+                        "%s %s (%s passages) in %.2fs",
+                        status.capitalize(),
+                        job.filename,
+                        len(job.passages),
+                        time.perf_counter() - job.started,
+                    )
+                    self._finish(job, status=status)
+            for job in batch:
+                if job not in live:
+                    # Deleted while in flight; nothing left to index.
+                    self._jobs.pop(job.sha256, None)
+
+    def progress(self, sha256: str) -> Optional[Dict[str, int]]:
+        """Pages extracted so far for content still being ingested."""
+        job = self._jobs.get(sha256)
+        return dict(job.progress) if job is not None and job.progress else None
+
+    async def forget(self, sha256: str):
+        """Remove a deleted blob's passages from the research index, if one is loaded."""
+        # Never build an engine just to delete from it; a later build only restores stored blobs.
+        engine = _loaded_research_engine()
+        if engine is None:
+            return
+        prefix = passage_doc_ids(sha256, 1)[0].rsplit(":", 1)[0] + ":"
+        doc_ids: Set[str] = {doc_id for doc_id in engine.ordered_ids if doc_id.startswith(prefix)}
+        if doc_ids:
+            await asyncio.to_thread(engine.remove_documents, doc_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        queues = {}
+        if self._loop is not None:
+            queues = {
+                "extract": self._extract_q.qsize(),
+                "prepare": self._prepare_q.qsize(),
+                "entities": self._entities_q.qsize(),
+                "embed": self._embed_q.qsize(),
+                "index": self._index_q.qsize(),
+            }
+        ocr_cache = get_ocr_cache()
+        return {
+            **self._counters,
+            "in_flight": len(self._jobs),
+            "queued": queues,
+            "ocr_cache": ocr_cache.stats() if ocr_cache is not None else None,
+        }
+
+
+_research_unavailable = False
+
+
+def _research_module():
+    """``agents.retrieval.research``, or None (logged once) when it cannot be imported."""
+    global _research_unavailable
+    if _research_unavailable:
+        return None
+    try:
+        from .retrieval import research
+    except ImportError as exc:
+        _research_unavailable = True
+        logger.warning("Research index unavailable; uploads are processed but not indexed: %s", exc)
+        return None
+    return research
+
+
+async def _research_engine():
+    research = _research_module()
+    return await research.get_research_engine() if research is not None else None
+
+
+def _loaded_research_engine():
+    research = _research_module()
+    return research.loaded_research_engine() if research is not None else None
+
+
+_pipeline: Optional[IngestionPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_ingestion_pipeline(store: Optional[DocumentStore] = None) -> IngestionPipeline:
+    global _pipeline
+    with _pipeline_lock:
+        store = store or get_document_store()
+        if _pipeline is None or _pipeline.store is not store:
+            _pipeline = IngestionPipeline(store)
+        return _pipeline
+
+
+__all__ = [
+    "IngestionPipeline",
+    "UnsupportedDocument",
+    "chunk_passages",
+    "extract_pages",
+    "get_ingestion_pipeline",
+    "normalize_text",
+    "restore_uploaded_documents",
+]
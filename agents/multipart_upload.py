@@ -0,0 +1,334 @@
+"""Resumable multipart uploads.
+
+A client declares the total size, then sends numbered parts of a fixed part
+size (the last may be shorter) in any order and in parallel, retrying any part
+that fails. Each part is written straight to its offset in one preallocated
+file under ``<root>/multipart/<upload_id>/``, so completing an upload is a
+rename into the blob store rather than a concatenation. Received parts are
+recorded as small marker files holding their size and SHA-256, and a part being
+written has a ``.writing`` marker, so which parts arrived survives restarts and
+is shared by several server processes.
+
+The content hash is computed incrementally over the contiguous prefix of
+received parts: the part that extends the prefix is hashed while it streams,
+and parts that arrived ahead of a gap are hashed from disk (normally still in
+the page cache) once the gap fills. That running hash lives in the memory of
+one process, so completion checks the hash of every part it covered against
+the part markers and rehashes from disk when any differ (a part replaced
+through another process, or a restart), before hashing whatever is left.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PART_SIZE = int(os.getenv("LEGISAI_MULTIPART_PART_SIZE", str(8 * 1024 * 1024)))
+MIN_PART_SIZE = 1024 * 1024
+MAX_PARTS = 10_000
+MAX_MULTIPART_BYTES = int(os.getenv("LEGISAI_MAX_MULTIPART_BYTES", str(16 * 1024 * 1024 * 1024)))
+# Incomplete uploads untouched for this long are removed.
+UPLOAD_TTL_SECONDS = float(os.getenv("LEGISAI_MULTIPART_TTL_HOURS", "24")) * 3600
+# A part write that has not finished after this long is taken to have died with its process.
+PART_WRITE_TIMEOUT_SECONDS = float(os.getenv("LEGISAI_MULTIPART_PART_TIMEOUT_MINUTES", "15")) * 60
+_HASH_READ_BYTES = 1024 * 1024
+
+
+class MultipartError(ValueError):
+    """A request that does not fit the upload (bad part number or size, missing parts...)."""
+
+
+class UploadNotFound(KeyError):
+    pass
+
+
+@dataclass
+class MultipartUpload:
+    upload_id: str
+    filename: str
+    file_type: str
+    size: int
+    part_size: int
+    created_at: float
+
+    @property
+    def part_count(self) -> int:
+        return max(1, math.ceil(self.size / self.part_size))
+
+    def part_length(self, part_number: int) -> int:
+        if part_number == self.part_count:
+            return self.size - (self.part_count - 1) * self.part_size
+        return self.part_size
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), "part_count": self.part_count}
+
+
+class _PrefixHash:
+    """
+    Running SHA-256 over parts 1..hashed, kept per upload in this process, with
+    the SHA-256 of each part as it was hashed.
+    """
+
+    def __init__(self):
+        self.digest = hashlib.sha256()
+        self.hashed = 0
+        self.part_hashes: Dict[int, str] = {}
+        self.inline: Optional[int] = None
+        self.lock = asyncio.Lock()
+
+    def reset(self):
+        # A part streaming into the old digest notices the swap and is hashed from disk instead.
+        self.digest = hashlib.sha256()
+        self.hashed = 0
+        self.part_hashes = {}
+        self.inline = None
+
+
+class MultipartUploadStore:
+    def __init__(self, root: Path):
+        self.root = Path(root) / "multipart"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._hashes: Dict[str, _PrefixHash] = {}
+
+    def _dir(self, upload_id: str) -> Path:
+        if not upload_id.isalnum():
+            raise UploadNotFound(upload_id)
+        return self.root / upload_id
+
+    def data_path(self, upload_id: str) -> Path:
+        return self._dir(upload_id) / "data"
+
+    def create(self, filename: str, file_type: str, size: int, part_size: Optional[int] = None) -> MultipartUpload:
+        part_size = part_size or DEFAULT_PART_SIZE
+        if size < 0 or size > MAX_MULTIPART_BYTES:
+            raise MultipartError(f"size must be between 0 and {MAX_MULTIPART_BYTES} bytes")
+        if part_size < MIN_PART_SIZE:
+            raise MultipartError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        if math.ceil(size / part_size) > MAX_PARTS:
+            part_size = math.ceil(size / MAX_PARTS)
+
+        self.expire_stale()
+        upload = MultipartUpload(
+            upload_id=uuid.uuid4().hex,
+            filename=filename,
+            file_type=file_type,
+            size=size,
+            part_size=part_size,
+            created_at=time.time(),
+        )
+        directory = self._dir(upload.upload_id)
+        (directory / "parts").mkdir(parents=True)
+        with open(directory / "data", "wb") as f_handle:
+            f_handle.truncate(size)  # sparse; parts fill it in place
+        (directory / "upload.json").write_text(json.dumps(asdict(upload)), encoding="utf-8")
+        return upload
+
+    def get(self, upload_id: str) -> MultipartUpload:
+        try:
+            data = json.loads((self._dir(upload_id) / "upload.json").read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise UploadNotFound(upload_id) from None
+        return MultipartUpload(**data)
+
+    def parts(self, upload_id: str) -> Dict[int, Dict]:
+        parts = {}
+        for marker in (self._dir(upload_id) / "parts").iterdir():
+            if marker.suffix == ".json" and not marker.name.startswith("."):
+                try:
+                    parts[int(marker.stem)] = json.loads(marker.read_text(encoding="utf-8"))
+                except FileNotFoundError:
+                    continue  # replaced by a new write of the part
+        return dict(sorted(parts.items()))
+
+    def writing_parts(self, upload_id: str) -> List[int]:
+        """Parts being written by any process; markers of writes that timed out are removed."""
+        writing = set()
+        cutoff = time.time() - PART_WRITE_TIMEOUT_SECONDS
+        for marker in (self._dir(upload_id) / "parts").glob("*.writing"):
+            try:
+                if marker.stat().st_mtime < cutoff:
+                    marker.unlink(missing_ok=True)
+                    continue
+            except FileNotFoundError:
+                continue
+            writing.add(int(marker.name.split(".", 1)[0]))
+        return sorted(writing)
+
+    def list_uploads(self) -> List[Dict]:
+        uploads = []
+        for directory in sorted(self.root.iterdir()):
+            try:
+                upload = self.get(directory.name)
+            except (UploadNotFound, ValueError):
+                continue
+            uploads.append({**upload.to_dict(), "parts_received": len(self.parts(upload.upload_id))})
+        return uploads
+
+    async def write_part(self, upload_id: str, part_number: int, chunks: AsyncIterator[bytes]) -> Dict:
+        """Stream one part to its offset; returns its size and SHA-256."""
+        upload = self.get(upload_id)
+        if not 1 <= part_number <= upload.part_count:
+            raise MultipartError(f"part_number must be between 1 and {upload.part_count}")
+        expected = upload.part_length(part_number)
+        parts_dir = self._dir(upload_id) / "parts"
+        marker = parts_dir / f"{part_number}.json"
+        writing = parts_dir / f"{part_number}.{uuid.uuid4().hex}.writing"
+        state = self._hashes.setdefault(upload_id, _PrefixHash())
+        async with state.lock:
+            inline = state.hashed == part_number - 1 and state.inline is None
+            if inline:
+                state.inline = part_number
+                running = state.digest
+
+        part_digest = hashlib.sha256()
+        size = 0
+        writing.touch()
+        # Until this write succeeds the part counts as missing, even if this process dies.
+        marker.unlink(missing_ok=True)
+        try:
+            async with aiofiles.open(self.data_path(upload_id), "r+b") as f_handle:
+                await f_handle.seek((part_number - 1) * upload.part_size)
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    size += len(chunk)
+                    if size > expected:
+                        raise MultipartError(f"Part {part_number} must be {expected} bytes")
+                    part_digest.update(chunk)
+                    if inline:
+                        running.update(chunk)
+                    await f_handle.write(chunk)
+            if size != expected:
+                raise MultipartError(f"Part {part_number} must be {expected} bytes, got {size}")
+        except BaseException:
+            # The part's bytes on disk are now incomplete: it has to be sent again.
+            writing.unlink(missing_ok=True)
+            async with state.lock:
+                if (inline and state.digest is running) or part_number <= state.hashed:
+                    # The running hash took a partial part; rebuild it from disk later.
+                    state.reset()
+            raise
+
+        part = {"part_number": part_number, "size": size, "sha256": part_digest.hexdigest()}
+        partial = parts_dir / f".{part_number}.{uuid.uuid4().hex}"
+        partial.write_text(json.dumps(part), encoding="utf-8")
+        partial.replace(marker)
+        writing.unlink(missing_ok=True)
+
+        async with state.lock:
+            if inline and state.digest is running:
+                state.hashed, state.inline = part_number, None
+                state.part_hashes[part_number] = part["sha256"]
+            elif part_number <= state.hashed and state.part_hashes.get(part_number) != part["sha256"]:
+                # A hashed part was replaced with different bytes.
+                state.reset()
+            await self._advance(upload, state)
+        return part
+
+    async def _advance(self, upload: MultipartUpload, state: _PrefixHash):
+        """Extend the running hash over received parts that now follow the prefix (state.lock held)."""
+        if state.inline is not None:
+            return
+        received = self.parts(upload.upload_id)
+        while state.hashed + 1 in received:
+            part_number = state.hashed + 1
+            state.part_hashes[part_number] = await asyncio.to_thread(self._hash_range, upload, part_number, state.digest)
+            state.hashed = part_number
+
+    def _hash_range(self, upload: MultipartUpload, part_number: int, digest) -> str:
+        """Feed one part from disk into ``digest``; returns the part's own SHA-256."""
+        part_digest = hashlib.sha256()
+        remaining = upload.part_length(part_number)
+        with open(self.data_path(upload.upload_id), "rb") as f_handle:
+            f_handle.seek((part_number - 1) * upload.part_size)
+            while remaining > 0:
+                chunk = f_handle.read(min(_HASH_READ_BYTES, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                part_digest.update(chunk)
+                remaining -= len(chunk)
+        return part_digest.hexdigest()
+
+    async def finish(self, upload_id: str, expected_parts: Optional[List[Dict]] = None) -> str:
+        """
+        Check that every part arrived and none is still being written (and that
+        they match ``expected_parts`` when the client sends its list of part
+        numbers and hashes); returns the content hash.
+        """
+        upload = self.get(upload_id)
+        writing = self.writing_parts(upload_id)
+        if writing:
+            raise MultipartError(f"Parts still being received: {writing[:20]}")
+        received = self.parts(upload_id)
+        missing = [number for number in range(1, upload.part_count + 1) if number not in received]
+        if missing and upload.size > 0:
+            raise MultipartError(f"Missing parts: {missing[:20]}{'...' if len(missing) > 20 else ''}")
+        for part in expected_parts or []:
+            stored = received.get(int(part["part_number"]))
+            if stored is None or (part.get("sha256") and part["sha256"].lower() != stored["sha256"]):
+                raise MultipartError(f"Part {part['part_number']} does not match the received data")
+
+        state = self._hashes.setdefault(upload_id, _PrefixHash())
+        async with state.lock:
+            if state.inline is not None:
+                raise MultipartError(f"Part {state.inline} is still being received")
+            if self._stale_parts(state, received):
+                # Parts were replaced outside this process's view: rebuild from disk.
+                state.reset()
+            await self._advance(upload, state)
+            stale = self._stale_parts(state, received)
+            if stale:
+                state.reset()
+                raise MultipartError(f"Parts {stale[:20]} do not match their recorded hashes; send them again")
+            return state.digest.hexdigest()
+
+    @staticmethod
+    def _stale_parts(state: _PrefixHash, received: Dict[int, Dict]) -> List[int]:
+        """Hashed parts whose bytes, as hashed, differ from the part markers."""
+        return [
+            number
+            for number in range(1, state.hashed + 1)
+            if number not in received or state.part_hashes.get(number) != received[number]["sha256"]
+        ]
+
+    def discard(self, upload_id: str):
+        self._hashes.pop(upload_id, None)
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+
+    def expire_stale(self):
+        cutoff = time.time() - UPLOAD_TTL_SECONDS
+        for directory in self.root.iterdir():
+            try:
+                data = directory / "data"
+                touched = (data if data.exists() else directory).stat().st_mtime
+                if directory.is_dir() and touched < cutoff:
+                    self.discard(directory.name)
+            except OSError as exc:  # pragma: no cover - defensive logging
+                logger.warning("Could not expire multipart upload %s: %s", directory.name, exc)
+
+
+_stores: Dict[Path, MultipartUploadStore] = {}
+
+
+def get_multipart_store(root: Path) -> MultipartUploadStore:
+    root = Path(root)
+    if root not in _stores:
+        _stores[root] = MultipartUploadStore(root)
+    return _stores[root]
+
+
+__all__ = ["MultipartError", "MultipartUpload", "MultipartUploadStore", "UploadNotFound", "get_multipart_store"]
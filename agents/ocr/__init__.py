@@ -0,0 +1,34 @@
+"""OCR for uploaded documents; see ``engine`` for how pages are processed."""
+
+from .cache import OCRPageCache, get_ocr_cache
+from .engine import (
+    OCR_AVAILABLE,
+    PDF_AVAILABLE,
+    DocumentOCRResult,
+    OCRSettings,
+    OCRUnavailable,
+    PageResult,
+    ProgressCallback,
+    adaptive_dpi,
+    get_ocr_pool,
+    ocr_document,
+    ocr_image,
+    retry_dpi,
+)
+
+__all__ = [
+    "OCR_AVAILABLE",
+    "PDF_AVAILABLE",
+    "DocumentOCRResult",
+    "OCRPageCache",
+    "OCRSettings",
+    "OCRUnavailable",
+    "PageResult",
+    "ProgressCallback",
+    "adaptive_dpi",
+    "get_ocr_cache",
+    "get_ocr_pool",
+    "ocr_document",
+    "ocr_image",
+    "retry_dpi",
+]
@@ -0,0 +1,45 @@
+"""
+OCR a document from the command line, as the Document_OCR notebook did:
+
+    python -m agents.ocr filing.pdf -o filing.txt
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from .engine import OCRSettings, PageResult, ocr_document, ocr_image
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Extract text from a PDF or scanned image.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("-o", "--output", type=Path, help="Write the text here instead of stdout.")
+    parser.add_argument("--dpi", type=int, default=OCRSettings.dpi)
+    parser.add_argument("--lang", default=OCRSettings.lang)
+    parser.add_argument("--no-cache", action="store_true", help="OCR every page even if it was seen before.")
+    args = parser.parse_args(argv)
+
+    def progress(page: PageResult, done: int, total: int):
+        detail = f"{page.dpi} dpi, confidence {page.confidence}" if page.source == "ocr" else "text layer"
+        if page.cached:
+            detail += ", cached"
+        print(f"page {page.page_number:>4} ({detail}, {page.seconds:.2f}s)  [{done}/{total}]", file=sys.stderr)
+
+    settings = OCRSettings(dpi=args.dpi, lang=args.lang)
+    run = ocr_document if args.path.suffix.lower() == ".pdf" else ocr_image
+    result = run(args.path, settings, on_page=progress, use_cache=not args.no_cache)
+
+    if args.output:
+        args.output.write_text(result.text, encoding="utf-8")
+    else:
+        print(result.text)
+    summary = f"{len(result.pages)} pages ({len(result.ocr_pages)} OCR) in {result.seconds:.2f}s"
+    if result.cache is not None:
+        summary += f"; page cache {result.cache['hits']} hits, {result.cache['misses']} misses"
+    print(summary, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Persistent cache of per-page OCR output.
+
+Entries are keyed by a fingerprint of the page's raw content (its content
+stream plus the raw bytes of the images and forms it draws, or the file bytes
+for a standalone image) together with a version of the OCR settings and the
+Tesseract release. The same exhibit or standard form inside a new filing, or a
+corpus re-processed after a downstream change, is therefore only OCR'd once;
+changing DPI, language or the Tesseract version produces new keys instead of
+stale hits. Entries are evicted least-recently-used beyond ``max_entries``.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from .engine import OCR_AVAILABLE, OCRSettings, PageResult, pytesseract
+
+# Bump when the stored page format or text post-processing changes.
+CACHE_SCHEMA_VERSION = "1"
+
+DEFAULT_CACHE_PATH = Path(os.getenv("LEGISAI_OCR_CACHE_PATH", Path("uploads") / "ocr_cache.sqlite3"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("LEGISAI_OCR_CACHE_MAX_ENTRIES", "500000"))
+
+
+@lru_cache(maxsize=1)
+def tesseract_version() -> str:
+    if not OCR_AVAILABLE:
+        return "unavailable"
+    try:
+        return str(pytesseract.get_tesseract_version())
+    except Exception:  # pragma: no cover - binary missing or unparsable output
+        return "unknown"
+
+
+def settings_version(settings: OCRSettings) -> str:
+    """Tag for output produced with ``settings`` by the installed Tesseract."""
+    payload = json.dumps(
+        {"schema": CACHE_SCHEMA_VERSION, "tesseract": tesseract_version(), "settings": asdict(settings)},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class OCRPageCache:
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._stores_since_evict = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            # WAL lets the API workers and batch re-processing share the cache file.
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS ocr_pages (
+                    cache_key TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    dpi INTEGER,
+                    confidence REAL,
+                    seconds REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_ocr_pages_access ON ocr_pages (last_access);
+                """
+            )
+
+    @staticmethod
+    def _key(fingerprint: str, version: str) -> str:
+        return hashlib.sha256(f"{version}|{fingerprint}".encode("utf-8")).hexdigest()
+
+    def lookup(self, fingerprint: str, version: str, page_number: int) -> Optional[PageResult]:
+        key = self._key(fingerprint, version)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, dpi, confidence, seconds FROM ocr_pages WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE ocr_pages SET last_access = ?, hits = hits + 1 WHERE cache_key = ?", (time.time(), key)
+                )
+            self._counters["hits"] += 1
+        text, dpi, confidence, seconds = row
+        # ``seconds`` keeps the original OCR time: what the hit saved.
+        return PageResult(
+            page_number=page_number, text=text, source="ocr", dpi=dpi, confidence=confidence, seconds=seconds, cached=True
+        )
+
+    def store(self, fingerprint: str, version: str, page: PageResult):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_pages (cache_key, version, text, dpi, confidence, seconds, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (self._key(fingerprint, version), version, page.text, page.dpi, page.confidence, page.seconds, now, now),
+            )
+            self._counters["stores"] += 1
+            self._stores_since_evict += 1
+            # Counting the table on every store would dominate; check periodically.
+            if self._stores_since_evict >= 100:
+                self._stores_since_evict = 0
+                self._evict()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM ocr_pages").fetchone()
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM ocr_pages WHERE cache_key IN (SELECT cache_key FROM ocr_pages ORDER BY last_access LIMIT ?)",
+            (overflow,),
+        )
+        self._counters["evictions"] += overflow
+
+    def stats(self) -> Dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM ocr_pages").fetchone()
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[OCRPageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> Optional[OCRPageCache]:
+    """Process-wide cache, or None when disabled with LEGISAI_OCR_CACHE=0."""
+    global _cache
+    if os.getenv("LEGISAI_OCR_CACHE", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = OCRPageCache()
+    return _cache
@@ -0,0 +1,353 @@
+"""Page-parallel OCR for PDFs and scanned images.
+
+This is the workflow of ``agents/Document_OCR.ipynb`` (PyMuPDF rendering plus
+``pytesseract``), reorganised for throughput:
+
+* pages that already carry a text layer are read directly, without rendering;
+* only image-only pages are rasterised and OCR'd, each in a worker of a shared
+  process pool, so a long scanned filing uses every core;
+* the render resolution adapts to the page: large pages are rendered at a
+  lower DPI so no image exceeds ``max_pixels``, and pages that come back with
+  low Tesseract confidence are retried once at a higher DPI, up to ``max_dpi``
+  and within the same ``max_pixels`` bound;
+* pages seen before are served from the persistent page cache (``cache``);
+* an ``on_page`` callback reports every finished page, for progress displays.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import pymupdf as fitz
+
+    PDF_AVAILABLE = True
+except ImportError:  # pragma: no cover - older PyMuPDF releases only ship the fitz name
+    try:
+        import fitz
+
+        PDF_AVAILABLE = True
+    except ImportError:  # pragma: no cover - optional dependency
+        fitz = None  # type: ignore[assignment]
+        PDF_AVAILABLE = False
+
+try:
+    import pytesseract
+    from PIL import Image
+
+    OCR_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    pytesseract = None  # type: ignore[assignment]
+    Image = None  # type: ignore[assignment]
+    OCR_AVAILABLE = False
+
+OCR_PROCESSES = int(os.getenv("LEGISAI_OCR_PROCESSES", "0")) or (os.cpu_count() or 1)
+# A page with less embedded text than this is treated as a scanned image.
+MIN_TEXT_LAYER_CHARS = int(os.getenv("LEGISAI_OCR_MIN_TEXT_CHARS", "20"))
+
+
+class OCRUnavailable(RuntimeError):
+    """PyMuPDF or Tesseract is not installed."""
+
+
+@dataclass(frozen=True)
+class OCRSettings:
+    dpi: int = 300
+    min_dpi: int = 150
+    max_dpi: int = 400
+    # ~A4 at max_dpi, so standard pages can be retried; bigger pages render (and retry) lower.
+    max_pixels: int = 3307 * 4677
+    # Mean word confidence (0-100) below which a page is retried at up to max_dpi.
+    retry_confidence: float = 60.0
+    lang: str = "eng"
+    tesseract_config: str = ""
+
+
+@dataclass
+class PageResult:
+    page_number: int
+    text: str
+    source: str  # "text_layer" or "ocr"
+    dpi: Optional[int] = None
+    confidence: Optional[float] = None
+    seconds: float = 0.0
+    cached: bool = False
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class DocumentOCRResult:
+    pages: List[PageResult] = field(default_factory=list)
+    seconds: float = 0.0
+    # Page cache hits / misses for this document (None when the cache is off).
+    cache: Optional[Dict] = None
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(page.text for page in self.pages)
+
+    @property
+    def ocr_pages(self) -> List[int]:
+        return [page.page_number for page in self.pages if page.source == "ocr"]
+
+
+ProgressCallback = Callable[[PageResult, int, int], None]
+
+
+def _capped_dpi(width_points: float, height_points: float, settings: OCRSettings, ceiling: int) -> int:
+    pixels_per_dpi_squared = (width_points / 72.0) * (height_points / 72.0)
+    if pixels_per_dpi_squared <= 0:
+        return ceiling
+    return min(ceiling, int((settings.max_pixels / pixels_per_dpi_squared) ** 0.5))
+
+
+def adaptive_dpi(width_points: float, height_points: float, settings: OCRSettings) -> int:
+    """Highest DPI up to ``settings.dpi`` that keeps the rendered page within ``max_pixels``."""
+    return max(settings.min_dpi, _capped_dpi(width_points, height_points, settings, settings.dpi))
+
+
+def retry_dpi(width_points: float, height_points: float, settings: OCRSettings) -> int:
+    """DPI for a low-confidence retry: up to ``settings.max_dpi``, still within ``max_pixels``."""
+    return _capped_dpi(width_points, height_points, settings, settings.max_dpi)
+
+
+# --- worker side ---
+
+_worker_docs: Dict[str, object] = {}
+
+
+def _init_worker():
+    # Tesseract's own OpenMP threads would oversubscribe a pool that already uses every core.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _worker_document(path: str):
+    document = _worker_docs.get(path)
+    if document is None:
+        # Keep only the most recent document open in each worker.
+        for stale in _worker_docs.values():
+            stale.close()
+        _worker_docs.clear()
+        document = _worker_docs[path] = fitz.open(path)
+    return document
+
+
+def _tesseract(image, settings: OCRSettings) -> Tuple[str, Optional[float]]:
+    data = pytesseract.image_to_data(
+        image, lang=settings.lang, config=settings.tesseract_config, output_type=pytesseract.Output.DICT
+    )
+    lines: Dict[Tuple[int, int, int], List[str]] = {}
+    confidences = []
+    for index, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        key = (data["block_num"][index], data["par_num"][index], data["line_num"][index])
+        lines.setdefault(key, []).append(word)
+        confidence = float(data["conf"][index])
+        if confidence >= 0:
+            confidences.append(confidence)
+    text, previous = [], None
+    for key, words in lines.items():
+        if previous is not None and key[:2] != previous[:2]:
+            text.append("")  # blank line between paragraphs
+        text.append(" ".join(words))
+        previous = key
+    return "\n".join(text), (sum(confidences) / len(confidences) if confidences else None)
+
+
+def ocr_pdf_page(path: str, page_index: int, settings: OCRSettings) -> PageResult:
+    """Render and OCR one PDF page (runs in a pool worker)."""
+    started = time.perf_counter()
+    page = _worker_document(path)[page_index]
+    dpi = adaptive_dpi(page.rect.width, page.rect.height, settings)
+    text, confidence = _render_and_ocr(page, dpi, settings)
+    higher_dpi = retry_dpi(page.rect.width, page.rect.height, settings)
+    # A page whose DPI was capped by max_pixels has no higher resolution to retry at.
+    if confidence is not None and confidence < settings.retry_confidence and higher_dpi > dpi:
+        retry_text, retry_confidence = _render_and_ocr(page, higher_dpi, settings)
+        if retry_confidence is not None and retry_confidence > confidence:
+            text, confidence, dpi = retry_text, retry_confidence, higher_dpi
+    return PageResult(
+        page_number=page_index + 1,
+        text=text,
+        source="ocr",
+        dpi=dpi,
+        confidence=round(confidence, 1) if confidence is not None else None,
+        seconds=round(time.perf_counter() - started, 3),
+    )
+
+
+def _render_and_ocr(page, dpi: int, settings: OCRSettings) -> Tuple[str, Optional[float]]:
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    return _tesseract(image, settings)
+
+
+def ocr_image_file(path: str, settings: OCRSettings) -> PageResult:
+    """OCR a standalone scanned image (runs in a pool worker)."""
+    started = time.perf_counter()
+    with Image.open(path) as image:
+        text, confidence = _tesseract(image, settings)
+    return PageResult(
+        page_number=1,
+        text=text,
+        source="ocr",
+        confidence=round(confidence, 1) if confidence is not None else None,
+        seconds=round(time.perf_counter() - started, 3),
+    )
+
+
+# --- caller side ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """Process pool shared by every OCR call in this process (LEGISAI_OCR_PROCESSES workers)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the API process runs threads, which forking would copy mid-flight.
+            _pool = ProcessPoolExecutor(
+                max_workers=OCR_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+    return _pool
+
+
+def page_fingerprint(pdf, page) -> str:
+    """Hash of what a page draws: its content stream and the raw streams of its images and forms."""
+    digest = hashlib.sha256(f"{page.rotation}|{tuple(page.rect)}".encode("utf-8"))
+    digest.update(page.read_contents())
+    xrefs = [image[0] for image in page.get_images(full=True)] + [form[0] for form in page.get_xobjects()]
+    for xref in sorted(set(xrefs)):
+        digest.update(pdf.xref_stream_raw(xref) or b"")
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f_handle:
+        for chunk in iter(lambda: f_handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _page_cache(use_cache: bool, settings: OCRSettings):
+    if not use_cache:
+        return None, None
+    from .cache import get_ocr_cache, settings_version
+
+    cache = get_ocr_cache()
+    return cache, (settings_version(settings) if cache is not None else None)
+
+
+def ocr_document(
+    path: Path,
+    settings: OCRSettings = OCRSettings(),
+    on_page: Optional[ProgressCallback] = None,
+    pool: Optional[ProcessPoolExecutor] = None,
+    use_cache: bool = True,
+) -> DocumentOCRResult:
+    """
+    Text of every page of a PDF, in page order. Text-layer pages are read here;
+    image-only pages come from the OCR page cache or are OCR'd in ``pool`` (the
+    shared OCR pool by default). ``on_page(page, done, total)`` is called from
+    this thread as pages finish, in completion order.
+    """
+    if not PDF_AVAILABLE:
+        raise OCRUnavailable("PDF processing requires PyMuPDF (pip install pymupdf)")
+    started = time.perf_counter()
+    cache, version = _page_cache(use_cache and OCR_AVAILABLE, settings)
+    results: Dict[int, PageResult] = {}
+    pending: Dict[Future, Tuple[int, str]] = {}
+    cache_stats = {"hits": 0, "misses": 0, "seconds_saved": 0.0}
+    repeats: Dict[str, List[int]] = {}
+
+    def finished(index: int, page: PageResult):
+        results[index] = page
+        if on_page is not None:
+            on_page(page, len(results), total)
+
+    with fitz.open(path) as pdf:
+        total = pdf.page_count
+        for index, page in enumerate(pdf):
+            text = page.get_text()
+            if len(text.strip()) >= MIN_TEXT_LAYER_CHARS or not OCR_AVAILABLE:
+                finished(index, PageResult(page_number=index + 1, text=text, source="text_layer"))
+                continue
+            fingerprint = page_fingerprint(pdf, page) if cache is not None else ""
+            hit = cache.lookup(fingerprint, version, index + 1) if cache is not None else None
+            if hit is not None:
+                cache_stats["hits"] += 1
+                cache_stats["seconds_saved"] += hit.seconds
+                finished(index, hit)
+            elif fingerprint in repeats:
+                # Same scan repeated inside this document: OCR it once.
+                cache_stats["hits"] += 1
+                repeats[fingerprint].append(index)
+            else:
+                cache_stats["misses"] += cache is not None
+                if cache is not None:
+                    repeats[fingerprint] = []
+                pool = pool or get_ocr_pool()
+                pending[pool.submit(ocr_pdf_page, str(path), index, settings)] = (index, fingerprint)
+
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, fingerprint = pending.pop(future)
+                page = future.result()
+                if cache is not None:
+                    cache.store(fingerprint, version, page)
+                finished(index, page)
+                for repeat in repeats.pop(fingerprint, []):
+                    cache_stats["seconds_saved"] += page.seconds
+                    finished(repeat, replace(page, page_number=repeat + 1, cached=True))
+    finally:
+        for future in pending:
+            future.cancel()
+
+    cache_stats["seconds_saved"] = round(cache_stats["seconds_saved"], 3)
+    return DocumentOCRResult(
+        pages=[results[index] for index in sorted(results)],
+        seconds=round(time.perf_counter() - started, 3),
+        cache=cache_stats if cache is not None else None,
+    )
+
+
+def ocr_image(
+    path: Path,
+    settings: OCRSettings = OCRSettings(),
+    on_page: Optional[ProgressCallback] = None,
+    pool: Optional[ProcessPoolExecutor] = None,
+    use_cache: bool = True,
+) -> DocumentOCRResult:
+    """OCR a scanned image file in the OCR pool, unless the page cache has it."""
+    if not OCR_AVAILABLE:
+        raise OCRUnavailable("OCR requires pytesseract, Pillow and the tesseract binary")
+    started = time.perf_counter()
+    cache, version = _page_cache(use_cache, settings)
+    fingerprint = file_fingerprint(path) if cache is not None else ""
+    page = cache.lookup(fingerprint, version, 1) if cache is not None else None
+    cache_stats = {"hits": int(page is not None), "misses": int(page is None), "seconds_saved": page.seconds if page else 0.0}
+    if page is None:
+        page = (pool or get_ocr_pool()).submit(ocr_image_file, str(path), settings).result()
+        if cache is not None:
+            cache.store(fingerprint, version, page)
+    if on_page is not None:
+        on_page(page, 1, 1)
+    return DocumentOCRResult(
+        pages=[page], seconds=round(time.perf_counter() - started, 3), cache=cache_stats if cache is not None else None
+    )
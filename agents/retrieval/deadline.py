@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESEARCH_BUDGET = float(os.getenv("RESEARCH_LATENCY_BUDGET_SECONDS", "45"))
+# Client-supplied budgets are clamped to this.
+MAX_RESEARCH_BUDGET = float(os.getenv("RESEARCH_MAX_LATENCY_BUDGET_SECONDS", "120"))
+FALLBACK_RESERVE_SECONDS = float(os.getenv("RESEARCH_FALLBACK_RESERVE_SECONDS", "0.5"))
+REPORT_CACHE_TTL = float(os.getenv("RESEARCH_REPORT_CACHE_TTL", "3600"))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("RESEARCH_REPORT_CACHE_MAX_ENTRIES", "256"))
+
+
+class InvalidDeadline(ValueError):
+    """A client-supplied latency budget that is not a positive number of milliseconds."""
+
+
+@dataclass
+class Deadline:
+    """Latency budget carried through retrieval and generation for one request."""
+
+    budget: float
+    started_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_request(
+        cls,
+        request: Dict[str, Any],
+        default: float = DEFAULT_RESEARCH_BUDGET,
+        maximum: float = MAX_RESEARCH_BUDGET,
+    ) -> "Deadline":
+        """Deadline from ``latency_budget_ms``; raises InvalidDeadline unless it is a positive number."""
+        budget_ms = request.get("latency_budget_ms")
+        if budget_ms is None:
+            return cls(budget=min(default, maximum))
+        try:
+            if isinstance(budget_ms, bool):
+                raise TypeError
+            budget = float(budget_ms) / 1000.0
+        except (TypeError, ValueError):
+            raise InvalidDeadline("latency_budget_ms must be a number of milliseconds") from None
+        if not math.isfinite(budget) or budget <= 0:
+            raise InvalidDeadline("latency_budget_ms must be greater than 0")
+        return cls(budget=min(budget, maximum))
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def remaining(self, reserve: float = 0.0) -> float:
+        """Seconds left before the caller must be answered, keeping ``reserve`` spare."""
+        return max(0.0, self.budget - self.elapsed - reserve)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+def report_cache_key(query: str) -> str:
+    normalized = " ".join(query.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class BackgroundReportCache:
+    """Tracks in-flight LLM generations and keeps their finished reports for later requests.
+
+    Generations that outlive a request's deadline keep running; their result is
+    stored here so a refresh of the same query returns the full AI report
+    without paying for a second generation.
+    """
+
+    def __init__(self, ttl: float = REPORT_CACHE_TTL, max_entries: int = REPORT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._reports: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    def get_report(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._reports.get(key)
+        if entry is None:
+            return None
+
+        stored_at, report = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._reports[key]
+            return None
+
+        self._reports.move_to_end(key)
+        return report
+
+    def store_report(self, key: str, report: Dict[str, Any]) -> None:
+        self._reports[key] = (time.monotonic(), report)
+        self._reports.move_to_end(key)
+        while len(self._reports) > self.max_entries:
+            self._reports.popitem(last=False)
+
+    def get_in_flight(self, key: str) -> Optional[asyncio.Task]:
+        task = self._in_flight.get(key)
+        if task is not None and task.done():
+            return None
+        return task
+
+    def track(self, key: str, task: asyncio.Task) -> None:
+        # Holding the reference keeps detached generations from being garbage collected.
+        self._in_flight[key] = task
+        task.add_done_callback(lambda finished: self._finish(key, finished))
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+        if task.cancelled():
+            return
+
+        exc = task.exception()
+        if exc is not None:
+            logger.warning("Background generation for %s failed: %s", key[:12], exc)
+            return
+
+        report = task.result()
+        if report is not None:
+            self.store_report(key, report)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cached_reports": len(self._reports), "in_flight": len(self._in_flight)}
+
+
+__all__ = [
+    "BackgroundReportCache",
+    "DEFAULT_RESEARCH_BUDGET",
+    "Deadline",
+    "FALLBACK_RESERVE_SECONDS",
+    "InvalidDeadline",
+    "MAX_RESEARCH_BUDGET",
+    "report_cache_key",
+]
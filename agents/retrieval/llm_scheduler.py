@@ -0,0 +1,255 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+DEFAULT_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))
+DEFAULT_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+
+
+class Priority(IntEnum):
+    """Scheduling classes for LLM work; lower values are served first."""
+
+    INTERACTIVE_STREAM = 0
+    INTERACTIVE = 1
+    BATCH = 2
+
+    @classmethod
+    def parse(cls, value: Any, default: "Priority") -> "Priority":
+        if value is None or value == "":
+            return default
+        if isinstance(value, Priority):
+            return value
+        try:
+            return cls[str(value).strip().upper()]
+        except KeyError:
+            logger.warning("Unknown LLM priority %r; using %s.", value, default.name)
+            return default
+
+
+class SchedulerOverloaded(Exception):
+    """Raised when a generation request cannot be admitted in time."""
+
+    def __init__(self, message: str, status_code: int, retry_after: float):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+@dataclass
+class SchedulerLease:
+    """A granted execution slot. Releasing it more than once is a no-op."""
+
+    scheduler: "LLMJobScheduler"
+    priority: Priority
+    wait_time: float
+    granted_at: float = field(default_factory=time.monotonic)
+    released: bool = False
+
+    def release(self) -> None:
+        if self.released:
+            return
+        self.released = True
+        self.scheduler._release(time.monotonic() - self.granted_at)
+
+
+class LLMJobScheduler:
+    """Bounded-concurrency, bounded-queue admission control in front of the LLM.
+
+    At most ``max_concurrency`` generations run at once. Further requests wait
+    in a priority queue of at most ``max_queue`` entries; when the queue is full
+    they are rejected immediately (429), and when they wait longer than
+    ``queue_timeout`` they are rejected with 503. Both carry a retry-after hint
+    derived from the observed service time.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+        self._service_time_ewma = 5.0
+        self._wait_samples: Deque[float] = deque(maxlen=512)
+        self._counters: Dict[str, int] = {
+            "admitted": 0,
+            "completed": 0,
+            "rejected_queue_full": 0,
+            "rejected_queue_timeout": 0,
+        }
+        self._admitted_by_priority: Dict[str, int] = {priority.name: 0 for priority in Priority}
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+    def estimate_retry_after(self) -> float:
+        backlog = self.queue_depth + self._active
+        return max(1.0, self._service_time_ewma * backlog / self.max_concurrency)
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> SchedulerLease:
+        enqueued_at = time.monotonic()
+
+        if self._active < self.max_concurrency and self.queue_depth == 0:
+            self._active += 1
+            return self._grant(priority, enqueued_at)
+
+        if self.queue_depth >= self.max_queue:
+            self._counters["rejected_queue_full"] += 1
+            raise SchedulerOverloaded(
+                "LLM queue is full; please retry later.",
+                status_code=429,
+                retry_after=self.estimate_retry_after(),
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), waiter))
+
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            # The slot may have been handed to us as the timeout fired; pass it on.
+            if waiter.done() and not waiter.cancelled():
+                self._release(0.0, record=False)
+            self._counters["rejected_queue_timeout"] += 1
+            raise SchedulerOverloaded(
+                "Timed out waiting for an LLM slot; the model is saturated.",
+                status_code=503,
+                retry_after=self.estimate_retry_after(),
+            ) from None
+        except asyncio.CancelledError:
+            # The slot may have been handed to us just before cancellation.
+            if waiter.done() and not waiter.cancelled():
+                self._release(0.0, record=False)
+            raise
+
+        return self._grant(priority, enqueued_at)
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE) -> AsyncIterator[SchedulerLease]:
+        lease = await self.acquire(priority)
+        try:
+            yield lease
+        finally:
+            lease.release()
+
+    def _grant(self, priority: Priority, enqueued_at: float) -> SchedulerLease:
+        wait_time = time.monotonic() - enqueued_at
+        self._wait_samples.append(wait_time)
+        self._counters["admitted"] += 1
+        self._admitted_by_priority[priority.name] += 1
+        return SchedulerLease(scheduler=self, priority=priority, wait_time=wait_time)
+
+    def _release(self, service_time: float, record: bool = True) -> None:
+        if record:
+            self._counters["completed"] += 1
+            self._service_time_ewma = 0.8 * self._service_time_ewma + 0.2 * service_time
+
+        self._active -= 1
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.done():
+                continue
+            # Hand the slot directly to the next waiter so it cannot be stolen.
+            self._active += 1
+            waiter.set_result(None)
+            break
+
+    def metrics(self) -> Dict[str, Any]:
+        waits = sorted(self._wait_samples)
+
+        def _percentile(fraction: float) -> float:
+            if not waits:
+                return 0.0
+            index = min(len(waits) - 1, int(round(fraction * (len(waits) - 1))))
+            return round(waits[index], 4)
+
+        depth_by_priority: Dict[str, int] = {priority.name: 0 for priority in Priority}
+        for priority_value, _, waiter in self._waiters:
+            if not waiter.done():
+                depth_by_priority[Priority(priority_value).name] += 1
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "queue_depth_by_priority": depth_by_priority,
+            "admitted_by_priority": dict(self._admitted_by_priority),
+            "wait_seconds": {
+                "samples": len(waits),
+                "mean": round(sum(waits) / len(waits), 4) if waits else 0.0,
+                "p50": _percentile(0.50),
+                "p95": _percentile(0.95),
+                "max": round(waits[-1], 4) if waits else 0.0,
+            },
+            "service_time_ewma_seconds": round(self._service_time_ewma, 4),
+            **self._counters,
+        }
+
+
+class LeasedStreamingResponse(StreamingResponse):
+    """Streaming response that gives its scheduler slot back however the response ends.
+
+    A body generator's ``finally`` only runs once the body is iterated; if the
+    client disconnects before streaming starts, or sending the headers fails,
+    the generator is never entered and a slot released there would leak.
+    """
+
+    def __init__(self, content: Any, lease: SchedulerLease, **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.lease = lease
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.lease.release()
+
+
+_scheduler: Optional[LLMJobScheduler] = None
+
+
+def get_llm_scheduler() -> LLMJobScheduler:
+    global _scheduler
+
+    if _scheduler is None:
+        _scheduler = LLMJobScheduler()
+    return _scheduler
+
+
+__all__ = [
+    "LLMJobScheduler",
+    "LeasedStreamingResponse",
+    "Priority",
+    "SchedulerLease",
+    "SchedulerOverloaded",
+    "get_llm_scheduler",
+]
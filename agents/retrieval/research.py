@@ -1,15 +1,15 @@
 import asyncio
 import json
 import logging
+import threading
 import time
 from collections import Counter, defaultdict
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
 
 import numpy as np
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
 
 try:
     from rank_bm25 import BM25Okapi
@@ -27,6 +27,21 @@ from .common import (
     generate_ai_response_stream,
     ollama_client,
 )
+from .deadline import (
+    FALLBACK_RESERVE_SECONDS,
+    BackgroundReportCache,
+    Deadline,
+    InvalidDeadline,
+    report_cache_key,
+)
+from .llm_scheduler import (
+    LeasedStreamingResponse,
+    Priority,
+    SchedulerLease,
+    SchedulerOverloaded,
+    get_llm_scheduler,
+)
+from .research_jobs import DEFAULT_JOB_WORKERS, ProgressCallback, ResearchJobManager, ResearchJobStore
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -35,6 +50,7 @@ BASE_PATH = Path(__file__).resolve().parents[1]
 CASELAW_PATHS = [
     BASE_PATH / "data" / "caselaw_sample.json",
 ]
+RESEARCH_JOBS_DB_PATH = BASE_PATH / "data" / "research_jobs.sqlite3"
 
 DEFAULT_CASES: List[Dict[str, Any]] = [
     {
@@ -119,6 +135,9 @@ class LegalResearchEngine:
         self.tag_index: Dict[str, Set[str]] = defaultdict(set)
         self.statute_index: Dict[str, Set[str]] = defaultdict(set)
         self.relationships: Dict[str, Set[str]] = defaultdict(set)
+        # Guards the index arrays, which add_documents/remove_documents replace while searches run.
+        self._index_lock = threading.RLock()
+        self._tokenized_corpus: List[List[str]] = []
 
         self._ensure_embeddings_model()
         self._build_indices()
@@ -152,6 +171,7 @@ class LegalResearchEngine:
 
         if BM25_AVAILABLE and self.text_corpus:
             tokenized_corpus = [self._tokenize(text) for text in self.text_corpus]
+            self._tokenized_corpus = tokenized_corpus
             if tokenized_corpus:
                 self.bm25 = BM25Okapi(tokenized_corpus)
                 logger.info("BM25 index initialised with %s documents.", len(self.text_corpus))
@@ -171,7 +191,10 @@ class LegalResearchEngine:
                 self.embeddings = None
 
     def _build_knowledge_graph(self) -> None:
-        for document in self.documents:
+        self._link_documents(self.documents)
+
+    def _link_documents(self, documents: List[CaseDocument]) -> None:
+        for document in documents:
             doc_id = document.doc_id
             if not doc_id:
                 continue
@@ -187,6 +210,77 @@ class LegalResearchEngine:
                     self.relationships[doc_id].add(related)
                     self.relationships[related].add(doc_id)
 
+    def add_documents(self, documents: List[CaseDocument], embeddings: Optional[np.ndarray] = None) -> int:
+        """
+        Insert documents into the live indices without rebuilding the engine.
+
+        ``embeddings`` are precomputed, normalised vectors for ``documents`` (one row
+        each); they are encoded here if omitted. Documents whose id is already
+        indexed are skipped. Returns the number of documents added.
+        """
+        with self._index_lock:
+            keep = [index for index, doc in enumerate(documents) if doc.doc_id and doc.doc_id not in self.doc_index]
+            if not keep:
+                return 0
+            new_docs = [documents[index] for index in keep]
+            texts = [doc.text or doc.summary or "" for doc in new_docs]
+
+            vectors: Optional[np.ndarray] = None
+            if self.embeddings_model is not None:
+                if embeddings is not None:
+                    vectors = np.asarray(embeddings, dtype=np.float32)[keep]
+                else:
+                    try:
+                        vectors = self.embeddings_model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
+                    except Exception as exc:  # pragma: no cover - defensive logging
+                        logger.warning("Embedding generation failed for %s new documents: %s", len(texts), exc)
+
+            self.documents = self.documents + new_docs
+            self.doc_index.update((doc.doc_id, doc) for doc in new_docs)
+            self.text_corpus = getattr(self, "text_corpus", []) + texts
+            self._link_documents(new_docs)
+
+            if BM25_AVAILABLE:
+                # rank_bm25 has no incremental API; refit on the cached token lists.
+                self._tokenized_corpus = self._tokenized_corpus + [self._tokenize(text) for text in texts]
+                self.bm25 = BM25Okapi(self._tokenized_corpus)
+
+            if vectors is not None and (self.embeddings is not None or not self.ordered_ids):
+                self.embeddings = vectors if self.embeddings is None else np.vstack([self.embeddings, vectors])
+            else:
+                # Dense scores need a vector for every document; fall back to lexical only.
+                self.embeddings = None
+            self.ordered_ids = self.ordered_ids + [doc.doc_id for doc in new_docs]
+
+        logger.info("Added %s documents to the research index.", len(new_docs))
+        return len(new_docs)
+
+    def remove_documents(self, doc_ids: Set[str]) -> int:
+        """Drop documents from the live indices. Returns the number removed."""
+        with self._index_lock:
+            positions = [index for index, doc_id in enumerate(self.ordered_ids) if doc_id in doc_ids]
+            if not positions:
+                return 0
+            keep = np.ones(len(self.ordered_ids), dtype=bool)
+            keep[positions] = False
+
+            self.ordered_ids = [doc_id for doc_id, kept in zip(self.ordered_ids, keep) if kept]
+            self.text_corpus = [text for text, kept in zip(self.text_corpus, keep) if kept]
+            self.documents = [doc for doc in self.documents if doc.doc_id not in doc_ids]
+            for doc_id in doc_ids:
+                self.doc_index.pop(doc_id, None)
+            for index in (self.tag_index, self.statute_index, self.relationships):
+                for linked in index.values():
+                    linked.difference_update(doc_ids)
+            if self.embeddings is not None:
+                self.embeddings = self.embeddings[keep]
+            if self.bm25 is not None:
+                self._tokenized_corpus = [tokens for tokens, kept in zip(self._tokenized_corpus, keep) if kept]
+                self.bm25 = BM25Okapi(self._tokenized_corpus) if self._tokenized_corpus else None
+
+        logger.info("Removed %s documents from the research index.", len(positions))
+        return len(positions)
+
     @staticmethod
     def _tokenize(text: str) -> List[str]:
         return [token.lower() for token in text.split()]
@@ -195,13 +289,15 @@ class LegalResearchEngine:
         if not query.strip():
             return []
 
-        lexical_scores = self._compute_bm25_scores(query)
-        dense_scores = self._compute_dense_scores(query)
-        blended = self._blend_scores(lexical_scores, dense_scores)
+        with self._index_lock:
+            lexical_scores = self._compute_bm25_scores(query)
+            dense_scores = self._compute_dense_scores(query)
+            blended = self._blend_scores(lexical_scores, dense_scores)
+            cases = {doc_id: self.doc_index[doc_id] for doc_id, _ in blended[:top_k]}
 
         results: List[Dict[str, Any]] = []
         for doc_id, score in blended[:top_k]:
-            case = self.doc_index[doc_id]
+            case = cases[doc_id]
             results.append(
                 {
                     "case": case,
@@ -528,7 +624,7 @@ class LegalResearchEngine:
         }
 
 
-async def _load_case_documents() -> List[CaseDocument]:
+def _read_case_documents() -> List[CaseDocument]:
     def _load_raw_cases() -> List[Dict[str, Any]]:
         for path in CASELAW_PATHS:
             if path.exists():
@@ -581,78 +677,187 @@ async def _load_case_documents() -> List[CaseDocument]:
             related_cases=list(entry.get("related_cases", [])),
         )
 
-    raw_cases = await asyncio.to_thread(_load_raw_cases)
-    documents = [_normalize(entry) for entry in raw_cases]
+    documents = [_normalize(entry) for entry in _load_raw_cases()]
 
     logger.info("Loaded %s case law documents for research engine.", len(documents))
     return documents
 
 
+def _restore_uploaded_documents(engine: LegalResearchEngine) -> None:
+    """Re-index passages of uploaded documents that earlier processes already ingested."""
+    try:
+        from ..ingestion import restore_uploaded_documents
+    except ImportError:  # pragma: no cover - optional dependency
+        return
+    try:
+        restore_uploaded_documents(engine)
+    except Exception as exc:  # pragma: no cover - defensive logging
+        logger.warning("Failed to restore uploaded documents into the research index: %s", exc)
+
+
 _research_engine: Optional[LegalResearchEngine] = None
-_engine_lock = asyncio.Lock()
+# A thread lock, not an asyncio one: the engine is also built from agent worker threads.
+_engine_lock = threading.Lock()
 
 
-async def get_research_engine() -> Optional[LegalResearchEngine]:
+def loaded_research_engine() -> Optional[LegalResearchEngine]:
+    """The research engine if this process has already built it; never builds one."""
+    return _research_engine
+
+
+def build_research_engine() -> Optional[LegalResearchEngine]:
+    """Build the process-wide research engine once (blocking) and return it."""
     global _research_engine
 
-    if _research_engine is None:
-        async with _engine_lock:
-            if _research_engine is None:
-                documents = await _load_case_documents()
-                if not documents:
-                    logger.warning("No legal documents available for research engine.")
-                    return None
-                _research_engine = await asyncio.to_thread(LegalResearchEngine, documents)
+    with _engine_lock:
+        if _research_engine is None:
+            documents = _read_case_documents()
+            if not documents:
+                logger.warning("No legal documents available for research engine.")
+                return None
+            engine = LegalResearchEngine(documents)
+            _restore_uploaded_documents(engine)
+            _research_engine = engine
+
+    return _research_engine
 
+
+async def get_research_engine() -> Optional[LegalResearchEngine]:
+    if _research_engine is None:
+        return await asyncio.to_thread(build_research_engine)
     return _research_engine
 
 
+def _unavailable_context(query: str, reason: str = "Retrieval engine unavailable.") -> Dict[str, Any]:
+    return {
+        "query": query,
+        "retrieval": [],
+        "knowledge_graph": {"nodes": [], "edges": [], "insights": [reason]},
+        "precedent": {
+            "summary": f"{reason[:-1]}; provide general legal guidance.",
+            "buckets": {},
+            "query": query,
+        },
+        "context_block": reason,
+        "prompt": _basic_prompt(query),
+    }
+
+
 async def prepare_research_context(query: str, top_k: int = 6) -> Dict[str, Any]:
     engine = await get_research_engine()
     if engine is None:
-        fallback_prompt = _basic_prompt(query)
-        return {
-            "query": query,
-            "retrieval": [],
-            "knowledge_graph": {"nodes": [], "edges": [], "insights": ["Retrieval engine unavailable."]},
-            "precedent": {
-                "summary": "Retrieval engine unavailable; provide general legal guidance.",
-                "buckets": {},
-                "query": query,
-            },
-            "context_block": "Retrieval engine unavailable.",
-            "prompt": fallback_prompt,
-        }
+        return _unavailable_context(query)
 
     return await asyncio.to_thread(engine.prepare_context, query, top_k)
 
 
-async def generate_structured_legal_research(query: str) -> Dict[str, Any]:
-    """Generate structured legal research using hybrid RAG, knowledge graph, and precedent reasoning."""
-    context_bundle = await prepare_research_context(query, top_k=8)
-    prompt = context_bundle.get("prompt") or _basic_prompt(query)
+_report_cache = BackgroundReportCache()
 
-    try:
+
+async def _generate_llm_report(
+    query: str,
+    prompt: str,
+    context_bundle: Dict[str, Any],
+    priority: Priority,
+) -> Optional[Dict[str, Any]]:
+    async with get_llm_scheduler().slot(priority):
         ai_research = await asyncio.wait_for(
             generate_ai_response(prompt, max_tokens=900, use_full_response=True),
             timeout=600.0,
         )
 
-        if ai_research and "FALLBACK RESPONSE" not in ai_research and "LLM NOT WORKING" not in ai_research:
-            report_text = _format_report(query, ai_research, context_bundle)
-            return {
-                "report": report_text,
-                "prompt": prompt,
-                "context": context_bundle,
-                "source": "llm",
-            }
+    if ai_research and "FALLBACK RESPONSE" not in ai_research and "LLM NOT WORKING" not in ai_research:
+        return {
+            "report": _format_report(query, ai_research, context_bundle),
+            "prompt": prompt,
+            "context": context_bundle,
+            "source": "llm",
+        }
+    return None
+
+
+async def generate_structured_legal_research(
+    query: str,
+    priority: Priority = Priority.INTERACTIVE,
+    progress: Optional[ProgressCallback] = None,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
+    """Generate structured legal research using hybrid RAG, knowledge graph, and precedent reasoning.
+
+    With a ``deadline``, the retrieval-grounded fallback report is returned as soon
+    as the budget is about to expire; the LLM generation keeps running in the
+    background and its report is served from cache on the next identical query.
+    """
+    cache_key = report_cache_key(query)
+    cached_report = _report_cache.get_report(cache_key)
+    if cached_report is not None:
+        return {**cached_report, "cached": True}
+
+    if progress is not None:
+        await progress("retrieving", None)
+
+    try:
+        context_bundle = await asyncio.wait_for(
+            prepare_research_context(query, top_k=8),
+            timeout=deadline.remaining(FALLBACK_RESERVE_SECONDS) if deadline else None,
+        )
     except asyncio.TimeoutError:
-        logger.warning("AI generation timed out for query: %s", query)
-    except Exception as exc:  # pragma: no cover - defensive logging
-        logger.error("AI generation failed: %s", exc)
+        logger.warning("Retrieval exceeded the latency budget for query: %s", query)
+        context_bundle = _unavailable_context(query, "Retrieval exceeded the latency budget.")
+        fallback_report = _build_fallback_report(query, context_bundle)
+        return {
+            "report": fallback_report,
+            "prompt": context_bundle["prompt"],
+            "context": context_bundle,
+            "source": "fallback",
+        }
+
+    prompt = context_bundle.get("prompt") or _basic_prompt(query)
+
+    if progress is not None:
+        await progress(
+            "generating",
+            {
+                "documents": [_serialize_case_item(item) for item in context_bundle.get("retrieval", [])],
+                "knowledge_graph": context_bundle.get("knowledge_graph"),
+                "precedent_analysis": context_bundle.get("precedent"),
+            },
+        )
+
+    generation = _report_cache.get_in_flight(cache_key)
+    if generation is None:
+        generation = asyncio.create_task(_generate_llm_report(query, prompt, context_bundle, priority))
+        _report_cache.track(cache_key, generation)
+
+    # asyncio.wait (unlike wait_for) leaves the generation running when the budget expires.
+    done, _ = await asyncio.wait(
+        {generation},
+        timeout=deadline.remaining(FALLBACK_RESERVE_SECONDS) if deadline else None,
+    )
+
+    generation_pending = generation not in done
+    if generation_pending:
+        logger.info("Latency budget exhausted for query %s; serving fallback while generation continues.", query)
+    else:
+        try:
+            llm_report = generation.result()
+            if llm_report is not None:
+                return llm_report
+        except SchedulerOverloaded:
+            raise
+        except asyncio.TimeoutError:
+            logger.warning("AI generation timed out for query: %s", query)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.error("AI generation failed: %s", exc)
 
     fallback_report = _build_fallback_report(query, context_bundle)
-    return {"report": fallback_report, "prompt": prompt, "context": context_bundle, "source": "fallback"}
+    return {
+        "report": fallback_report,
+        "prompt": prompt,
+        "context": context_bundle,
+        "source": "fallback",
+        "generation_pending": generation_pending,
+    }
 
 
 def _format_report(query: str, body: str, context_bundle: Dict[str, Any]) -> str:
@@ -911,6 +1116,39 @@ def _estimate_confidence(retrieval: List[Dict[str, Any]]) -> float:
     return float(min(0.6 + top_score * 0.3 + coverage_bonus, 0.95))
 
 
+def _build_research_payload(query: str, research_bundle: Dict[str, Any], max_results: int) -> Dict[str, Any]:
+    context = research_bundle.get("context", {})
+    retrieval = context.get("retrieval", [])
+
+    documents = [_serialize_case_item(item) for item in retrieval[:max_results]]
+
+    return {
+        "query": query,
+        "documents": documents,
+        "summary": research_bundle["report"],
+        "confidence_score": _estimate_confidence(retrieval),
+        "knowledge_graph": context.get("knowledge_graph"),
+        "precedent_analysis": context.get("precedent"),
+        "ai_generated": ollama_client is not None and research_bundle.get("source") == "llm",
+        "source": research_bundle.get("source", "fallback"),
+        "cached_report": research_bundle.get("cached", False),
+        "generation_pending": research_bundle.get("generation_pending", False),
+    }
+
+
+def _overloaded_exception(exc: SchedulerOverloaded) -> HTTPException:
+    return HTTPException(status_code=exc.status_code, detail=str(exc), headers=exc.headers)
+
+
+async def _scheduled_stream(prompt: str, lease: SchedulerLease) -> AsyncIterator[str]:
+    try:
+        async for chunk in generate_ai_response_stream(prompt):
+            yield chunk
+    finally:
+        # Frees the slot as soon as generation ends; the response releases it otherwise.
+        lease.release()
+
+
 @router.post("/api/research/stream")
 async def research_legal_query_stream(request: Dict[str, Any]):
     """Stream research results word-by-word with hybrid retrieval context."""
@@ -919,10 +1157,20 @@ async def research_legal_query_stream(request: Dict[str, Any]):
     context_bundle = await prepare_research_context(query, top_k=6)
     prompt = context_bundle.get("prompt") or _basic_prompt(query)
 
-    return StreamingResponse(
-        generate_ai_response_stream(prompt),
-        media_type="text/event-stream",
-    )
+    try:
+        lease = await get_llm_scheduler().acquire(Priority.INTERACTIVE_STREAM)
+    except SchedulerOverloaded as exc:
+        raise _overloaded_exception(exc)
+
+    try:
+        return LeasedStreamingResponse(
+            _scheduled_stream(prompt, lease),
+            lease,
+            media_type="text/event-stream",
+        )
+    except BaseException:
+        lease.release()
+        raise
 
 
 @router.post("/api/research")
@@ -931,35 +1179,103 @@ async def research_legal_query(request: Dict[str, Any]) -> Dict[str, Any]:
     try:
         query = request.get("query", "")
         max_results = max(1, int(request.get("max_results", 10)))
+        priority = Priority.parse(request.get("priority"), default=Priority.INTERACTIVE)
+        deadline = Deadline.from_request(request)
 
         research_bundle = await asyncio.wait_for(
-            generate_structured_legal_research(query),
+            generate_structured_legal_research(query, priority=priority, deadline=deadline),
             timeout=600.0,
         )
 
-        context = research_bundle.get("context", {})
-        retrieval = context.get("retrieval", [])
-
-        documents = [_serialize_case_item(item) for item in retrieval[:max_results]]
-
-        response_payload: Dict[str, Any] = {
-            "query": query,
-            "documents": documents,
-            "summary": research_bundle["report"],
-            "confidence_score": _estimate_confidence(retrieval),
-            "knowledge_graph": context.get("knowledge_graph"),
-            "precedent_analysis": context.get("precedent"),
-            "ai_generated": ollama_client is not None and research_bundle.get("source") == "llm",
-        }
-
-        return response_payload
+        return _build_research_payload(query, research_bundle, max_results)
 
+    except InvalidDeadline as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except SchedulerOverloaded as exc:
+        raise _overloaded_exception(exc)
     except asyncio.TimeoutError:
         raise HTTPException(status_code=504, detail="Request timed out. Please try again with a simpler query.")
     except Exception as exc:  # pragma: no cover - defensive logging
         raise HTTPException(status_code=500, detail=str(exc))
 
 
+async def _run_research_job(
+    query: str,
+    params: Dict[str, Any],
+    report_progress: ProgressCallback,
+) -> Dict[str, Any]:
+    research_bundle = await generate_structured_legal_research(
+        query,
+        priority=Priority.BATCH,
+        progress=report_progress,
+    )
+    await report_progress("formatting", None)
+    return _build_research_payload(query, research_bundle, params["max_results"])
+
+
+_job_manager: Optional[ResearchJobManager] = None
+
+
+def get_research_job_manager() -> ResearchJobManager:
+    global _job_manager
+
+    if _job_manager is None:
+        store = ResearchJobStore(RESEARCH_JOBS_DB_PATH)
+        _job_manager = ResearchJobManager(
+            store,
+            _run_research_job,
+            workers=DEFAULT_JOB_WORKERS,
+            is_reusable=_job_result_reusable,
+        )
+    return _job_manager
+
+
+def _job_result_reusable(payload: Dict[str, Any]) -> bool:
+    # Fallback reports (LLM timeout, failure or deadline) must not stand in for a real report.
+    return payload.get("source") == "llm" and not payload.get("generation_pending")
+
+
+async def _start_research_jobs() -> None:
+    """Resume jobs left queued or running by a previous process."""
+    await get_research_job_manager().start()
+
+
+router.add_event_handler("startup", _start_research_jobs)
+
+
+@router.post("/api/research/jobs", status_code=202)
+async def submit_research_job(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Queue a long-running research report and return its job id immediately."""
+    query = str(request.get("query", "")).strip()
+    if not query:
+        raise HTTPException(status_code=400, detail="A non-empty query is required.")
+
+    params = {"max_results": max(1, int(request.get("max_results", 10)))}
+    job = await get_research_job_manager().submit(query, params)
+
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "reused": job["reused"],
+        "status_url": f"/api/research/jobs/{job['job_id']}",
+    }
+
+
+@router.get("/api/research/jobs/{job_id}")
+async def get_research_job(job_id: str) -> Dict[str, Any]:
+    """Return status, partial progress and (once completed) the final research payload."""
+    job = await get_research_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Research job not found")
+    return job
+
+
+@router.get("/api/research/metrics")
+async def research_scheduler_metrics() -> Dict[str, Any]:
+    """Expose LLM admission-control metrics (queue depth, wait times, rejections)."""
+    return {"llm_scheduler": get_llm_scheduler().metrics(), "report_cache": _report_cache.stats()}
+
+
 __all__ = [
     "router",
     "generate_structured_legal_research",
@@ -0,0 +1,261 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .llm_scheduler import SchedulerOverloaded
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_WORKERS = int(os.getenv("RESEARCH_JOB_WORKERS", "2"))
+# Completed reports older than this are regenerated instead of handed back.
+DEFAULT_REUSE_TTL = float(os.getenv("RESEARCH_JOB_REUSE_TTL_HOURS", "24")) * 3600
+MAX_OVERLOAD_RETRIES = 5
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+ProgressCallback = Callable[[str, Optional[Dict[str, Any]]], Awaitable[None]]
+JobRunner = Callable[[str, Dict[str, Any], ProgressCallback], Awaitable[Dict[str, Any]]]
+ReusePolicy = Callable[[Dict[str, Any]], bool]
+
+
+def job_cache_key(query: str, params: Dict[str, Any]) -> str:
+    """Key identifying equivalent research requests so results can be reused."""
+    normalized = " ".join(query.lower().split())
+    payload = json.dumps({"query": normalized, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResearchJobStore:
+    """SQLite persistence for research jobs and their final payloads."""
+
+    def __init__(self, path: Path, reuse_ttl: float = DEFAULT_REUSE_TTL):
+        self.path = Path(path)
+        self.reuse_ttl = reuse_ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS research_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    cache_key TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    reusable INTEGER NOT NULL DEFAULT 1,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_research_jobs_cache_key ON research_jobs (cache_key, status)"
+            )
+
+    def create(self, query: str, params: Dict[str, Any], cache_key: str) -> Dict[str, Any]:
+        now = time.time()
+        job_id = f"job_{uuid.uuid4().hex}"
+        progress = {"stage": JOB_QUEUED, "updated_at": now}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO research_jobs (job_id, cache_key, query, params, status, progress, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, cache_key, query, json.dumps(params), JOB_QUEUED, json.dumps(progress), now, now),
+            )
+        return self.get(job_id)  # type: ignore[return-value]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM research_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def find_reusable(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return an in-flight job for the same request, or a completed one that is
+        reusable and younger than ``reuse_ttl``; completed first, newest first.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM research_jobs WHERE cache_key = ? AND ("
+                "status IN (?, ?) OR (status = ? AND reusable = 1 AND updated_at >= ?)) "
+                "ORDER BY CASE status WHEN ? THEN 0 ELSE 1 END, created_at DESC LIMIT 1",
+                (cache_key, JOB_RUNNING, JOB_QUEUED, JOB_COMPLETED, time.time() - self.reuse_ttl, JOB_COMPLETED),
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_incomplete(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM research_jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING),
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def update(
+        self,
+        job_id: str,
+        status: str,
+        progress: Dict[str, Any],
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        reusable: bool = True,
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE research_jobs SET status = ?, progress = ?, result = ?, error = ?, reusable = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (
+                    status,
+                    json.dumps(progress, default=str),
+                    json.dumps(result, default=str) if result is not None else None,
+                    error,
+                    int(reusable),
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["job_id"],
+            "query": row["query"],
+            "params": json.loads(row["params"]),
+            "status": row["status"],
+            "progress": json.loads(row["progress"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "reusable": bool(row["reusable"]),
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+
+class ResearchJobManager:
+    """Runs research jobs on a pool of asyncio workers backed by a ResearchJobStore."""
+
+    def __init__(
+        self,
+        store: ResearchJobStore,
+        runner: JobRunner,
+        workers: int = DEFAULT_JOB_WORKERS,
+        is_reusable: Optional[ReusePolicy] = None,
+    ):
+        self.store = store
+        self.runner = runner
+        # Decides whether a finished result may be handed to later identical requests.
+        self.is_reusable = is_reusable or (lambda result: True)
+        self.worker_count = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._start_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        async with self._start_lock:
+            if self._workers:
+                return
+            queue: asyncio.Queue = asyncio.Queue()
+            # Resume work interrupted by a restart instead of losing it.
+            for job in await asyncio.to_thread(self.store.list_incomplete):
+                queue.put_nowait(job["job_id"])
+
+            self._queue = queue
+            self._workers = [asyncio.create_task(self._worker(index)) for index in range(self.worker_count)]
+        logger.info("Research job manager started with %s workers.", self.worker_count)
+
+    async def submit(self, query: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        await self.start()
+        cache_key = job_cache_key(query, params)
+
+        existing = await asyncio.to_thread(self.store.find_reusable, cache_key)
+        if existing is not None:
+            return {**existing, "reused": True}
+
+        job = await asyncio.to_thread(self.store.create, query, params, cache_key)
+        assert self._queue is not None
+        self._queue.put_nowait(job["job_id"])
+        return {**job, "reused": False}
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # Polling alone must resume jobs interrupted by a restart.
+        await self.start()
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _worker(self, index: int) -> None:
+        assert self._queue is not None
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logger.error("Research job worker %s crashed on %s: %s", index, job_id, exc)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["status"] in (JOB_COMPLETED, JOB_FAILED):
+            return
+
+        started_at = time.time()
+        progress: Dict[str, Any] = {"stage": JOB_RUNNING, "started_at": started_at, "updated_at": started_at}
+        await asyncio.to_thread(self.store.update, job_id, JOB_RUNNING, progress)
+
+        async def report_progress(stage: str, partial: Optional[Dict[str, Any]] = None) -> None:
+            progress["stage"] = stage
+            progress["updated_at"] = time.time()
+            if partial:
+                progress.setdefault("partial", {}).update(partial)
+            await asyncio.to_thread(self.store.update, job_id, JOB_RUNNING, dict(progress))
+
+        for attempt in range(1, MAX_OVERLOAD_RETRIES + 1):
+            try:
+                result = await self.runner(job["query"], job["params"], report_progress)
+                break
+            except SchedulerOverloaded as exc:
+                progress["overload_retries"] = attempt
+                if attempt == MAX_OVERLOAD_RETRIES:
+                    await self._fail(job_id, progress, str(exc))
+                    return
+                await report_progress("waiting_for_llm_capacity")
+                await asyncio.sleep(exc.retry_after)
+            except Exception as exc:
+                logger.error("Research job %s failed: %s", job_id, exc)
+                await self._fail(job_id, progress, str(exc))
+                return
+
+        progress["stage"] = JOB_COMPLETED
+        progress["finished_at"] = progress["updated_at"] = time.time()
+        reusable = self.is_reusable(result)
+        await asyncio.to_thread(self.store.update, job_id, JOB_COMPLETED, progress, result, None, reusable)
+
+    async def _fail(self, job_id: str, progress: Dict[str, Any], error: str) -> None:
+        progress["stage"] = JOB_FAILED
+        progress["finished_at"] = progress["updated_at"] = time.time()
+        await asyncio.to_thread(self.store.update, job_id, JOB_FAILED, progress, None, error)
+
+
+__all__ = [
+    "ProgressCallback",
+    "ResearchJobManager",
+    "ResearchJobStore",
+    "job_cache_key",
+]
@@ -1,81 +1,103 @@
 from transformers import pipeline
 import os
+import sys
 import json
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+from agents.token_chunker import TokenChunker
 
 # Initialize Hugging Face summarization pipeline
 summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+# Chunks are measured in BART tokens, so none is truncated by the 1024-token limit.
+chunker = TokenChunker(summarizer.tokenizer, overlap_tokens=int(os.getenv("LEGISAI_SUMMARY_OVERLAP_TOKENS", "64")))
+
+# Chunks per forward pass; chunks are sorted by length first so a batch pads little.
+SUMMARY_BATCH_SIZE = int(os.getenv("LEGISAI_SUMMARY_BATCH_SIZE", "8"))
+
+SUMMARY_ARGS = {"max_length": 120, "min_length": 30}
+HEADNOTE_ARGS = {"max_length": 60, "min_length": 20}
+RATIO_ARGS = {"max_length": 130, "min_length": 30}
+RATIO_PROMPT = "Extract the ratio decidendi (the key legal principle) and any obiter dicta (non-binding remarks) from this case:\n"
 
-def chunk_text(text, max_chars=2000):
+def chunk_text(text, reserve_text=""):
     """
-    Chunk text by max character count (safer for tokenized model input),
-    keeps paragraphs together.
+    Chunk text into paragraph-aligned pieces that fit BART's token window,
+    leaving room for ``reserve_text`` when it is prepended to every chunk.
     """
-    paragraphs = text.split('\n')
-    chunks = []
-    current = ''
-    for para in paragraphs:
-        if len(current) + len(para) > max_chars and current:
-            chunks.append(current.strip())
-            current = ''
-        current += para + '\n'
-    if current:
-        chunks.append(current.strip())
-    return chunks
+    return chunker.chunk(text, reserve_text=reserve_text)
 
-def summarize_case(text):
-    summaries = []
-    for chunk in chunk_text(text, max_chars=1800):  # Safe margin for BART (max 2000 chars)
+def summarize_chunks(chunks, batch_size=SUMMARY_BATCH_SIZE, error_prefix="Error summarizing chunk", **generate_args):
+    """
+    Summaries of ``chunks`` in their original order. Chunks are bucketed by
+    token length and each bucket is one batched call to the pipeline; if a
+    batch fails its chunks are retried one by one so only the bad chunk
+    reports an error.
+    """
+    results = [None] * len(chunks)
+    if not chunks:
+        return results
+    order = sorted(range(len(chunks)), key=chunker.count_tokens(chunks).__getitem__)
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        texts = [chunks[i] for i in bucket]
         try:
-            summary = summarizer(chunk, max_length=120, min_length=30, do_sample=False)
-            summaries.append(summary[0]['summary_text'])
-        except Exception as e:
-            summaries.append(f"Error summarizing chunk: {str(e)}")
-    return "\n".join(summaries)
+            outputs = summarizer(texts, batch_size=len(texts), truncation=True, do_sample=False, **generate_args)
+        except Exception:
+            outputs = []
+            for text in texts:
+                try:
+                    outputs.append(summarizer(text, truncation=True, do_sample=False, **generate_args)[0])
+                except Exception as e:
+                    outputs.append({"summary_text": f"{error_prefix}: {str(e)}"})
+        for i, output in zip(bucket, outputs):
+            if isinstance(output, list):
+                output = output[0]
+            results[i] = output["summary_text"]
+    return results
+
+def _summarize_grouped(groups, batch_size=SUMMARY_BATCH_SIZE, **generate_args):
+    """Summarize the chunks of several texts in shared batches; one joined summary per text."""
+    flat = [chunk for chunks in groups for chunk in chunks]
+    summaries = summarize_chunks(flat, batch_size=batch_size, **generate_args)
+    joined, offset = [], 0
+    for chunks in groups:
+        joined.append("\n".join(summaries[offset:offset + len(chunks)]))
+        offset += len(chunks)
+    return joined
+
+def summarize_cases(texts, batch_size=SUMMARY_BATCH_SIZE):
+    """Summaries of many cases at once, in the order given."""
+    groups = chunker.chunk_many(texts)
+    return _summarize_grouped(groups, batch_size=batch_size, **SUMMARY_ARGS)
 
 def summarize_case(text):
-    summaries = []
-    for chunk in chunk_text(text):
-        summary = summarizer(chunk, max_length=120, min_length=30, do_sample=False)
-        summaries.append(summary[0]['summary_text'])
-    return "\n".join(summaries)
+    return summarize_cases([text])[0]
 
-def extract_headnotes(text):
+def _headnote_text(text):
     lines = text.split('\n')
     headnote_text = "\n".join(lines[:4]) if len(lines) >= 4 else text
-    summaries = []
-    for chunk in chunk_text(headnote_text, max_chars=1200):  # safe for short headnotes
-        try:
-            summary = summarizer(chunk, max_length=60, min_length=20, do_sample=False)
-            summaries.append(summary[0]['summary_text'])
-        except Exception as e:
-            summaries.append(f"Error summarizing chunk: {str(e)}")
-    return "\n".join(summaries)
+    return headnote_text
+
+def extract_headnotes_many(texts, batch_size=SUMMARY_BATCH_SIZE):
+    groups = chunker.chunk_many([_headnote_text(text) for text in texts])
+    return _summarize_grouped(groups, batch_size=batch_size, **HEADNOTE_ARGS)
+
+def extract_headnotes(text):
+    return extract_headnotes_many([text])[0]
+
+def extract_ratio_obiter_many(texts, batch_size=SUMMARY_BATCH_SIZE):
+    # Room for the prompt is reserved in every chunk.
+    groups = [[RATIO_PROMPT + chunk for chunk in chunks] for chunks in chunker.chunk_many(texts, reserve_text=RATIO_PROMPT)]
+    return _summarize_grouped(groups, batch_size=batch_size, error_prefix="Error", **RATIO_ARGS)
 
 def extract_ratio_obiter(text):
-    prompt = "Extract the ratio decidendi (the key legal principle) and any obiter dicta (non-binding remarks) from this case:\n"
-    max_chars = 2000  # 1024 BART tokens ≈ 2000-3000 chars, leave margin for prompt
-    results = []
-    paragraphs = text.split('\n')
-    chunk = ""
-    for para in paragraphs:
-        # Always reserve room for the prompt text by counting total length
-        if len(prompt) + len(chunk) + len(para) > max_chars:
-            try:
-                summary = summarizer(prompt + chunk, max_length=130, min_length=30, do_sample=False)
-                results.append(summary[0]['summary_text'])
-            except Exception as e:
-                results.append(f"Error: {str(e)}")
-            chunk = ""
-        chunk += para + "\n"
-    if chunk:
-        try:
-            summary = summarizer(prompt + chunk, max_length=130, min_length=30, do_sample=False)
-            results.append(summary[0]['summary_text'])
-        except Exception as e:
-            results.append(f"Error: {str(e)}")
-    return "\n".join(results)
+    return extract_ratio_obiter_many([text])[0]
 
-def contrastive_summary(text):
+def _split_sides(text):
     pro_plaintiff = ""
     pro_defendant = ""
     for para in text.split('\n\n'):
@@ -84,35 +106,64 @@ def contrastive_summary(text):
             pro_plaintiff += para + "\n"
         elif "defendant" in lower or "appellee" in lower:
             pro_defendant += para + "\n"
-    summary_plaintiff = summarize_case(pro_plaintiff) if pro_plaintiff else "No plaintiff/appellant arguments found."
-    summary_defendant = summarize_case(pro_defendant) if pro_defendant else "No defendant/appellee arguments found."
-    return summary_plaintiff, summary_defendant
+    return pro_plaintiff, pro_defendant
+
+def contrastive_summaries(texts, batch_size=SUMMARY_BATCH_SIZE):
+    """(plaintiff, defendant) summary pairs for many cases, both sides of every case batched together."""
+    sides = [side for text in texts for side in _split_sides(text)]
+    summaries = summarize_cases([side for side in sides if side], batch_size=batch_size)[::-1]
+    results = []
+    for i in range(0, len(sides), 2):
+        pro_plaintiff, pro_defendant = sides[i], sides[i + 1]
+        summary_plaintiff = summaries.pop() if pro_plaintiff else "No plaintiff/appellant arguments found."
+        summary_defendant = summaries.pop() if pro_defendant else "No defendant/appellee arguments found."
+        results.append((summary_plaintiff, summary_defendant))
+    return results
+
+def contrastive_summary(text):
+    return contrastive_summaries([text])[0]
+
+def load_cases(cases_folder):
+    """(filename, opinion text) of every usable case JSON in ``cases_folder``."""
+    cases = []
+    for filename in sorted(os.listdir(cases_folder)):
+        if filename.endswith('.json'):
+            with open(os.path.join(cases_folder, filename), 'r', encoding='utf-8') as f:
+                case = json.load(f)
+            casebody = case.get("casebody", {})
+            opinions = casebody.get("opinions", [])
+            case_text = opinions[0].get("text", "") if opinions and isinstance(opinions[0], dict) else ""
+            if not case_text or len(case_text) < 20:
+                continue  # skip empty/invalid cases
+            cases.append((filename, case_text))
+    return cases
 
 # --- Multi-Case Loop ---
-cases_folder = "D:/AIP/data/"
-for filename in os.listdir(cases_folder):
-    if filename.endswith('.json'):
-        with open(os.path.join(cases_folder, filename), 'r', encoding='utf-8') as f:
-            case = json.load(f)
-        casebody = case.get("casebody", {})
-        opinions = casebody.get("opinions", [])
-        case_text = opinions[0].get("text", "") if opinions and isinstance(opinions[0], dict) else ""
-        if not case_text or len(case_text) < 20:
-            continue  # skip empty/invalid cases
+if __name__ == "__main__":
+    cases_folder = "D:/AIP/data/"
+    cases = load_cases(cases_folder)
+    texts = [case_text for _, case_text in cases]
+    # Every case's chunks go through the model together, task by task.
+    try:
+        summaries = summarize_cases(texts)
+    except Exception as e:
+        summaries = [f"Error in summary: {str(e)}"] * len(texts)
+    headnotes = extract_headnotes_many(texts)
+    try:
+        ratios = extract_ratio_obiter_many(texts)
+    except Exception as e:
+        ratios = [f"Error during ratio/obiter extraction: {str(e)}"] * len(texts)
+    contrastive = contrastive_summaries(texts)
+    for (filename, _), summary, headnote, ratio, (plaintiff_summary, defendant_summary) in zip(
+        cases, summaries, headnotes, ratios, contrastive
+    ):
         print(f"\n=== {filename} ===")
-        try:
-            print("--- Summary ---")
-            print(summarize_case(case_text))
-        except Exception as e:
-            print(f"Error in summary for {filename}: {str(e)}")
+        print("--- Summary ---")
+        print(summary)
         print("--- Headnotes ---")
-        print(extract_headnotes(case_text))
+        print(headnote)
         print("--- Ratio Decidendi & Obiter Dicta ---")
-        try:
-            print(extract_ratio_obiter(case_text))
-        except Exception as e:
-            print(f"Error during ratio/obiter extraction: {str(e)}")
+        print(ratio)
         print("--- Contrastive Summarization ---")
-        plaintiff_summary, defendant_summary = contrastive_summary(case_text)
         print("Plaintiff/Appellant:\n", plaintiff_summary)
         print("Defendant/Appellee:\n", defendant_summary)
@@ -0,0 +1,151 @@
+"""Tokenizer-aware chunking for the summarization models.
+
+The summarizers used to cut text by character counts (1800, 2000 or 1200
+characters, or a plain truncation to 1024), which either wastes most of
+BART's 1024-token window or silently loses the tail of a chunk to truncation.
+``TokenChunker`` measures text in the model's own tokens instead:
+
+* paragraphs are packed greedily up to the model limit, less the special
+  tokens the model adds and any prompt text that will be prepended (as
+  ``extract_ratio_obiter`` does), so no chunk is truncated;
+* consecutive chunks share up to ``overlap_tokens`` of trailing paragraphs, so
+  a holding split across a chunk boundary is seen whole at least once;
+* a single paragraph longer than the budget is cut into token windows (with
+  the same overlap) at the tokenizer's character offsets;
+* all paragraphs of all texts are encoded in one batch call, which a fast
+  (Rust) tokenizer parallelises, so chunking a long opinion costs
+  milliseconds.
+"""
+
+import os
+from typing import List, Optional, Sequence, Tuple
+
+# Some tokenizers report a huge sentinel instead of a real limit.
+_UNKNOWN_MAX_LENGTH = 100_000
+DEFAULT_MAX_TOKENS = 512
+DEFAULT_OVERLAP_TOKENS = int(os.getenv("LEGISAI_CHUNK_OVERLAP_TOKENS", "64"))
+
+
+class TokenChunker:
+    def __init__(
+        self,
+        tokenizer,
+        max_tokens: Optional[int] = None,
+        overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+        separator: str = "\n",
+    ):
+        """
+        ``tokenizer`` is a Hugging Face tokenizer (preferably fast);
+        ``max_tokens`` defaults to its ``model_max_length``.
+        """
+        self.tokenizer = tokenizer
+        model_limit = getattr(tokenizer, "model_max_length", None) or DEFAULT_MAX_TOKENS
+        if model_limit > _UNKNOWN_MAX_LENGTH:
+            model_limit = DEFAULT_MAX_TOKENS
+        self.max_tokens = min(max_tokens or model_limit, model_limit)
+        self.overlap_tokens = max(0, overlap_tokens)
+        self.separator = separator
+        self._special_tokens = tokenizer.num_special_tokens_to_add(pair=False)
+        self._separator_tokens = max(1, self.count_tokens([separator])[0]) if separator else 0
+
+    @classmethod
+    def from_pretrained(cls, model_name: str, **kwargs) -> "TokenChunker":
+        from transformers import AutoTokenizer
+
+        return cls(AutoTokenizer.from_pretrained(model_name, use_fast=True), **kwargs)
+
+    def count_tokens(self, texts: Sequence[str]) -> List[int]:
+        """Token counts of ``texts`` without special tokens, in one batch call."""
+        if not texts:
+            return []
+        encoded = self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def budget(self, reserve_text: str = "") -> int:
+        """Content tokens that fit in one chunk once ``reserve_text`` is prepended."""
+        reserved = self.count_tokens([reserve_text])[0] if reserve_text else 0
+        budget = self.max_tokens - self._special_tokens - reserved
+        if budget <= 0:
+            raise ValueError(f"Reserved text leaves no room in a {self.max_tokens}-token window")
+        return budget
+
+    def chunk(self, text: str, reserve_text: str = "") -> List[str]:
+        return self.chunk_many([text], reserve_text=reserve_text)[0]
+
+    def chunk_many(self, texts: Sequence[str], reserve_text: str = "") -> List[List[str]]:
+        """Chunks of every text, each fitting the model once ``reserve_text`` is prepended."""
+        budget = self.budget(reserve_text)
+        # Overlap larger than half the window would make chunking crawl.
+        overlap = min(self.overlap_tokens, budget // 2)
+        paragraphs = [[para.strip() for para in text.split("\n") if para.strip()] for text in texts]
+        flat = [para for paras in paragraphs for para in paras]
+        if not flat:
+            return [[] for _ in texts]
+        encoded = self.tokenizer(flat, add_special_tokens=False, return_offsets_mapping=self._fast)
+        ids, offsets = encoded["input_ids"], encoded.get("offset_mapping") if self._fast else None
+
+        chunks, position = [], 0
+        for paras in paragraphs:
+            units: List[Tuple[str, int]] = []
+            for para in paras:
+                if len(ids[position]) <= budget:
+                    units.append((para, len(ids[position])))
+                else:
+                    units.extend(self._windows(para, ids[position], offsets[position] if offsets else None, budget, overlap))
+                position += 1
+            chunks.append(self._pack(units, budget, overlap))
+        return chunks
+
+    @property
+    def _fast(self) -> bool:
+        return bool(getattr(self.tokenizer, "is_fast", False))
+
+    def _windows(self, text: str, ids: List[int], offsets, budget: int, overlap: int) -> List[Tuple[str, int]]:
+        """Token windows of one over-long paragraph, ``overlap`` tokens apart."""
+        windows = []
+        step = budget - overlap
+        for start in range(0, len(ids), step):
+            end = min(start + budget, len(ids))
+            if offsets is not None:
+                piece = text[offsets[start][0]:offsets[end - 1][1]]
+            else:
+                piece = self.tokenizer.decode(ids[start:end])
+            windows.append((piece.strip(), end - start))
+            if end == len(ids):
+                break
+        return windows
+
+    def _pack(self, units: List[Tuple[str, int]], budget: int, overlap: int) -> List[str]:
+        chunks: List[str] = []
+        current: List[Tuple[str, int]] = []
+        size = 0
+        for unit in units:
+            cost = unit[1] + (self._separator_tokens if current else 0)
+            if current and size + cost > budget:
+                chunks.append(self.separator.join(text for text, _ in current))
+                current = self._carry(current, overlap)
+                size = sum(tokens for _, tokens in current) + self._separator_tokens * max(0, len(current) - 1)
+                # Drop carried context until the next unit fits.
+                while current and size + self._separator_tokens + unit[1] > budget:
+                    dropped = current.pop(0)
+                    size -= dropped[1] + (self._separator_tokens if current else 0)
+                cost = unit[1] + (self._separator_tokens if current else 0)
+            current.append(unit)
+            size += cost
+        if current:
+            chunks.append(self.separator.join(text for text, _ in current))
+        return chunks
+
+    def _carry(self, units: List[Tuple[str, int]], overlap: int) -> List[Tuple[str, int]]:
+        """Trailing units of a finished chunk that fit in ``overlap`` tokens."""
+        carried, size = [], 0
+        for unit in reversed(units):
+            cost = unit[1] + (self._separator_tokens if carried else 0)
+            if size + cost > overlap:
+                break
+            carried.insert(0, unit)
+            size += cost
+        return carried
+
+
+__all__ = ["TokenChunker"]
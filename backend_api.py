@@ -3,20 +3,54 @@ backend_api.py
 -------------------------------------------------------
 FastAPI backend for LegisAI — Explainability & Cross-Consistency Layer.
 This API routes requests from the frontend to the agent orchestration engine.
+
+Cross-consistency runs never block the event loop: each request is orchestrated
+on a dedicated, sized thread pool (CROSS_CONSISTENCY_REQUEST_WORKERS), agents
+run on the shared fair agent pool (CROSS_CONSISTENCY_MAX_WORKERS), and scoring
+can be moved to a process pool (CROSS_CONSISTENCY_SCORING_PROCESSES). A run is
+cancelled as soon as its client disconnects.
+
+Launching
+---------
+Development (single process, auto-reload):
+
+    LEGISAI_RELOAD=1 python backend_api.py
+
+Production (no reload, one process per worker; each worker has its own pools,
+so size CROSS_CONSISTENCY_MAX_WORKERS per process):
+
+    LEGISAI_WORKERS=4 python backend_api.py
+    # or
+    uvicorn backend_api:app --host 0.0.0.0 --port 8000 --workers 4
+    gunicorn backend_api:app -k uvicorn.workers.UvicornWorker -w 4 -b 0.0.0.0:8000
+
+The clause cache is a shared SQLite file, so cache hits are shared by all workers.
 """
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
 import sys
 import os
+import asyncio
+import functools
+import json
+import threading
 import traceback
 
 # ✅ Ensure the 'agents' folder is discoverable
 sys.path.append(os.path.abspath("."))
 
 # ✅ Import your cross-consistency logic
-from agents.explainability.cross_consistency import run_cross_consistency
+from agents.explainability.cross_consistency import iter_cross_consistency_batch, run_cross_consistency
+from agents.explainability.clause_cache import get_clause_cache
+from agents.explainability.llm_client import llm_stats
+from agents.explainability.registry import DEFAULT_REGISTRY
+from agents.explainability.scheduler import RunCancelled, get_request_executor
+from agents.explainability.telemetry import metrics, tracer
+from agents.explainability.utils.clause_parser import split_into_clauses
 
 
 # ------------------------------------------------------
@@ -43,30 +77,103 @@ app.add_middleware(
 # ------------------------------------------------------
 class ClauseRequest(BaseModel):
     clause: str
+    # Optional per-request agent selection (trade coverage for latency)
+    agents: Optional[List[str]] = None
+    exclude_agents: Optional[List[str]] = None
+    use_cache: bool = True
+    # Optional caller-supplied id to correlate this run's trace with other systems
+    trace_id: Optional[str] = None
+
+
+class BatchClauseRequest(BaseModel):
+    # Either explicit clauses or a whole contract to split into clauses
+    clauses: Optional[List[str]] = None
+    contract: Optional[str] = None
+    agents: Optional[List[str]] = None
+    exclude_agents: Optional[List[str]] = None
+    max_parallel_clauses: Optional[int] = None
+    use_cache: bool = True
+    trace_id: Optional[str] = None
+
+
+# ------------------------------------------------------
+# 🔌 Cancellable execution
+# ------------------------------------------------------
+DISCONNECT_POLL_SECONDS = 0.25
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def run_until_disconnect(request: Request, func, *args, **kwargs):
+    """
+    Run a blocking, cancel-aware function on the request executor while watching
+    the client connection. If the client goes away (or the request task is
+    cancelled) the function's ``cancel_event`` is set so its agents stop.
+    """
+    cancel_event = threading.Event()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        get_request_executor(), functools.partial(func, *args, cancel_event=cancel_event, **kwargs)
+    )
+    try:
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return future.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    except (ClientDisconnected, asyncio.CancelledError):
+        cancel_event.set()
+        # Nobody awaits the run any more; retrieve its RunCancelled quietly.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        raise
 
 
 # ------------------------------------------------------
 # ✅ Routes
 # ------------------------------------------------------
 
+def _validate_agent_selection(req) -> None:
+    """Reject an unknown or empty agent selection with 400 before any work starts."""
+    try:
+        DEFAULT_REGISTRY.select_agents(req.agents, req.exclude_agents)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/")
 def root():
     return {"message": "LegisAI backend is running successfully 🚀"}
 
 
 @app.post("/cross_consistency")
-async def cross_consistency_endpoint(req: ClauseRequest):
+async def cross_consistency_endpoint(req: ClauseRequest, request: Request):
     """
     Accepts a clause and runs the multi-agent consistency check.
     """
+    _validate_agent_selection(req)
     try:
         clause_text = req.clause
         print(f"🔹 Received clause: {clause_text}")
 
-        # Run the consistency layer
-        result = run_cross_consistency(clause_text)
+        # Run the consistency layer off the event loop; stop it if the client leaves
+        result = await run_until_disconnect(
+            request,
+            run_cross_consistency,
+            clause_text,
+            agents=req.agents,
+            exclude_agents=req.exclude_agents,
+            use_cache=req.use_cache,
+            trace_id=req.trace_id,
+        )
 
-        return {"status": "ok", "result": result}
+        return {"status": "ok", "result": result, "trace_id": result.get("trace_id")}
+
+    except (ClientDisconnected, RunCancelled):
+        print("🔌 Client disconnected; cross-consistency run cancelled.")
+        return {"status": "cancelled"}
 
     except Exception as e:
         print("❌ Error during cross-consistency run:")
@@ -74,9 +181,166 @@ async def cross_consistency_endpoint(req: ClauseRequest):
         return {"status": "error", "error": str(e)}
 
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/cross_consistency/stream")
+async def cross_consistency_stream_endpoint(req: ClauseRequest):
+    """
+    Streams the consistency check as server-sent events: one "agent" event per
+    agent as soon as it finishes (output, confidence, status, latency), then a
+    "result" event with the aggregate score, then "done". Disconnecting cancels
+    the agents that have not finished.
+    """
+    _validate_agent_selection(req)
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancel_event = threading.Event()
+
+        # Called on scheduler threads; hand each entry over to the event loop.
+        def on_agent_result(entry):
+            loop.call_soon_threadsafe(queue.put_nowait, ("agent", entry))
+
+        future = loop.run_in_executor(
+            get_request_executor(),
+            functools.partial(
+                run_cross_consistency,
+                req.clause,
+                agents=req.agents,
+                exclude_agents=req.exclude_agents,
+                use_cache=req.use_cache,
+                cancel_event=cancel_event,
+                on_agent_result=on_agent_result,
+                trace_id=req.trace_id,
+            ),
+        )
+        future.add_done_callback(lambda _: queue.put_nowait(("finished", None)))
+
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == "agent":
+                    yield _sse("agent", payload)
+                    continue
+
+                result = future.result()
+                yield _sse("error" if "error" in result else "result", result)
+                yield _sse("done", {})
+                return
+        finally:
+            if not future.done():
+                print("🔌 Client disconnected; cross-consistency stream cancelled.")
+                cancel_event.set()
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    print(f"🔹 Streaming cross-consistency for clause: {req.clause}")
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/cross_consistency/batch")
+def cross_consistency_batch_endpoint(req: BatchClauseRequest):
+    """
+    Runs the consistency check over many clauses (or a whole contract) with bounded
+    parallelism. Streams newline-delimited JSON: one "clause" event per clause as it
+    completes, then a contract-level "summary" event.
+    """
+    clauses = list(req.clauses or [])
+    if req.contract:
+        clauses.extend(split_into_clauses(req.contract))
+    clauses = [clause for clause in clauses if clause.strip()]
+    if not clauses:
+        raise HTTPException(status_code=400, detail="Provide 'clauses' or a non-empty 'contract'.")
+
+    # Before the response starts streaming.
+    _validate_agent_selection(req)
+
+    def ndjson():
+        events = iter_cross_consistency_batch(
+            clauses,
+            agents=req.agents,
+            exclude_agents=req.exclude_agents,
+            max_parallel_clauses=req.max_parallel_clauses,
+            use_cache=req.use_cache,
+            trace_id=req.trace_id,
+        )
+        # Starlette stops iterating when the client disconnects; closing the
+        # batch generator then cancels the clauses still in flight.
+        try:
+            for event in events:
+                yield json.dumps(event) + "\n"
+        finally:
+            events.close()
+
+    print(f"🔹 Streaming batch cross-consistency for {len(clauses)} clauses")
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.get("/cross_consistency/cache")
+def clause_cache_stats():
+    """
+    Reports clause-result cache size and exact / near-duplicate hit rates.
+    """
+    cache = get_clause_cache()
+    return {"enabled": cache is not None, "stats": cache.stats() if cache is not None else None}
+
+
+@app.get("/metrics")
+def metrics_endpoint(format: str = "prometheus"):
+    """
+    Per-agent latency histograms, call and error counters and run outcomes, in the
+    Prometheus text format (or JSON with ?format=json).
+    """
+    if format == "json":
+        return metrics.snapshot()
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    """
+    Returns the spans of a recent run (see "trace_id" in cross-consistency responses).
+    """
+    spans = tracer.get_trace(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail="Trace not found (unknown or evicted from the trace buffer).")
+    return {"trace_id": trace_id, "spans": spans}
+
+
+@app.get("/llm")
+def llm_backend_stats():
+    """
+    Reports the agents' model backend and batched-inference statistics.
+    """
+    return llm_stats()
+
+
+@app.get("/agents")
+def list_agents():
+    """
+    Lists the registered agents and shared artifacts with their declared inputs.
+    """
+    return {"nodes": DEFAULT_REGISTRY.describe()}
+
+
 # ------------------------------------------------------
-# 🧪 Run directly (for debugging)
+# 🚀 Run directly (development or production, see module docstring)
 # ------------------------------------------------------
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("backend_api:app", host="127.0.0.1", port=8000, reload=True)
+
+    # Reload only in development; it forces a single worker process.
+    reload = os.getenv("LEGISAI_RELOAD", "0") == "1"
+    uvicorn.run(
+        "backend_api:app",
+        host=os.getenv("LEGISAI_HOST", "127.0.0.1"),
+        port=int(os.getenv("LEGISAI_PORT", "8000")),
+        reload=reload,
+        workers=1 if reload else int(os.getenv("LEGISAI_WORKERS", "1")),
+    )
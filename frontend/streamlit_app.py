@@ -1,22 +1,72 @@
+import json
+import os
+
 import streamlit as st
 import requests
 
+BACKEND_URL = os.getenv("LEGISAI_BACKEND_URL", "http://127.0.0.1:8000")
+
+
+def stream_events(clause):
+    """Yield (event, data) pairs from the backend's server-sent event stream."""
+    with requests.post(
+        f"{BACKEND_URL}/cross_consistency/stream", json={"clause": clause}, stream=True, timeout=(5, 300)
+    ) as response:
+        response.raise_for_status()
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):].strip())
+                event = "message"
+
+
+def render_agent(entry):
+    label = f"{entry['agent']} · {entry['status']} · {entry['latency_ms']} ms"
+    if entry.get("cached"):
+        label += " · cached"
+    if entry["status"] == "ok":
+        st.markdown(f"**{label}** — confidence {entry['confidence']}")
+        st.write(entry["output"])
+    else:
+        st.markdown(f"**{label}**")
+        st.warning(entry.get("error", "Agent unavailable."))
+
+
 st.title("🧠 LegisAI – Cross Consistency Checker")
 
 clause = st.text_area("Enter contract clause:", height=150)
 
 if st.button("Run Cross Consistency"):
     if clause.strip():
-        with st.spinner("Running analysis..."):
-            response = requests.post("http://127.0.0.1:8000/cross_consistency", json={"clause": clause})
-            if response.status_code == 200:
-                data = response.json()
-                st.success(data["summary"])
-                st.write("### Individual Scores")
-                for role, score in data["scores"].items():
-                    st.progress(int(score))
-                    st.text(f"{role}: {score}%")
-            else:
-                st.error("Backend error, check terminal.")
+        status = st.status("Running analysis...", expanded=True)
+        summary = st.empty()
+        st.write("### Agents")
+        agents_area = st.container()
+        completed = 0
+
+        try:
+            for event, data in stream_events(clause):
+                if event == "agent":
+                    completed += 1
+                    status.update(label=f"Running analysis... {completed} agent(s) done")
+                    with agents_area:
+                        render_agent(data)
+                elif event == "result":
+                    status.update(label="Analysis complete", state="complete", expanded=False)
+                    with summary.container():
+                        st.success(data["summary"])
+                        if data["consistency_score"] is not None:
+                            st.metric("Consistency score", f"{data['consistency_score']:.2f}")
+                            st.progress(min(1.0, max(0.0, data["consistency_score"])))
+                        if data.get("outlier_agents"):
+                            st.info(f"Outlier agents: {', '.join(data['outlier_agents'])}")
+                elif event == "error":
+                    status.update(label="Analysis failed", state="error")
+                    st.error(data.get("error", "Backend error, check terminal."))
+        except requests.RequestException as e:
+            status.update(label="Analysis failed", state="error")
+            st.error(f"Backend error: {e}")
     else:
         st.warning("Please enter a clause to analyze.")
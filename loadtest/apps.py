@@ -0,0 +1,78 @@
+"""
+apps.py
+-------
+Resolves the FastAPI applications exercised by the load-test harness.
+
+``backend`` is the explainability / cross-consistency service in
+``backend_api.py``; ``research`` bundles the research and document-upload
+routers, which are normally mounted by the main application.
+
+``agents/retrieval/research.py`` imports ``agents.retrieval.common``, which is
+not checked into this repository; until it is, only the ``backend`` app (the
+``cross_consistency`` workload) can be loaded, and ``require_app`` says so
+before anything is started.
+"""
+
+import importlib.util
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+APP_NAMES = ("backend", "research")
+
+# Modules each app needs beyond its own routers.
+REQUIRED_MODULES = {"research": ("agents.retrieval.common",)}
+
+
+def missing_modules(name: str) -> List[str]:
+    missing = []
+    for module in REQUIRED_MODULES.get(name, ()):
+        try:
+            found = importlib.util.find_spec(module) is not None
+        except ModuleNotFoundError:
+            found = False
+        if not found:
+            missing.append(module)
+    return missing
+
+
+def require_app(name: str) -> None:
+    """Raise a RuntimeError naming the missing modules if ``name`` cannot be loaded."""
+    missing = missing_modules(name)
+    if missing:
+        raise RuntimeError(
+            f"The {name!r} app needs {', '.join(missing)}, which is not available in this checkout; "
+            "run only the backend workloads (e.g. --mix cross_consistency=1)."
+        )
+
+
+def load_app(name: str):
+    """Import and return the ASGI app registered under ``name``."""
+    require_app(name)
+    if name == "backend":
+        from backend_api import app
+
+        return app
+
+    if name == "research":
+        from fastapi import FastAPI
+
+        from agents.documentation import router as documentation_router
+        from agents.retrieval.research import router as research_router
+
+        app = FastAPI(title="LegisAI Research & Documents (load test)")
+        app.include_router(research_router)
+        app.include_router(documentation_router)
+        return app
+
+    raise ValueError(f"Unknown app {name!r}; expected one of {', '.join(APP_NAMES)}")
+
+
+def repo_pythonpath() -> str:
+    existing = os.environ.get("PYTHONPATH")
+    return os.pathsep.join(filter(None, [str(REPO_ROOT), existing]))
@@ -0,0 +1,468 @@
+"""
+bench_cross_consistency.py
+--------------------------
+Benchmark suite for the cross-consistency orchestrator.
+
+Every explainability agent is given its own simulated model (a ``FakeLLM``
+with a per-agent latency distribution and error rate), then three targets are
+driven at several concurrency levels:
+
+- ``direct`` — ``run_cross_consistency`` from a closed loop of threads;
+- ``batch``  — ``iter_cross_consistency_batch`` with ``max_parallel_clauses``
+  set to the concurrency level;
+- ``http``   — ``POST /cross_consistency`` on ``backend_api.app`` (in-process
+  ASGI transport).
+
+For each target and level it records clause throughput, latency percentiles,
+ok / partial / error counts, CPU time, peak RSS and peak thread count, plus
+the per-agent latency means from the telemetry histograms. Results are
+appended as one JSON record per run (schema-versioned, tagged with git
+commit and environment) so releases can be compared with ``--compare``.
+
+    python -m loadtest.bench_cross_consistency --concurrency 1,4,16 --requests 40 \\
+        --time-scale 1.0 --output bench/cross_consistency.jsonl --compare bench/cross_consistency.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from loadtest.apps import REPO_ROOT
+from loadtest.fake_llm import FakeLLM, FakeLLMConfig
+from loadtest.harness import SAMPLE_CLAUSES, _percentile
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+SCHEMA_VERSION = 1
+TARGETS = ("direct", "batch", "http")
+
+# Mean / standard deviation of each agent's model latency in seconds (lognormal),
+# roughly what a local model gives for these prompt sizes. Scaled by --time-scale.
+DEFAULT_AGENT_PROFILES: Dict[str, Dict[str, float]] = {
+    "ComplianceAgent": {"latency_mean": 4.0, "latency_jitter": 2.0},
+    "RiskAgent": {"latency_mean": 6.0, "latency_jitter": 3.0},
+    "DraftingAgent": {"latency_mean": 8.0, "latency_jitter": 4.0},
+    "PrecedentAgent": {"latency_mean": 12.0, "latency_jitter": 6.0},
+    "LanguageQualityAgent": {"latency_mean": 2.0, "latency_jitter": 1.0},
+    "EthicsAgent": {"latency_mean": 3.0, "latency_jitter": 1.5},
+    "GovernanceAgent": {"latency_mean": 4.0, "latency_jitter": 2.0},
+    "JurisdictionAgent": {"latency_mean": 5.0, "latency_jitter": 2.5},
+    "NegotiationAgent": {"latency_mean": 6.0, "latency_jitter": 3.0},
+    "LiabilityAgent": {"latency_mean": 5.0, "latency_jitter": 2.5},
+}
+
+AGENT_MODULES = {
+    "ComplianceAgent": "compliance_agent",
+    "RiskAgent": "risk_agent",
+    "DraftingAgent": "drafting_agent",
+    "PrecedentAgent": "precedent_agent",
+    "LanguageQualityAgent": "language_quality_agent",
+    "EthicsAgent": "ethics_agent",
+    "GovernanceAgent": "governance_agent",
+    "JurisdictionAgent": "jurisdiction_agent",
+    "NegotiationAgent": "negotiation_agent",
+    "LiabilityAgent": "liability_agent",
+}
+
+
+# ------------------------------------------------------
+# Simulated agents
+# ------------------------------------------------------
+def build_agent_models(
+    profiles: Dict[str, Dict[str, Any]],
+    time_scale: float,
+    error_rate: Optional[float],
+    distribution: str,
+    seed: Optional[int],
+) -> Dict[str, FakeLLM]:
+    models = {}
+    for index, (agent, profile) in enumerate(sorted(profiles.items())):
+        config = FakeLLMConfig(
+            latency_distribution=profile.get("latency_distribution", distribution),
+            latency_mean=profile["latency_mean"] * time_scale,
+            latency_jitter=profile.get("latency_jitter", 0.0) * time_scale,
+            # Latency is modelled entirely as time to first token.
+            tokens_per_second=0.0,
+            output_tokens=int(profile.get("output_tokens", 40)),
+            error_rate=profile.get("error_rate", error_rate if error_rate is not None else 0.02),
+            seed=None if seed is None else seed + index,
+        )
+        models[agent] = FakeLLM(config)
+    return models
+
+
+def install_agent_models(models: Dict[str, FakeLLM]) -> None:
+    """Point each agent module's ``complete`` at that agent's simulated model."""
+    import importlib
+
+    for agent, model in models.items():
+        module = importlib.import_module(f"agents.explainability.agents.{AGENT_MODULES[agent]}")
+        module.complete = model.complete
+
+
+# ------------------------------------------------------
+# Resource sampling
+# ------------------------------------------------------
+class ResourceSampler:
+    """Samples thread count and RSS in the background and reports CPU time used."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_rss_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-sampler", daemon=True)
+
+    @staticmethod
+    def _rss_mb() -> float:
+        try:
+            with open("/proc/self/statm", encoding="ascii") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+        except (OSError, ValueError, AttributeError):
+            if resource is None:
+                return 0.0
+            # ru_maxrss is the lifetime peak (KiB on Linux, bytes on macOS).
+            divisor = 1e6 if sys.platform == "darwin" else 1e3
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_rss_mb = max(self.peak_rss_mb, self._rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._cpu_start = os.times()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        cpu_end = os.times()
+        self.cpu_seconds = (cpu_end.user - self._cpu_start.user) + (cpu_end.system - self._cpu_start.system)
+
+    def report(self, wall_seconds: float) -> Dict[str, float]:
+        return {
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "cpu_utilisation": round(self.cpu_seconds / wall_seconds, 3) if wall_seconds else 0.0,
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "peak_threads": self.peak_threads,
+        }
+
+
+# ------------------------------------------------------
+# Targets
+# ------------------------------------------------------
+def _clause(seq: int) -> str:
+    return f"{SAMPLE_CLAUSES[seq % len(SAMPLE_CLAUSES)]} (bench {seq})"
+
+
+def _classify(result: Dict) -> str:
+    if "error" in result:
+        return "error"
+    return "partial" if result.get("partial") else "ok"
+
+
+def _run_direct(concurrency: int, requests: int, agent_timeout: float) -> List[Dict]:
+    from agents.explainability.cross_consistency import run_cross_consistency
+
+    samples: List[Dict] = []
+    sequence = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                seq = next(sequence, None)
+            if seq is None:
+                return
+            started = time.perf_counter()
+            result = run_cross_consistency(_clause(seq), agent_timeout=agent_timeout, use_cache=False)
+            samples.append({"latency_ms": (time.perf_counter() - started) * 1000, "outcome": _classify(result)})
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return samples
+
+
+def _run_batch(concurrency: int, requests: int, agent_timeout: float) -> List[Dict]:
+    from agents.explainability.cross_consistency import iter_cross_consistency_batch
+
+    samples = []
+    events = iter_cross_consistency_batch(
+        [_clause(seq) for seq in range(requests)],
+        agent_timeout=agent_timeout,
+        max_parallel_clauses=concurrency,
+        use_cache=False,
+    )
+    for event in events:
+        if event["type"] == "clause":
+            result = event["result"]
+            latency = result.get("latency_ms", {}).get("total") if "error" not in result else None
+            samples.append({"latency_ms": latency, "outcome": _classify(result)})
+    return samples
+
+
+def _run_http(concurrency: int, requests: int, agent_timeout: float) -> List[Dict]:
+    import httpx
+
+    from loadtest.apps import load_app
+
+    app = load_app("backend")
+    samples: List[Dict] = []
+
+    async def drive():
+        sequence = iter(range(requests))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend.bench", timeout=None) as client:
+
+            async def worker():
+                for seq in sequence:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post("/cross_consistency", json={"clause": _clause(seq), "use_cache": False})
+                        body = response.json()
+                        outcome = "error" if response.status_code != 200 or body.get("status") != "ok" else _classify(body["result"])
+                    except httpx.HTTPError:
+                        outcome = "error"
+                    samples.append({"latency_ms": (time.perf_counter() - started) * 1000, "outcome": outcome})
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    asyncio.run(drive())
+    return samples
+
+
+TARGET_RUNNERS: Dict[str, Callable[[int, int, float], List[Dict]]] = {
+    "direct": _run_direct,
+    "batch": _run_batch,
+    "http": _run_http,
+}
+
+
+# ------------------------------------------------------
+# Driver
+# ------------------------------------------------------
+def _summarize(samples: List[Dict], wall_seconds: float) -> Dict[str, Any]:
+    latencies = sorted(sample["latency_ms"] for sample in samples if sample["latency_ms"] is not None)
+    outcomes = {"ok": 0, "partial": 0, "error": 0}
+    for sample in samples:
+        outcomes[sample["outcome"]] += 1
+    return {
+        "clauses": len(samples),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_clauses_per_s": round(len(samples) / wall_seconds, 3) if wall_seconds else 0.0,
+        "outcomes": outcomes,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50), 2),
+            "p90": round(_percentile(latencies, 0.90), 2),
+            "p95": round(_percentile(latencies, 0.95), 2),
+            "p99": round(_percentile(latencies, 0.99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+    }
+
+
+def _agent_latency_means(before: Dict, after: Dict) -> Dict[str, float]:
+    """Mean agent latency over one run, from the difference of two histogram snapshots."""
+    means = {}
+    for agent, series in after.items():
+        previous = before.get(agent, {"count": 0, "mean": 0.0})
+        count = series["count"] - previous["count"]
+        if count > 0:
+            total = series["mean"] * series["count"] - previous["mean"] * previous["count"]
+            means[agent] = round(total / count, 2)
+    return means
+
+
+def run_benchmark(
+    targets: List[str],
+    levels: List[int],
+    requests: int,
+    agent_timeout: float,
+) -> List[Dict[str, Any]]:
+    from agents.explainability.telemetry import metrics
+
+    results = []
+    for target in targets:
+        for concurrency in levels:
+            print(f"▶️ {target} @ concurrency {concurrency} ({requests} clauses)")
+            histogram_before = metrics.agent_latency.snapshot()
+            with ResourceSampler() as sampler:
+                started = time.perf_counter()
+                samples = TARGET_RUNNERS[target](concurrency, requests, agent_timeout)
+                wall = time.perf_counter() - started
+            results.append(
+                {
+                    "target": target,
+                    "concurrency": concurrency,
+                    **_summarize(samples, wall),
+                    "resources": sampler.report(wall),
+                    "agent_latency_mean_ms": _agent_latency_means(histogram_before, metrics.agent_latency.snapshot()),
+                }
+            )
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment() -> Dict[str, Any]:
+    keys = (
+        "CROSS_CONSISTENCY_MAX_WORKERS",
+        "CROSS_CONSISTENCY_REQUEST_WORKERS",
+        "CROSS_CONSISTENCY_MAX_PARALLEL_CLAUSES",
+        "CROSS_CONSISTENCY_SCORING_PROCESSES",
+        "EXPLAINABILITY_LLM_BATCHING",
+    )
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {key: os.environ[key] for key in keys if key in os.environ},
+    }
+
+
+def _print_results(results: List[Dict[str, Any]]) -> None:
+    header = (
+        f"{'target':<8}{'conc':>6}{'clauses':>9}{'cl/s':>9}{'p50ms':>10}{'p95ms':>10}{'p99ms':>10}"
+        f"{'partial':>9}{'err':>6}{'cpu%':>7}{'rssMB':>8}{'thr':>6}"
+    )
+    print("\n" + header)
+    print("-" * len(header))
+    for row in results:
+        latency, resources = row["latency_ms"], row["resources"]
+        print(
+            f"{row['target']:<8}{row['concurrency']:>6}{row['clauses']:>9}{row['throughput_clauses_per_s']:>9.2f}"
+            f"{latency['p50']:>10.1f}{latency['p95']:>10.1f}{latency['p99']:>10.1f}"
+            f"{row['outcomes']['partial']:>9}{row['outcomes']['error']:>6}"
+            f"{resources['cpu_utilisation'] * 100:>7.1f}{resources['peak_rss_mb']:>8.1f}{resources['peak_threads']:>6}"
+        )
+
+
+def _load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    """Last record of a JSONL results file, or a single JSON record."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [line for line in f.read().splitlines() if line.strip()]
+    except OSError:
+        return None
+    return json.loads(lines[-1]) if lines else None
+
+
+def _print_comparison(record: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    if baseline.get("schema_version") != record["schema_version"] or baseline.get("config") != record["config"]:
+        print("\n⚠️ Baseline was recorded with a different schema or configuration; deltas may not be comparable.")
+    previous = {(row["target"], row["concurrency"]): row for row in baseline.get("results", [])}
+    print(f"\nCompared with {baseline.get('git_commit') or 'baseline'} ({baseline.get('recorded_at')}):")
+    for row in record["results"]:
+        old = previous.get((row["target"], row["concurrency"]))
+        if old is None:
+            continue
+
+        def delta(new_value, old_value):
+            return f"{(new_value - old_value) / old_value * 100:+.1f}%" if old_value else "n/a"
+
+        print(
+            f"  {row['target']:<8} conc {row['concurrency']:>3}: "
+            f"throughput {delta(row['throughput_clauses_per_s'], old['throughput_clauses_per_s'])}, "
+            f"p95 {delta(row['latency_ms']['p95'], old['latency_ms']['p95'])}, "
+            f"p99 {delta(row['latency_ms']['p99'], old['latency_ms']['p99'])}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the cross-consistency orchestrator with simulated agents.")
+    parser.add_argument("--targets", default=",".join(TARGETS), help=f"Comma-separated subset of {', '.join(TARGETS)}.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=40, help="Clauses per target and level.")
+    parser.add_argument(
+        "--time-scale", type=float, default=0.05, help="Multiplier on agent latencies (1.0 = realistic 2-20 s agents)."
+    )
+    parser.add_argument("--latency-distribution", choices=("fixed", "uniform", "normal", "lognormal"), default="lognormal")
+    parser.add_argument("--error-rate", type=float, default=None, help="Per-call agent failure rate (default 0.02).")
+    parser.add_argument("--profile", default=None, help="JSON file mapping agent name to FakeLLMConfig overrides.")
+    parser.add_argument("--agent-timeout", type=float, default=None, help="Per-agent timeout in seconds.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Append the run record to this JSONL file.")
+    parser.add_argument("--compare", default=None, help="Compare against the last record in this file.")
+    args = parser.parse_args(argv)
+
+    targets = [target.strip() for target in args.targets.split(",") if target.strip()]
+    unknown = [target for target in targets if target not in TARGETS]
+    if unknown:
+        parser.error(f"Unknown targets: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    profiles = {agent: dict(profile) for agent, profile in DEFAULT_AGENT_PROFILES.items()}
+    if args.profile:
+        with open(args.profile, encoding="utf-8") as f:
+            for agent, overrides in json.load(f).items():
+                profiles.setdefault(agent, {"latency_mean": 1.0}).update(overrides)
+
+    # Cached results would hide the orchestrator; keep the benchmark off the shared cache file.
+    os.environ.setdefault("CROSS_CONSISTENCY_CACHE", "0")
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.append(str(REPO_ROOT))
+
+    from agents.explainability.scheduler import AGENT_TIMEOUT_SECONDS
+
+    models = build_agent_models(profiles, args.time_scale, args.error_rate, args.latency_distribution, args.seed)
+    install_agent_models(models)
+    agent_timeout = args.agent_timeout if args.agent_timeout is not None else AGENT_TIMEOUT_SECONDS
+
+    # Baseline is read before this run is appended, so --compare and --output may share a file.
+    baseline = _load_baseline(args.compare) if args.compare else None
+    results = run_benchmark(targets, levels, args.requests, agent_timeout)
+
+    record = {
+        "schema_version": SCHEMA_VERSION,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "environment": _environment(),
+        "config": {
+            "targets": targets,
+            "concurrency": levels,
+            "requests": args.requests,
+            "time_scale": args.time_scale,
+            "agent_timeout": agent_timeout,
+            "agents": {agent: asdict(replace(model.config, seed=None)) for agent, model in sorted(models.items())},
+        },
+        "results": results,
+        "agent_calls": {agent: model.stats() for agent, model in sorted(models.items())},
+    }
+
+    _print_results(results)
+    if baseline is not None:
+        _print_comparison(record, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"\nRecord appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
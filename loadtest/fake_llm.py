@@ -0,0 +1,172 @@
+"""
+fake_llm.py
+-----------
+Configurable stand-in for the language models behind LegisAI.
+
+Replaces ``dummy_llm.fake_llm_response`` (explainability agents) and the
+Ollama-backed ``generate_ai_response`` / ``generate_ai_response_stream``
+helpers (research router) with a model whose time-to-first-token, token rate
+and error rate can be tuned, so the FastAPI services can be load tested
+without a real model.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Dict, List, Optional
+
+FAKE_LLM_ENV = "LEGISAI_FAKE_LLM"
+
+_VOCABULARY = (
+    "the clause allocates liability between the parties subject to statutory carve-outs "
+    "for gross negligence and wilful misconduct while precedent supports enforceability "
+    "where caps are conspicuous negotiated and backed by insurance"
+).split()
+
+
+class FakeLLMError(RuntimeError):
+    """Injected model failure."""
+
+
+@dataclass
+class FakeLLMConfig:
+    """Latency and reliability profile of the simulated model.
+
+    ``latency_distribution`` controls time-to-first-token and is one of
+    ``fixed`` (always ``latency_mean``), ``uniform`` (mean ± jitter),
+    ``normal`` or ``lognormal`` (``latency_jitter`` is the standard deviation).
+    """
+
+    latency_distribution: str = "lognormal"
+    latency_mean: float = 0.5
+    latency_jitter: float = 0.25
+    tokens_per_second: float = 40.0
+    output_tokens: int = 120
+    error_rate: float = 0.0
+    seed: Optional[int] = None
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "FakeLLMConfig":
+        return cls(**json.loads(payload))
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMConfig":
+        payload = os.getenv(FAKE_LLM_ENV)
+        return cls.from_json(payload) if payload else cls()
+
+
+class FakeLLM:
+    """Simulated model exposing the sync, async and streaming call styles used in the repo."""
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None):
+        self.config = config or FakeLLMConfig()
+        self._random = random.Random(self.config.seed)
+        self.calls = 0
+        self.errors = 0
+
+    # ---- sampling ----------------------------------------------------------------
+    def sample_latency(self) -> float:
+        cfg = self.config
+        if cfg.latency_distribution == "fixed":
+            value = cfg.latency_mean
+        elif cfg.latency_distribution == "uniform":
+            value = self._random.uniform(cfg.latency_mean - cfg.latency_jitter, cfg.latency_mean + cfg.latency_jitter)
+        elif cfg.latency_distribution == "normal":
+            value = self._random.gauss(cfg.latency_mean, cfg.latency_jitter)
+        elif cfg.latency_distribution == "lognormal":
+            # Parameterise by the desired mean/stddev of the resulting distribution.
+            mean = max(cfg.latency_mean, 1e-6)
+            variance = cfg.latency_jitter ** 2
+            sigma2 = math.log1p(variance / (mean * mean))
+            mu = math.log(mean) - sigma2 / 2
+            value = self._random.lognormvariate(mu, sigma2 ** 0.5)
+        else:
+            raise ValueError(f"Unknown latency distribution: {cfg.latency_distribution}")
+        return max(0.0, value)
+
+    def _tokens(self, prompt: str) -> List[str]:
+        seed_words = [word for word in prompt.split()[:8] if word.isalpha()]
+        pool = seed_words + list(_VOCABULARY)
+        return [self._random.choice(pool) for _ in range(max(1, self.config.output_tokens))]
+
+    def _maybe_fail(self) -> None:
+        self.calls += 1
+        if self._random.random() < self.config.error_rate:
+            self.errors += 1
+            raise FakeLLMError("Injected fake LLM failure")
+
+    def _generation_time(self, token_count: int) -> float:
+        rate = self.config.tokens_per_second
+        return token_count / rate if rate > 0 else 0.0
+
+    # ---- call styles -------------------------------------------------------------
+    def complete(self, prompt: str) -> str:
+        """Blocking completion, matching ``dummy_llm.fake_llm_response``."""
+        self._maybe_fail()
+        tokens = self._tokens(prompt)
+        time.sleep(self.sample_latency() + self._generation_time(len(tokens)))
+        return " ".join(tokens)
+
+    async def generate(self, prompt: str, max_tokens: int = 900, use_full_response: bool = False, **_: object) -> str:
+        """Async completion, matching ``common.generate_ai_response``."""
+        self._maybe_fail()
+        tokens = self._tokens(prompt)[:max_tokens]
+        await asyncio.sleep(self.sample_latency() + self._generation_time(len(tokens)))
+        return " ".join(tokens)
+
+    async def stream(self, prompt: str, **_: object) -> AsyncIterator[str]:
+        """Server-sent-event stream, matching ``common.generate_ai_response_stream``."""
+        self._maybe_fail()
+        await asyncio.sleep(self.sample_latency())
+        per_token = self._generation_time(1)
+        for token in self._tokens(prompt):
+            await asyncio.sleep(per_token)
+            yield f"data: {json.dumps({'content': token + ' '})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "errors": self.errors}
+
+
+def _patch_attribute(module_prefix: str, name: str, value: object) -> List[str]:
+    """Rebind ``name`` in every loaded module under ``module_prefix``.
+
+    Agents import helpers with ``from ... import name``, so patching only the
+    defining module would leave their bound references untouched.
+    """
+    patched: List[str] = []
+    for module_name, module in list(sys.modules.items()):
+        if module is None or not module_name.startswith(module_prefix):
+            continue
+        if hasattr(module, name):
+            setattr(module, name, value)
+            patched.append(module_name)
+    return patched
+
+
+def install_fake_llm(fake: FakeLLM) -> Dict[str, List[str]]:
+    """Swap the fake into every already-imported LegisAI module that calls a model.
+
+    Import the apps under test first, then call this. Returns the patched module
+    names per attribute so callers can verify the substitution took effect.
+    """
+    return {
+        "fake_llm_response": _patch_attribute("agents.explainability", "fake_llm_response", fake.complete),
+        "generate_ai_response": _patch_attribute("agents.retrieval", "generate_ai_response", fake.generate),
+        "generate_ai_response_stream": _patch_attribute(
+            "agents.retrieval", "generate_ai_response_stream", fake.stream
+        ),
+        # research marks reports as AI generated only when a client is configured.
+        "ollama_client": _patch_attribute("agents.retrieval", "ollama_client", fake),
+    }
+
+
+__all__ = ["FAKE_LLM_ENV", "FakeLLM", "FakeLLMConfig", "FakeLLMError", "install_fake_llm"]
@@ -0,0 +1,371 @@
+"""
+harness.py
+----------
+Closed-loop load generator for the LegisAI FastAPI services.
+
+Starts the apps in-process (ASGI transport) or as uvicorn subprocesses with the
+fake LLM installed, drives a weighted mix of research, stream,
+cross-consistency and upload requests at a fixed concurrency, and reports
+throughput, latency percentiles and error rates per workload.
+
+    python -m loadtest.harness --mode subprocess --concurrency 16 --duration 60 \\
+        --mix research=4,stream=2,cross_consistency=3,upload=1 \\
+        --llm-latency-mean 2.0 --llm-tokens-per-second 30 --llm-error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from loadtest.apps import load_app, repo_pythonpath, require_app
+from loadtest.fake_llm import FAKE_LLM_ENV, FakeLLM, FakeLLMConfig, install_fake_llm
+
+SAMPLE_QUERIES = [
+    "Limitation of liability in cloud service agreements",
+    "Enforceability of non-compete clauses after employment termination",
+    "Consent requirements for automated processing of personal data",
+    "Remedies for missed milestones in public technology contracts",
+    "Division of marital property in community property states",
+]
+
+SAMPLE_CLAUSES = [
+    "The Supplier's aggregate liability shall not exceed the fees paid in the twelve months preceding the claim.",
+    "Each party shall keep the other party's Confidential Information strictly confidential for five years.",
+    "This Agreement shall be governed by the laws of the State of New York.",
+    "Either party may terminate this Agreement for convenience on thirty days' written notice.",
+]
+
+
+@dataclass
+class Sample:
+    workload: str
+    latency: float
+    ok: bool
+    status: Optional[int]
+
+
+@dataclass
+class LoadReport:
+    duration: float
+    concurrency: int
+    samples: List[Sample] = field(default_factory=list)
+
+    def summarize(self) -> Dict[str, Any]:
+        by_workload: Dict[str, List[Sample]] = {}
+        for sample in self.samples:
+            by_workload.setdefault(sample.workload, []).append(sample)
+
+        summary = {name: _summarize_samples(samples, self.duration) for name, samples in sorted(by_workload.items())}
+        summary["overall"] = _summarize_samples(self.samples, self.duration)
+        return {"duration_seconds": round(self.duration, 3), "concurrency": self.concurrency, "workloads": summary}
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile.
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _summarize_samples(samples: List[Sample], duration: float) -> Dict[str, Any]:
+    latencies = sorted(sample.latency * 1000.0 for sample in samples)
+    errors = sum(1 for sample in samples if not sample.ok)
+    status_counts: Dict[str, int] = {}
+    for sample in samples:
+        key = str(sample.status) if sample.status is not None else "exception"
+        status_counts[key] = status_counts.get(key, 0) + 1
+
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(samples) / duration, 3) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50), 2),
+            "p90": round(_percentile(latencies, 0.90), 2),
+            "p95": round(_percentile(latencies, 0.95), 2),
+            "p99": round(_percentile(latencies, 0.99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "status_codes": status_counts,
+    }
+
+
+# ------------------------------------------------------
+# Workloads
+# ------------------------------------------------------
+
+async def _research(client: httpx.AsyncClient, rng: random.Random, seq: int) -> int:
+    # A per-request suffix defeats the research report cache so every request reaches the model.
+    query = f"{rng.choice(SAMPLE_QUERIES)} (load {seq})"
+    response = await client.post("/api/research", json={"query": query, "max_results": 5})
+    return response.status_code
+
+
+async def _stream(client: httpx.AsyncClient, rng: random.Random, seq: int) -> int:
+    query = f"{rng.choice(SAMPLE_QUERIES)} (stream {seq})"
+    async with client.stream("POST", "/api/research/stream", json={"query": query}) as response:
+        async for _ in response.aiter_raw():
+            pass
+        return response.status_code
+
+
+async def _cross_consistency(client: httpx.AsyncClient, rng: random.Random, seq: int) -> int:
+    response = await client.post("/cross_consistency", json={"clause": rng.choice(SAMPLE_CLAUSES)})
+    if response.status_code == 200 and response.json().get("status") == "error":
+        return 500
+    return response.status_code
+
+
+def _make_upload(size_kb: int) -> Callable[[httpx.AsyncClient, random.Random, int], Any]:
+    async def _upload(client: httpx.AsyncClient, rng: random.Random, seq: int) -> int:
+        payload = rng.randbytes(size_kb * 1024)
+        files = {"file": (f"loadtest_{seq}.pdf", payload, "application/pdf")}
+        response = await client.post("/api/upload", files=files)
+        return response.status_code
+
+    return _upload
+
+
+def build_workloads(upload_kb: int) -> Dict[str, Tuple[str, Callable[..., Any]]]:
+    """Workload name -> (app name, request coroutine)."""
+    return {
+        "research": ("research", _research),
+        "stream": ("research", _stream),
+        "cross_consistency": ("backend", _cross_consistency),
+        "upload": ("research", _make_upload(upload_kb)),
+    }
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# ------------------------------------------------------
+# Driver
+# ------------------------------------------------------
+async def run_load(
+    clients: Dict[str, httpx.AsyncClient],
+    mix: Dict[str, float],
+    workloads: Dict[str, Tuple[str, Callable[..., Any]]],
+    concurrency: int,
+    duration: float,
+    max_requests: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> LoadReport:
+    names = [name for name in mix if mix[name] > 0]
+    unknown = [name for name in names if name not in workloads]
+    if unknown:
+        raise ValueError(f"Unknown workloads: {', '.join(unknown)}")
+    weights = [mix[name] for name in names]
+
+    report = LoadReport(duration=0.0, concurrency=concurrency)
+    sequence = iter(range(sys.maxsize))
+    started = time.perf_counter()
+    stop_at = started + duration
+
+    async def worker(worker_id: int) -> None:
+        rng = random.Random(None if seed is None else seed + worker_id)
+        while time.perf_counter() < stop_at:
+            seq = next(sequence)
+            if max_requests is not None and seq >= max_requests:
+                return
+
+            name = rng.choices(names, weights=weights)[0]
+            app_name, request_fn = workloads[name]
+            request_started = time.perf_counter()
+            try:
+                status = await request_fn(clients[app_name], rng, seq)
+                ok = 200 <= status < 400
+            except Exception:
+                status, ok = None, False
+            report.samples.append(Sample(name, time.perf_counter() - request_started, ok, status))
+
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    report.duration = time.perf_counter() - started
+    return report
+
+
+def _needed_apps(mix: Dict[str, float], workloads: Dict[str, Tuple[str, Callable[..., Any]]]) -> List[str]:
+    return sorted({workloads[name][0] for name, weight in mix.items() if weight > 0 and name in workloads})
+
+
+def _start_subprocesses(
+    apps: List[str],
+    config: FakeLLMConfig,
+    base_port: int,
+    workdir: str,
+) -> Tuple[Dict[str, str], List[subprocess.Popen]]:
+    env = {**os.environ, FAKE_LLM_ENV: config.to_json(), "PYTHONPATH": repo_pythonpath()}
+    urls: Dict[str, str] = {}
+    processes: List[subprocess.Popen] = []
+
+    for offset, app_name in enumerate(apps):
+        port = base_port + offset
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, "-m", "loadtest.serve", "--app", app_name, "--port", str(port)],
+                cwd=workdir,
+                env=env,
+            )
+        )
+        urls[app_name] = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + 60
+    for app_name, url in urls.items():
+        while True:
+            try:
+                if httpx.get(f"{url}/openapi.json", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.time() > deadline:
+                for process in processes:
+                    process.terminate()
+                raise RuntimeError(f"{app_name} did not start on {url}")
+            time.sleep(0.25)
+
+    return urls, processes
+
+
+async def _main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    config = FakeLLMConfig(
+        latency_distribution=args.llm_latency_distribution,
+        latency_mean=args.llm_latency_mean,
+        latency_jitter=args.llm_latency_jitter,
+        tokens_per_second=args.llm_tokens_per_second,
+        output_tokens=args.llm_output_tokens,
+        error_rate=args.llm_error_rate,
+        seed=args.seed,
+    )
+    workloads = build_workloads(args.upload_kb)
+    mix = parse_mix(args.mix)
+    apps = _needed_apps(mix, workloads)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="legisai_load_")
+    timeout = httpx.Timeout(args.request_timeout)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+
+    processes: List[subprocess.Popen] = []
+    if args.mode == "subprocess":
+        urls, processes = _start_subprocesses(apps, config, args.base_port, workdir)
+        clients = {
+            name: httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) for name, url in urls.items()
+        }
+    else:
+        loaded = {name: load_app(name) for name in apps}
+        fake = FakeLLM(config)
+        install_fake_llm(fake)
+        # Uploads are written relative to the working directory.
+        os.chdir(workdir)
+        clients = {
+            name: httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url=f"http://{name}.loadtest",
+                timeout=timeout,
+            )
+            for name, app in loaded.items()
+        }
+
+    try:
+        report = await run_load(
+            clients,
+            mix,
+            workloads,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            max_requests=args.max_requests,
+            seed=args.seed,
+        )
+    finally:
+        for client in clients.values():
+            await client.aclose()
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+    summary = report.summarize()
+    summary["mode"] = args.mode
+    summary["mix"] = mix
+    summary["fake_llm"] = json.loads(config.to_json())
+    return summary
+
+
+def _print_summary(summary: Dict[str, Any]) -> None:
+    print(
+        f"\nLoad test ({summary['mode']}) — concurrency {summary['concurrency']}, "
+        f"{summary['duration_seconds']}s"
+    )
+    header = f"{'workload':<20}{'reqs':>8}{'rps':>10}{'err%':>8}{'p50ms':>10}{'p95ms':>10}{'p99ms':>10}{'maxms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in summary["workloads"].items():
+        latency = stats["latency_ms"]
+        print(
+            f"{name:<20}{stats['requests']:>8}{stats['throughput_rps']:>10.2f}{stats['error_rate'] * 100:>8.2f}"
+            f"{latency['p50']:>10.1f}{latency['p95']:>10.1f}{latency['p99']:>10.1f}{latency['max']:>10.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load test the LegisAI FastAPI services against a fake LLM.")
+    parser.add_argument("--mode", choices=("inprocess", "subprocess"), default="inprocess")
+    parser.add_argument("--mix", default="research=4,stream=2,cross_consistency=3,upload=1")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load for.")
+    parser.add_argument("--max-requests", type=int, default=None)
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--upload-kb", type=int, default=256)
+    parser.add_argument("--base-port", type=int, default=8100)
+    parser.add_argument("--workdir", default=None, help="Working directory for the apps (uploads land here).")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the summary as JSON to this path.")
+    parser.add_argument(
+        "--llm-latency-distribution", choices=("fixed", "uniform", "normal", "lognormal"), default="lognormal"
+    )
+    parser.add_argument("--llm-latency-mean", type=float, default=0.5, help="Mean time to first token (s).")
+    parser.add_argument("--llm-latency-jitter", type=float, default=0.25)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--llm-output-tokens", type=int, default=120)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    # Fail before starting anything rather than on the first request.
+    for name in _needed_apps(parse_mix(args.mix), build_workloads(args.upload_kb)):
+        try:
+            require_app(name)
+        except RuntimeError as exc:
+            parser.error(str(exc))
+
+    if args.json_path:
+        # In-process runs chdir into the work directory.
+        args.json_path = os.path.abspath(args.json_path)
+
+    summary = asyncio.run(_main_async(args))
+    _print_summary(summary)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(summary, handle, indent=2)
+        print(f"\nSummary written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
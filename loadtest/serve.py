@@ -0,0 +1,36 @@
+"""
+serve.py
+--------
+Runs one LegisAI app under uvicorn with the fake LLM installed.
+
+Used by the harness in ``--mode subprocess``; the fake's profile is read
+from the ``LEGISAI_FAKE_LLM`` environment variable (JSON FakeLLMConfig).
+
+    python -m loadtest.serve --app research --port 8101
+"""
+
+import argparse
+import logging
+
+from loadtest.apps import APP_NAMES, load_app
+from loadtest.fake_llm import FakeLLM, FakeLLMConfig, install_fake_llm
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a LegisAI app against the fake LLM.")
+    parser.add_argument("--app", choices=APP_NAMES, required=True)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = load_app(args.app)
+    patched = install_fake_llm(FakeLLM(FakeLLMConfig.from_env()))
+    logging.getLogger(__name__).info("Fake LLM installed into: %s", patched)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
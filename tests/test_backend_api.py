@@ -0,0 +1,19 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend_api import app
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/cross_consistency", {"clause": "The supplier shall indemnify the buyer."}),
+        ("/cross_consistency/stream", {"clause": "The supplier shall indemnify the buyer."}),
+        ("/cross_consistency/batch", {"clauses": ["The supplier shall indemnify the buyer."]}),
+    ],
+)
+@pytest.mark.parametrize("selection", [{"agents": ["NoSuchAgent"]}, {"exclude_agents": ["NoSuchAgent"]}])
+def test_invalid_agent_selection_is_rejected_with_400(path, body, selection):
+    response = TestClient(app).post(path, json={**body, **selection})
+    assert response.status_code == 400
+    assert "NoSuchAgent" in response.json()["detail"]
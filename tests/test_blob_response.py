@@ -0,0 +1,94 @@
+import hashlib
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from agents.blob_response import BlobResponse, RangeNotSatisfiable, parse_range
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("", None),
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 1023)),
+        ("bytes=-24", (1000, 1023)),
+        ("bytes=-5000", (0, 1023)),  # suffix longer than the file: the whole file
+        ("bytes=1000-5000", (1000, 1023)),  # end clamped to the last byte
+        ("BYTES = 5 - 9", (5, 9)),
+        ("bytes=0-0", (0, 0)),
+        ("items=0-9", None),  # other units are ignored
+        ("bytes=0-9,20-29", None),  # several ranges: the whole file
+        ("bytes=-", None),
+        ("bytes=abc", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, len(DATA)) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=2000-3000", "bytes=10-5", "bytes=-0"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, len(DATA))
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "blob"
+    path.write_bytes(DATA)
+    sha256 = hashlib.sha256(DATA).hexdigest()
+
+    async def blob(request):
+        return BlobResponse(path, sha256, request.query_params["type"], filename="exhibit a.bin")
+
+    return TestClient(Starlette(routes=[Route("/blob", blob, methods=["GET", "HEAD"])]))
+
+
+def test_range_request_is_served_as_206(client):
+    response = client.get("/blob?type=application/pdf", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == DATA[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(DATA)}"
+
+
+def test_if_range_with_another_etag_sends_the_whole_file(client):
+    response = client.get("/blob?type=application/pdf", headers={"Range": "bytes=10-19", "If-Range": '"stale"'})
+    assert response.status_code == 200 and response.content == DATA
+
+
+def test_matching_etag_answers_304(client):
+    etag = client.head("/blob?type=application/pdf").headers["etag"]
+    assert client.get("/blob?type=application/pdf", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+
+def test_unsatisfiable_range_answers_416(client):
+    response = client.get("/blob?type=application/pdf", headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+@pytest.mark.parametrize("media_type", ["application/pdf", "image/png", "IMAGE/JPEG; charset=binary"])
+def test_pdfs_and_raster_images_are_inline(client, media_type):
+    headers = client.get("/blob", params={"type": media_type}).headers
+    assert headers["content-disposition"] == "inline; filename*=UTF-8''exhibit%20a.bin"
+    assert headers["x-content-type-options"] == "nosniff"
+
+
+@pytest.mark.parametrize("media_type", ["text/html", "image/svg+xml", "application/javascript"])
+def test_active_content_is_an_attachment(client, media_type):
+    response = client.get("/blob", params={"type": media_type})
+    assert response.headers["content-disposition"].startswith("attachment;")
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert response.headers["content-type"] == media_type
+
+
+def test_malformed_media_type_is_served_as_octet_stream(client):
+    headers = client.get("/blob", params={"type": "text/html<script>"}).headers
+    assert headers["content-type"] == "application/octet-stream"
+    assert headers["content-disposition"].startswith("attachment;")
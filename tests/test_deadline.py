@@ -0,0 +1,16 @@
+import pytest
+
+from agents.retrieval.deadline import Deadline, InvalidDeadline
+
+
+def test_budget_defaults_and_is_clamped():
+    assert Deadline.from_request({}, default=45, maximum=120).budget == 45
+    assert Deadline.from_request({"latency_budget_ms": 1500}, maximum=120).budget == 1.5
+    assert Deadline.from_request({"latency_budget_ms": "2500"}, maximum=120).budget == 2.5
+    assert Deadline.from_request({"latency_budget_ms": 10 ** 9}, maximum=120).budget == 120
+
+
+@pytest.mark.parametrize("value", [0, -5, "soon", "nan", float("inf"), True, [], {}])
+def test_invalid_budget_is_rejected(value):
+    with pytest.raises(InvalidDeadline):
+        Deadline.from_request({"latency_budget_ms": value})
@@ -0,0 +1,62 @@
+import pytest
+
+from agents.entities import PAGE_SEPARATOR, _components_for_entities, extract_entities, group_entities, page_chunks
+
+LONG_PAGE = ("Filler words here. " * 10 + "\n\n") * 40 + "Jane Doe of Acme Corp signed."
+PAGES = ["Acme Corp sued Jane Doe in Delaware.", "", LONG_PAGE, "Acme Corp again"]
+DOCUMENT = PAGE_SEPARATOR.join(PAGES)
+
+
+def test_page_chunks_map_back_to_document_offsets():
+    chunks = list(page_chunks(PAGES, max_chars=500))
+    assert max(len(chunk) for chunk, _ in chunks) <= 500
+    assert {page for _, (page, _) in chunks} == {1, 3, 4}  # the blank page yields nothing
+    for chunk, (_, offset) in chunks:
+        assert DOCUMENT[offset:offset + len(chunk)] == chunk
+    # Long pages are cut at paragraph breaks.
+    long_page = [chunk for chunk, (page, _) in chunks if page == 3]
+    assert len(long_page) > 1 and all(chunk.endswith("\n\n") for chunk in long_page[:-1])
+
+
+@pytest.fixture
+def nlp():
+    spacy = pytest.importorskip("spacy")
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.add_patterns(
+        [
+            {"label": "ORG", "pattern": "Acme Corp"},
+            {"label": "PERSON", "pattern": "Jane Doe"},
+            {"label": "GPE", "pattern": "Delaware"},
+        ]
+    )
+    return nlp
+
+
+def test_only_entity_components_run(nlp):
+    assert _components_for_entities(nlp) == ["entity_ruler"]
+
+
+def test_entities_carry_document_offsets_and_pages(nlp):
+    entities = extract_entities(PAGES, nlp, batch_size=4, max_chars=500)
+    for entity in entities:
+        assert DOCUMENT[entity.start:entity.end] == entity.text
+    assert [(entity.text, entity.page_number) for entity in entities] == [
+        ("Acme Corp", 1),
+        ("Jane Doe", 1),
+        ("Delaware", 1),
+        ("Jane Doe", 3),
+        ("Acme Corp", 3),
+        ("Acme Corp", 4),
+    ]
+
+    grouped = group_entities(entities)
+    assert grouped["ORG"] == [
+        {
+            "text": "Acme Corp",
+            "count": 3,
+            "pages": [1, 3, 4],
+            "offsets": [[entity.start, entity.end] for entity in entities if entity.label == "ORG"],
+        }
+    ]
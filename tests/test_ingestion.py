@@ -0,0 +1,59 @@
+import asyncio
+import hashlib
+import time
+
+from agents.document_store import DocumentStore
+from agents.ingestion import STATUS_EXTRACTING, STATUS_INDEXED, STATUS_PREPARED, STATUS_QUEUED, IngestionPipeline
+
+CONTENT = b"The supplier shall indemnify the buyer against third-party claims.\n\nLiability is capped at the contract value."
+
+
+def _add(store, filename, status, content=CONTENT):
+    staged = store.temp_path()
+    staged.write_bytes(content)
+    document, _ = store.add_document(
+        hashlib.sha256(content).hexdigest(), filename, "text/plain", len(content), staged=staged, status=status
+    )
+    return document
+
+
+async def _wait_until_ingested(store, file_ids, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        statuses = {store.get_document(file_id).status for file_id in file_ids}
+        if statuses <= {STATUS_PREPARED, STATUS_INDEXED}:
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"documents still {sorted(statuses)}")
+
+
+def test_documents_interrupted_by_restart_resume_at_startup(tmp_path):
+    store = DocumentStore(tmp_path)
+    interrupted = _add(store, "indemnity.txt", STATUS_EXTRACTING)
+    other = _add(store, "force_majeure.txt", STATUS_QUEUED, b"Force majeure excuses delays caused by events beyond control.")
+
+    async def scenario():
+        # A new process: a fresh store on the same catalog and no submit() call.
+        pipeline = IngestionPipeline(DocumentStore(tmp_path))
+        pipeline.start()
+        await _wait_until_ingested(pipeline.store, [interrupted.file_id, other.file_id])
+
+    asyncio.run(scenario())
+
+
+def test_resume_reaches_queued_documents_past_the_first_page(tmp_path):
+    store = DocumentStore(tmp_path)
+    file_ids = [_add(store, f"copy_{index}.txt", STATUS_QUEUED).file_id for index in range(150)]
+
+    async def scenario():
+        pipeline = IngestionPipeline(DocumentStore(tmp_path))
+        pipeline.start()
+        await _wait_until_ingested(pipeline.store, file_ids)
+
+    asyncio.run(scenario())
+
+
+def test_router_starts_the_pipeline_at_startup():
+    from agents.documentation import _start_ingestion, router
+
+    assert _start_ingestion in router.on_startup
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from agents.retrieval.llm_scheduler import LeasedStreamingResponse, LLMJobScheduler, Priority, SchedulerOverloaded
+
+SCOPE = {"type": "http", "method": "POST", "path": "/api/research/stream", "headers": []}
+
+
+async def _body(started):
+    started.append(True)
+    yield "chunk"
+
+
+def test_queue_full_is_rejected_with_retry_after():
+    async def scenario():
+        scheduler = LLMJobScheduler(max_concurrency=1, max_queue=0)
+        lease = await scheduler.acquire()
+        with pytest.raises(SchedulerOverloaded) as excinfo:
+            await scheduler.acquire()
+        assert excinfo.value.status_code == 429
+        assert int(excinfo.value.headers["Retry-After"]) >= 1
+        lease.release()
+        lease.release()  # idempotent
+        assert scheduler.metrics()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_higher_priority_waiter_is_served_first():
+    async def scenario():
+        scheduler = LLMJobScheduler(max_concurrency=1, max_queue=4)
+        lease = await scheduler.acquire()
+        order = []
+
+        async def wait(priority):
+            granted = await scheduler.acquire(priority)
+            order.append(priority)
+            granted.release()
+
+        batch = asyncio.create_task(wait(Priority.BATCH))
+        await asyncio.sleep(0)
+        stream = asyncio.create_task(wait(Priority.INTERACTIVE_STREAM))
+        await asyncio.sleep(0)
+        lease.release()
+        await asyncio.gather(batch, stream)
+        assert order == [Priority.INTERACTIVE_STREAM, Priority.BATCH]
+
+    asyncio.run(scenario())
+
+
+def test_streaming_response_releases_slot_when_client_disconnects_before_body():
+    async def scenario():
+        scheduler = LLMJobScheduler(max_concurrency=1, max_queue=0)
+        lease = await scheduler.acquire(Priority.INTERACTIVE_STREAM)
+        started = []
+        response = LeasedStreamingResponse(_body(started), lease, media_type="text/event-stream")
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            raise OSError("client went away")
+
+        with pytest.raises(OSError):
+            await response(SCOPE, receive, send)
+        assert not started
+        assert scheduler.metrics()["active"] == 0
+        # The slot is usable again.
+        (await scheduler.acquire()).release()
+
+    asyncio.run(scenario())
+
+
+def test_streaming_response_releases_slot_once_after_full_body():
+    async def scenario():
+        scheduler = LLMJobScheduler(max_concurrency=1, max_queue=0)
+        lease = await scheduler.acquire(Priority.INTERACTIVE_STREAM)
+        sent = []
+
+        async def receive():
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            sent.append(message)
+
+        await LeasedStreamingResponse(_body([]), lease)(SCOPE, receive, send)
+        assert sent[-1]["type"] == "http.response.body" and not sent[-1].get("more_body")
+        metrics = scheduler.metrics()
+        assert metrics["active"] == 0 and metrics["completed"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_slot_handed_over_as_the_queue_timeout_fires_is_passed_on(monkeypatch):
+    async def scenario():
+        scheduler = LLMJobScheduler(max_concurrency=1, max_queue=4, queue_timeout=5)
+        lease = await scheduler.acquire()
+        real_wait_for = asyncio.wait_for
+
+        async def wait_for_racing_release(waiter, timeout):
+            # The holder finishes exactly when the waiter's timeout fires.
+            lease.release()
+            assert waiter.done() and not waiter.cancelled()
+            raise asyncio.TimeoutError
+
+        monkeypatch.setattr(asyncio, "wait_for", wait_for_racing_release)
+        with pytest.raises(SchedulerOverloaded) as excinfo:
+            await scheduler.acquire()
+        monkeypatch.setattr(asyncio, "wait_for", real_wait_for)
+
+        assert excinfo.value.status_code == 503
+        assert scheduler.metrics()["active"] == 0
+        # Full capacity is still available.
+        (await scheduler.acquire()).release()
+
+    asyncio.run(scenario())
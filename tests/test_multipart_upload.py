@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from agents import multipart_upload
+from agents.multipart_upload import MIN_PART_SIZE, MultipartError, MultipartUploadStore
+
+PART = MIN_PART_SIZE
+
+
+async def _chunks(data: bytes, size: int = 256 * 1024):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _payload(length: int) -> bytes:
+    return os.urandom(length)
+
+
+def _parts(data: bytes):
+    return {number + 1: data[offset:offset + PART] for number, offset in enumerate(range(0, len(data), PART))}
+
+
+def test_out_of_order_parts_hash_to_the_whole_file(tmp_path):
+    data = _payload(3 * PART + 1234)
+
+    async def scenario():
+        store = MultipartUploadStore(tmp_path)
+        upload = store.create("brief.pdf", "application/pdf", len(data), PART)
+        parts = _parts(data)
+        for number in (3, 1, 4, 2):
+            await store.write_part(upload.upload_id, number, _chunks(parts[number]))
+        return await store.finish(upload.upload_id), store.data_path(upload.upload_id).read_bytes()
+
+    sha256, stored = asyncio.run(scenario())
+    assert stored == data
+    assert sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_replaced_part_is_rehashed(tmp_path):
+    data = _payload(2 * PART)
+    replacement = _payload(PART)
+
+    async def scenario():
+        store = MultipartUploadStore(tmp_path)
+        upload = store.create("exhibit.bin", "application/octet-stream", len(data), PART)
+        parts = _parts(data)
+        await store.write_part(upload.upload_id, 1, _chunks(parts[1]))
+        await store.write_part(upload.upload_id, 2, _chunks(parts[2]))
+        await store.write_part(upload.upload_id, 1, _chunks(replacement))
+        return await store.finish(upload.upload_id)
+
+    assert asyncio.run(scenario()) == hashlib.sha256(replacement + data[PART:]).hexdigest()
+
+
+def test_part_replaced_by_another_process_is_detected(tmp_path):
+    data = _payload(2 * PART)
+    replacement = _payload(PART)
+
+    async def scenario():
+        first, second = MultipartUploadStore(tmp_path), MultipartUploadStore(tmp_path)
+        upload = first.create("exhibit.bin", "application/octet-stream", len(data), PART)
+        parts = _parts(data)
+        await first.write_part(upload.upload_id, 1, _chunks(parts[1]))
+        await first.write_part(upload.upload_id, 2, _chunks(parts[2]))
+        # The first process's running hash covers the old part 1.
+        await second.write_part(upload.upload_id, 1, _chunks(replacement))
+        return await first.finish(upload.upload_id), await second.finish(upload.upload_id)
+
+    expected = hashlib.sha256(replacement + data[PART:]).hexdigest()
+    assert asyncio.run(scenario()) == (expected, expected)
+
+
+def test_failed_part_write_leaves_the_part_missing(tmp_path):
+    data = _payload(2 * PART)
+
+    async def scenario():
+        store = MultipartUploadStore(tmp_path)
+        upload = store.create("exhibit.bin", "application/octet-stream", len(data), PART)
+        parts = _parts(data)
+        await store.write_part(upload.upload_id, 1, _chunks(parts[1]))
+        await store.write_part(upload.upload_id, 2, _chunks(parts[2]))
+        with pytest.raises(MultipartError):
+            await store.write_part(upload.upload_id, 1, _chunks(parts[1][:1000]))
+        with pytest.raises(MultipartError, match="Missing parts: \\[1\\]"):
+            await store.finish(upload.upload_id)
+        await store.write_part(upload.upload_id, 1, _chunks(parts[1]))
+        return await store.finish(upload.upload_id)
+
+    assert asyncio.run(scenario()) == hashlib.sha256(data).hexdigest()
+
+
+def test_complete_is_rejected_while_a_part_is_being_written(tmp_path, monkeypatch):
+    data = _payload(2 * PART)
+
+    async def scenario():
+        store = MultipartUploadStore(tmp_path)
+        upload = store.create("exhibit.bin", "application/octet-stream", len(data), PART)
+        parts = _parts(data)
+        await store.write_part(upload.upload_id, 1, _chunks(parts[1]))
+        await store.write_part(upload.upload_id, 2, _chunks(parts[2]))
+
+        release = asyncio.Event()
+
+        async def slow_part():
+            yield parts[2][:PART // 2]
+            await release.wait()
+            yield parts[2][PART // 2:]
+
+        resend = asyncio.create_task(store.write_part(upload.upload_id, 2, slow_part()))
+        await asyncio.sleep(0.05)
+        with pytest.raises(MultipartError, match="still being received"):
+            await store.finish(upload.upload_id)
+        # Another process sees the write in progress too.
+        with pytest.raises(MultipartError, match="still being received"):
+            await MultipartUploadStore(tmp_path).finish(upload.upload_id)
+
+        # A write that never finished (its process died) stops blocking after the timeout.
+        monkeypatch.setattr(multipart_upload, "PART_WRITE_TIMEOUT_SECONDS", 0)
+        await asyncio.sleep(0.01)
+        with pytest.raises(MultipartError, match="Missing parts: \\[2\\]"):
+            await MultipartUploadStore(tmp_path).finish(upload.upload_id)
+
+        release.set()
+        await resend
+        return await store.finish(upload.upload_id)
+
+    assert asyncio.run(scenario()) == hashlib.sha256(data).hexdigest()
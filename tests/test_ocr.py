@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+from agents.ocr import engine
+from agents.ocr.engine import OCRSettings, adaptive_dpi, retry_dpi
+
+A4 = (595, 842)
+# A 24 x 36 in exhibit, in PDF points.
+POSTER = (24 * 72, 36 * 72)
+
+
+def test_retry_dpi_stays_within_max_pixels():
+    settings = OCRSettings()
+    assert adaptive_dpi(*A4, settings) == settings.dpi
+    assert retry_dpi(*A4, settings) == settings.max_dpi
+    for size in (A4, POSTER, (8.5 * 72, 14 * 72)):
+        dpi = retry_dpi(*size, settings)
+        assert (size[0] / 72 * dpi) * (size[1] / 72 * dpi) <= settings.max_pixels
+
+
+def _fake_page(monkeypatch, size, confidences):
+    rendered = []
+
+    def render_and_ocr(page, dpi, settings):
+        rendered.append(dpi)
+        return f"text at {dpi}", confidences[len(rendered) - 1]
+
+    page = SimpleNamespace(rect=SimpleNamespace(width=size[0], height=size[1]))
+    monkeypatch.setattr(engine, "_worker_document", lambda path: [page])
+    monkeypatch.setattr(engine, "_render_and_ocr", render_and_ocr)
+    return rendered
+
+
+def test_low_confidence_page_is_retried_at_a_higher_dpi(monkeypatch):
+    settings = OCRSettings()
+    rendered = _fake_page(monkeypatch, A4, [40.0, 80.0])
+    result = engine.ocr_pdf_page("scan.pdf", 0, settings)
+    assert rendered == [settings.dpi, settings.max_dpi]
+    assert (result.dpi, result.confidence) == (settings.max_dpi, 80.0)
+
+
+def test_page_capped_by_max_pixels_is_not_retried(monkeypatch):
+    settings = OCRSettings()
+    rendered = _fake_page(monkeypatch, POSTER, [40.0, 80.0])
+    result = engine.ocr_pdf_page("exhibit.pdf", 0, settings)
+    assert rendered == [settings.min_dpi]
+    assert (result.dpi, result.confidence) == (settings.min_dpi, 40.0)
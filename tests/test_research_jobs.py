@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from agents.retrieval.research_jobs import (
+    JOB_COMPLETED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    ResearchJobManager,
+    ResearchJobStore,
+    job_cache_key,
+)
+
+PARAMS = {"max_results": 5}
+
+
+def _runner(source="llm"):
+    calls = []
+
+    async def run(query, params, report_progress):
+        calls.append(query)
+        await report_progress("generating", {"documents": []})
+        return {"query": query, "source": source}
+
+    return run, calls
+
+
+async def _wait_for_status(manager, job_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await manager.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+
+def test_jobs_interrupted_by_restart_resume_on_first_poll(tmp_path):
+    store = ResearchJobStore(tmp_path / "jobs.sqlite3")
+    queued = store.create("indemnity caps", PARAMS, job_cache_key("indemnity caps", PARAMS))
+    running = store.create("force majeure", PARAMS, job_cache_key("force majeure", PARAMS))
+    store.update(running["job_id"], JOB_RUNNING, {"stage": "generating"})
+
+    async def scenario():
+        # A new process: a fresh store on the same file and no submit() call.
+        runner, calls = _runner()
+        manager = ResearchJobManager(ResearchJobStore(tmp_path / "jobs.sqlite3"), runner, workers=1)
+        for job in (queued, running):
+            assert (await _wait_for_status(manager, job["job_id"], JOB_COMPLETED))["result"]["query"] == job["query"]
+        assert sorted(calls) == ["force majeure", "indemnity caps"]
+
+    asyncio.run(scenario())
+
+
+def test_completed_llm_report_is_reused(tmp_path):
+    async def scenario():
+        runner, calls = _runner("llm")
+        manager = ResearchJobManager(
+            ResearchJobStore(tmp_path / "jobs.sqlite3"), runner, workers=1, is_reusable=lambda result: result["source"] == "llm"
+        )
+        first = await manager.submit("Limitation of liability", PARAMS)
+        await _wait_for_status(manager, first["job_id"], JOB_COMPLETED)
+        again = await manager.submit("limitation  of LIABILITY", PARAMS)
+        assert again["reused"] and again["job_id"] == first["job_id"]
+        assert calls == ["Limitation of liability"]
+
+    asyncio.run(scenario())
+
+
+def test_fallback_report_is_not_reused(tmp_path):
+    async def scenario():
+        runner, calls = _runner("fallback")
+        manager = ResearchJobManager(
+            ResearchJobStore(tmp_path / "jobs.sqlite3"), runner, workers=1, is_reusable=lambda r: r["source"] == "llm"
+        )
+        first = await manager.submit("termination for convenience", PARAMS)
+        job = await _wait_for_status(manager, first["job_id"], JOB_COMPLETED)
+        assert job["reusable"] is False
+        again = await manager.submit("termination for convenience", PARAMS)
+        assert not again["reused"] and again["job_id"] != first["job_id"]
+
+    asyncio.run(scenario())
+
+
+def test_completed_report_expires_after_ttl(tmp_path):
+    store = ResearchJobStore(tmp_path / "jobs.sqlite3", reuse_ttl=60)
+    key = job_cache_key("warranty", PARAMS)
+    job = store.create("warranty", PARAMS, key)
+    store.update(job["job_id"], JOB_COMPLETED, {"stage": JOB_COMPLETED}, {"source": "llm"})
+    assert store.find_reusable(key)["job_id"] == job["job_id"]
+    store.reuse_ttl = 0
+    time.sleep(0.01)
+    assert store.find_reusable(key) is None
+    # In-flight jobs are always shared.
+    pending = store.create("warranty", PARAMS, key)
+    assert store.find_reusable(key)["job_id"] == pending["job_id"]
+    assert pending["status"] == JOB_QUEUED
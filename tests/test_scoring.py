@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.explainability.utils.scoring import score_agreement, score_agreement_batch
+
+AGREEING = "The indemnity clause caps liability at the contract value"
+
+
+def test_identical_outputs_agree_fully():
+    result = score_agreement([AGREEING] * 3)
+    assert result["consistency_score"] == 1.0
+    assert result["outliers"] == [False, False, False]
+    assert result["similarity"] == [[1.0] * 3] * 3
+
+
+def test_dissenting_agent_is_flagged_as_outlier():
+    result = score_agreement(
+        [
+            AGREEING,
+            "Indemnity clause caps liability at the contract value",
+            "The clause caps indemnity liability at contract value",
+            "Force majeure excuses late delivery during a pandemic",
+        ]
+    )
+    assert result["outliers"] == [False, False, False, True]
+    assert result["agreement"][3] < min(result["agreement"][:3])
+
+
+def test_too_few_outputs_have_no_score():
+    assert score_agreement([])["consistency_score"] is None
+    single = score_agreement([{"verdict": "valid"}])
+    assert single["consistency_score"] is None and single["agreement"] == [None]
+
+
+def test_batch_scoring_matches_per_clause_scoring():
+    clauses = [
+        [AGREEING] * 3,
+        [AGREEING, "Indemnity clause caps liability at the contract value", "Force majeure excuses late delivery"],
+        [],
+        [{"verdict": "valid"}],
+        ["Payment is due within thirty days", {"verdict": "payment due in 30 days"}],
+    ]
+    batched = score_agreement_batch(clauses, chunk_size=2)
+    assert batched == [score_agreement(outputs) for outputs in clauses]
+
+
+def test_scoring_batcher_scores_concurrent_clauses_in_one_call(monkeypatch):
+    from agents.explainability import cross_consistency
+
+    calls = []
+
+    def recording_batch(batch_outputs):
+        calls.append(len(batch_outputs))
+        return score_agreement_batch(batch_outputs)
+
+    monkeypatch.setattr(cross_consistency, "_score_outputs_batch", recording_batch)
+    clauses = [[AGREEING, f"{AGREEING} number {index}", "Force majeure excuses late delivery"] for index in range(4)]
+    batcher = cross_consistency.ScoringBatcher(max_batch_size=len(clauses), max_wait_ms=5000)
+    with ThreadPoolExecutor(max_workers=len(clauses)) as pool:
+        results = list(pool.map(batcher.score, clauses))
+
+    assert calls == [len(clauses)]
+    assert results == [score_agreement(outputs) for outputs in clauses]
+    assert batcher.stats() == {"batches": 1, "clauses": len(clauses), "largest_batch": len(clauses)}
@@ -0,0 +1,84 @@
+import re
+
+from agents.token_chunker import TokenChunker
+
+
+class WordTokenizer:
+    """One token per word, with character offsets like a fast tokenizer."""
+
+    is_fast = True
+
+    def __init__(self, model_max_length=32):
+        self.model_max_length = model_max_length
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False):
+        spans = [[match.span() for match in re.finditer(r"\S+", text)] for text in texts]
+        encoded = {"input_ids": [list(range(len(text_spans))) for text_spans in spans]}
+        if return_offsets_mapping:
+            encoded["offset_mapping"] = spans
+        return encoded
+
+    def decode(self, ids):
+        raise AssertionError("offsets should be used instead of decode")
+
+
+def _paragraph(name, words):
+    return " ".join(f"{name}{index}" for index in range(words))
+
+
+def _tokens(chunker, text):
+    return chunker.count_tokens([text])[0]
+
+
+def test_chunks_fit_the_budget_and_share_trailing_paragraphs():
+    chunker = TokenChunker(WordTokenizer(32), overlap_tokens=8, separator="\n")
+    # Budget is 32 - 2 special tokens = 30 content tokens; the separator counts as 1.
+    paragraphs = [_paragraph(name, 6) for name in "abcdefghij"]
+    chunks = chunker.chunk("\n".join(paragraphs))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert _tokens(chunker, chunk) <= chunker.budget()
+    for previous, current in zip(chunks, chunks[1:]):
+        # Each chunk starts with the last paragraph of the one before (6 tokens <= overlap 8).
+        assert current.split("\n")[0] == previous.split("\n")[-1]
+    # Nothing is lost.
+    assert set(paragraphs) == {para for chunk in chunks for para in chunk.split("\n")}
+
+
+def test_reserved_prompt_text_shrinks_the_budget():
+    chunker = TokenChunker(WordTokenizer(32), overlap_tokens=0)
+    prompt = "Summarize the ratio decidendi :"
+    assert chunker.budget(prompt) == 32 - 2 - 5
+    for chunk in chunker.chunk("\n".join(_paragraph(name, 4) for name in "abcdefgh"), reserve_text=prompt):
+        assert _tokens(chunker, chunk) + _tokens(chunker, prompt) <= 30
+
+
+def test_overlong_paragraph_is_split_into_overlapping_windows():
+    chunker = TokenChunker(WordTokenizer(22), overlap_tokens=5)
+    words = _paragraph("w", 50)
+    chunks = chunker.chunk(words)
+
+    budget = chunker.budget()
+    assert budget == 20
+    for chunk in chunks:
+        assert _tokens(chunker, chunk) <= budget
+    first, second = chunks[0].split(), chunks[1].split()
+    assert first == words.split()[:20]
+    assert second[:5] == first[-5:]
+    assert chunks[-1].split()[-1] == "w49"
+
+
+def test_overlap_is_capped_at_half_the_budget():
+    chunker = TokenChunker(WordTokenizer(12), overlap_tokens=100)
+    chunks = chunker.chunk(_paragraph("w", 40))
+    # Budget 10, overlap capped to 5: windows advance by 5 tokens.
+    assert [chunk.split()[0] for chunk in chunks] == ["w0", "w5", "w10", "w15", "w20", "w25", "w30"]
+
+
+def test_chunk_many_keeps_texts_apart():
+    chunker = TokenChunker(WordTokenizer(32), overlap_tokens=0)
+    assert chunker.chunk_many(["alpha beta", "", "gamma"]) == [["alpha beta"], [], ["gamma"]]